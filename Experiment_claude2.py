@@ -2,6 +2,8 @@ import streamlit as st
 from PACA_claude2_utils import create_paca_agent, simulate_conversation, save_ai_conversation_to_firebase, save_conversation_to_csv
 from SP_utils import create_conversational_agent, load_from_firebase, get_diag_from_given_information, load_prompt_and_get_version
 from firebase_config import get_firebase_ref
+from termination import default_termination_detector
+from conversation_log import LOG_STATUS_COMPLETE, ConversationLogWriter, load_unfinished_conversation, restore_memories, resume_conversation
 # from langchain.schema import HumanMessage, AIMessage
 import time
 # from langchain.chat_models import ChatOpenAI, ChatAnthropic
@@ -12,16 +14,17 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain_core.chat_history import InMemoryChatMessageHistory
-from SP_utils import create_conversational_agent, save_to_firebase
+from SP_utils import create_conversational_agent, save_many_to_firebase
 try:
     from sp_construct_generator import create_sp_construct
 except Exception:
     create_sp_construct = None
 
 try:
-    from paca_construct_generator import create_paca_construct
+    from paca_construct_generator import create_paca_construct, CONSTRUCT_MODES
 except Exception:
     create_paca_construct = None
+    CONSTRUCT_MODES = ("sequential",)
 
 # PRESET
 profile_version = 6.0
@@ -59,7 +62,9 @@ def construct_generator_conversation_new(paca_agent):
     
     try:
         with st.spinner("Generating PACA construct from conversation..."):
-            paca_construct = create_paca_construct(paca_agent)
+            # concurrent / structured modes work on a frozen snapshot of the interview
+            paca_construct = create_paca_construct(
+                paca_agent, mode=st.session_state.get('construct_mode', "sequential"))
         return paca_construct
     except Exception as e:
         st.error(f"Failed to create PACA construct: {e}")
@@ -143,11 +148,31 @@ def experiment_page(client_number):
         
         # Validate experiment number
         exp_number_valid = False
+        log_writer = st.session_state.get('conversation_log_writer')
         if exp_number:
             if not exp_number.isdigit():
                 st.sidebar.error("⚠️ Please enter a valid number")
+            elif log_writer is not None and (log_writer.client_number, log_writer.exp_number) == (client_number, exp_number):
+                # This session is saving its turns under this number (see conversation_log.py)
+                st.sidebar.success(f"✅ Experiment {exp_number}: {log_writer.total_turns} turns saved as they are generated")
+                exp_number_valid = True
             elif check_experiment_number_exists(firebase_ref, client_number, exp_number):
-                st.sidebar.error(f"⚠️ Experiment number {exp_number} is already used. Please enter a different number.")
+                saved_turns = load_unfinished_conversation(firebase_ref, client_number, exp_number)
+                if saved_turns is None:
+                    st.sidebar.error(f"⚠️ Experiment number {exp_number} is already used. Please enter a different number.")
+                else:
+                    # Run interrupted before its final save: continue from the saved turns
+                    st.sidebar.warning(f"⚠️ Experiment number {exp_number} has an unfinished conversation ({len(saved_turns)} turns).")
+                    if st.sidebar.button("Resume Saved Conversation"):
+                        restore_memories(saved_turns, paca_memory, sp_memory)
+                        st.session_state.sp_memory = sp_memory
+                        st.session_state.conversation = list(saved_turns)
+                        st.session_state.termination_detector = default_termination_detector()
+                        st.session_state.conversation_generator = resume_conversation(
+                            paca_agent, sp_agent, saved_turns, termination_detector=st.session_state.termination_detector)
+                        st.session_state.conversation_log_writer = ConversationLogWriter(
+                            firebase_ref, client_number, exp_number, start_index=len(saved_turns))
+                        st.rerun()
             else:
                 st.sidebar.success(f"✅ Experiment number {exp_number} is available")
                 exp_number_valid = True
@@ -169,8 +194,10 @@ def experiment_page(client_number):
                 st.session_state.sp_memory.add_user_message(initial_greeting)
             
             # Now create the generator - it will yield the greeting but not add to memory again
+            # Stops the generator once the interview has wrapped up (closing phrases / repetition)
+            st.session_state.termination_detector = default_termination_detector()
             st.session_state.conversation_generator = simulate_conversation(
-                paca_agent, sp_agent)
+                paca_agent, sp_agent, termination_detector=st.session_state.termination_detector)
         if 'constructs' not in st.session_state:
             st.session_state.constructs = None
         if 'sp_construct' not in st.session_state:
@@ -181,10 +208,17 @@ def experiment_page(client_number):
 
         # Button to generate conversation
         if st.sidebar.button("Generate Conversation"):
+            # With a valid experiment number every turn is saved as soon as it is generated
+            if exp_number_valid and st.session_state.get('conversation_log_writer') is None:
+                st.session_state.conversation_log_writer = ConversationLogWriter(firebase_ref, client_number, exp_number)
+                st.session_state.conversation_log_writer.extend(st.session_state.conversation)
+            log_writer = st.session_state.get('conversation_log_writer')
             while True:
                 try:
                     next_turn = next(st.session_state.conversation_generator)
                     st.session_state.conversation.append(next_turn)
+                    if log_writer is not None:
+                        log_writer.append(*next_turn)
 
                     # Update conversation display
                     with conversation_area.container():
@@ -193,12 +227,18 @@ def experiment_page(client_number):
                                 st.write(message)
 
                 except StopIteration:
+                    detector = st.session_state.get('termination_detector')
+                    if detector is not None and detector.stop_reason:
+                        st.sidebar.info(f"Conversation ended ({detector.stop_reason}): {detector.stop_detail or 'max turns reached'}")
                     break
 
                 # Add a small delay to allow for visual updates
                 time.sleep(0.1)
 
         # Button to stop conversation and generate constructs
+        st.sidebar.selectbox("Construct extraction mode", CONSTRUCT_MODES, key='construct_mode',
+                             help="sequential: one question at a time / concurrent: all questions at once "
+                                  "against a frozen snapshot / structured: whole construct as one JSON answer")
         if st.sidebar.button("Stop and Generate Constructs"):
             # Generate PACA construct
             if st.session_state.constructs is None:
@@ -250,29 +290,44 @@ def experiment_page(client_number):
                     'sp_version': actual_con_agent_version,
                     'timestamp': int(__import__('time').time()),
                     'total_turns': len(st.session_state.conversation),
+                    'status': LOG_STATUS_COMPLETE,
                     'data': conversation_data
                 }
+                if st.session_state.get('termination_detector') is not None:
+                    conversation_content.update(st.session_state.termination_detector.log_fields())
                 
                 conversation_key = f"conversation_log_{client_number}_{exp_number}"
-                save_to_firebase(firebase_ref, client_number, conversation_key, conversation_content)
-                
                 saved_items = [f"- Conversation: {conversation_key}"]
+                log_writer = st.session_state.get('conversation_log_writer')
+                streamed = log_writer is not None and (log_writer.client_number, log_writer.exp_number) == (client_number, exp_number)
+                if streamed:
+                    # Turns are already saved: only the remaining turns and the run metadata are merged in
+                    del conversation_content['data']
+                    to_save = []
+                    merge_items = [(conversation_key, {**log_writer.pending_updates(), **conversation_content})]
+                else:
+                    to_save = [(conversation_key, conversation_content)]
+                    merge_items = []
                 
                 # Save PACA construct with new naming convention
                 if st.session_state.constructs:
                     paca_construct_key = f"construct_paca_{client_number}_{exp_number}"
-                    save_to_firebase(firebase_ref, client_number, paca_construct_key, st.session_state.constructs)
+                    to_save.append((paca_construct_key, st.session_state.constructs))
                     saved_items.append(f"- PACA Construct: {paca_construct_key}")
                 
                 # Save SP construct with new naming convention
                 if st.session_state.sp_construct:
                     sp_construct_key = f"construct_sp_{client_number}_{exp_number}"
-                    save_to_firebase(firebase_ref, client_number, sp_construct_key, st.session_state.sp_construct)
+                    to_save.append((sp_construct_key, st.session_state.sp_construct))
                     saved_items.append(f"- SP Construct: {sp_construct_key}")
                 
-                st.success(
-                    f"✅ Conversation and constructs saved successfully!\n\n" + "\n".join(saved_items)
-                )
+                # One multi-path update: the run is saved completely or not at all
+                if save_many_to_firebase(firebase_ref, client_number, to_save, merge_items=merge_items):
+                    if streamed:
+                        log_writer.mark_flushed()
+                    st.success(
+                        "✅ Conversation and constructs saved successfully!\n\n" + "\n".join(saved_items)
+                    )
 
         # Display SP construct if it has been generated
         if st.session_state.sp_construct:
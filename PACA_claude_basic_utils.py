@@ -1,176 +1,36 @@
-import json
-# from langchain.chat_models import ChatOpenAI, ChatAnthropic
-from langchain_anthropic import ChatAnthropic
-# from langchain_openai import ChatOpenAI
-# from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-# from langchain.schema import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain_core.chat_history import InMemoryChatMessageHistory
-import streamlit as st
-from SP_utils import create_conversational_agent, save_to_firebase
-from firebase_config import get_firebase_ref
-import time
-import pandas as pd
-import io
-
-
-# paca_llm_claude = ChatAnthropic(
-#     model="claude-haiku-4-5-20251001",
-#     temperature=0.7,
-#     streaming=True,
-# )
-
-paca_llm_claude = ChatAnthropic(
-    model="claude-3-haiku-20240307",
-    temperature=0.7,
-    streaming=True,
-)
-
-
-firebase_ref = get_firebase_ref()
-
-# basic_prompt = """
-# You are a psychiatrist conducting an initial interview with a new patient. Proceed in Korean.
-
-# IMPORTANT INSTRUCTIONS FOR NATURAL CONVERSATION:
-# - You must NEVER use bullet points, lists, headings, or any structured formatting of any kind.
-# - Keep your responses brief and conversational, like a real doctor talking to a patient.
-# - Never use bullet points, lists, or structured formatting in your responses.
-# - Ask one question at a time, waiting for the patient’s response before asking the next.
-# - Do not provide summaries, explanations, or meta-commentary unless asked.
-# - Keep each response to about 1-3 sentences per turn.
-
-# After the interview with the patient is complete, someone will come to ask you about the patient. If you did not assess the topic they are asking about during the interview or do not know the answer, simply state "N/A".
-# """
-
-basic_prompt = """
-You are an experienced psychiatrist conducting an initial interview with a new patient. Your goal is to gather comprehensive information about the patient's mental health, symptoms, background, and potential diagnoses. Use a combination of open-ended questions, specific inquiries, and follow-up questions to explore the patient's situation in depth. Pay attention to both verbal and non-verbal cues, and use your expertise to guide the conversation towards areas that may be particularly relevant for diagnosis. Proceed in Korean.
-
-The following aspects need to be assessed in the patient: Chief complaint, Present illness, Symptoms, Alleviating factors, Exacerbating factors, Symptom duration, Triggering factors (why the patient decided to visit the hospital today), Stressors, Family history (including diagnoses and substance use), Current family structure, Suicidal ideation, Suicide risk, Self-harming behavior risk, Homicide risk, Suicidal plans, Suicide attempts, Mood, Affect, Verbal productivity, Insight, Perception, Thought process, Thought content, Spontaneity, Social judgment, and Reliability.
-
-IMPORTANT INSTRUCTIONS FOR NATURAL CONVERSATION:
-- You must NEVER use bullet points, lists, headings, or any structured formatting of any kind.
-- Keep your responses brief and conversational, like a real doctor talking to a patient.
-- Never use bullet points, lists, or structured formatting in your responses.
-- Ask one question at a time, waiting for the patient’s response before asking the next.
-- Use natural spoken language with contractions and an informal tone.
-- If the patient mentions something relevant, follow up naturally with a related question.
-- Do not provide summaries, explanations, or meta-commentary unless asked.
-- Keep each response to about 1-3 sentences per turn.
-
-After the interview with the patient is complete, someone will come to ask you about the patient. As an experienced psychiatrist, use appropriate reasoning, your professional judgment, and the information you've gathered during the interview to answer their questions. If you cannot determine something even with appropriate reasoning and your expertise, respond with "I don't know".
+"""
+PACA (claude_basic): Claude 3 Haiku, interview prompt
+Experiment_claude_basic.py 용 PACA. The agent, simulation and export live in
+paca_engine.py; the model is its PACA_MODELS["claude_basic"] entry.
 """
 
-@st.cache_resource
-def create_paca_agent(paca_version, page_id="default"):
-    """
-    Create PACA agent with page-specific memory isolation.
-    
-    Args:
-        paca_version: Version of the PACA agent
-        page_id: Unique identifier for the page (e.g., "mdd_claude_basic", "bd_claude_basic")
-                 This ensures each page has its own memory to prevent cross-contamination
-    """
-    system_prompt = basic_prompt
-
-    chat_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{human_input}")
-    ])
-
-    # Use InMemoryChatMessageHistory for proper message history management
-    # This memory object will persist across Streamlit reruns because of @st.cache_resource
-    # page_id ensures each page/experiment has isolated memory
-    memory = InMemoryChatMessageHistory()
-
-    def paca_agent(human_input, is_initial_prompt=False):
-        chain = chat_prompt | paca_llm_claude
-        
-        # Create a list to pass to the chain with current memory state
-        messages = list(memory.messages) if memory.messages else []
-        
-        response = chain.invoke({
-            "chat_history": messages,
-            "human_input": human_input,
-        })
-        
-        # Add messages to memory in the correct order
-        if not is_initial_prompt:
-            # For regular conversation, add user message first, then AI response
-            memory.add_user_message(human_input)
-            memory.add_ai_message(response.content)
-        else:
-            # For initial prompt, only add the AI response (the system is generating the initial message)
-            memory.add_ai_message(response.content)
-        
-        return response.content
-
-    return paca_agent, memory, paca_version
-
-
-def simulate_conversation(paca_agent, sp_agent, max_turns=300):
-    # Initial greeting from the doctor
-    initial_prompt = "안녕하세요, 저는 정신과 의사 김민수입니다. 이름이 어떻게 되시나요?"
-    
-    # The initial prompt is NOT generated by LLM, it's a hardcoded greeting
-    # It needs to be added to PACA's memory and yielded
-    # Note: This will be called only once when the generator is first created
-    yield ("PACA", initial_prompt)
-
-    current_speaker = "SP"
-    current_message = initial_prompt
-
-    for _ in range(max_turns):
-        if current_speaker == "SP":
-            response = sp_agent(current_message)
-            yield ("SP", response)
-            current_speaker = "PACA"
-        else:
-            # Now PACA responds to the patient's message
-            response = paca_agent(current_message, is_initial_prompt=False)
-            yield ("PACA", response)
-            current_speaker = "SP"
-
-        current_message = response
-
-
-def save_conversation_to_csv(conversation):
-    df = pd.DataFrame(conversation, columns=["Speaker", "Message"])
-    paca_messages = df[df["Speaker"] == "PACA"]["Message"]
-    sp_messages = df[df["Speaker"] == "SP"]["Message"]
-
-    result_df = pd.DataFrame({
-        "PACA": paca_messages.reset_index(drop=True),
-        "SP": sp_messages.reset_index(drop=True)
-    })
+import paca_engine
+from client_registry import get_client, shared_firebase_ref
+from paca_engine import (save_ai_conversation_to_firebase, save_conversation_to_csv, simulate_conversation,
+                         simulate_conversation_async, interview_prompt)
 
-    csv_buffer = io.BytesIO()
-    result_df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-    csv_buffer.seek(0)
+PACA_VARIANT = "claude_basic"
+PACA_LLM = paca_engine.get_paca_model(PACA_VARIANT).client_name
 
-    return csv_buffer.getvalue()
+basic_prompt = interview_prompt
 
 
-def save_ai_conversation_to_firebase(firebase_ref, client_number, conversation, paca_version, sp_version):
-    conversation_data = [
-        {'speaker': speaker, 'message': message}
-        for speaker, message in conversation
-    ]
+def __getattr__(name):
+    # Former module-level clients, now created lazily
+    if name == "paca_llm_claude":
+        return get_client(PACA_LLM)
+    if name == "firebase_ref":
+        return shared_firebase_ref()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    timestamp = int(time.time())
 
-    content = {
-        'paca_version': paca_version,
-        'sp_version': sp_version,
-        'timestamp': timestamp,
-        'data': conversation_data
-    }
+def create_paca_agent(paca_version, page_id="default", history_turns=None, history_token_budget=None):
+    return paca_engine.create_paca_agent(PACA_VARIANT, paca_version, page_id=page_id, history_turns=history_turns,
+                                         history_token_budget=history_token_budget)
 
-    conversation_id = f"ai_conversation_paca{paca_version}_sp{sp_version}_{timestamp}"
-    save_to_firebase(
-        firebase_ref, client_number, conversation_id, content)
 
-    return conversation_id
+def create_async_paca_agent(paca_version, page_id="default", system_prompt=None,
+                            history_turns=None, history_token_budget=None):
+    return paca_engine.create_async_paca_agent(PACA_VARIANT, paca_version, page_id=page_id,
+                                               system_prompt=system_prompt, history_turns=history_turns,
+                                               history_token_budget=history_token_budget)
@@ -2,22 +2,25 @@ import json
 import os
 import re
 # from langchain.chat_models import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
 # from langchain.prompts import ChatPromptTemplate, PromptTemplate, MessagesPlaceholder
 # from langchain.schema import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.chat_history import InMemoryChatMessageHistory
 import streamlit as st
-import pandas as pd
 from typing import Tuple
 from firebase_config import get_firebase_ref
 import time
 from collections import OrderedDict
 import random
 from typing import Optional
+from client_registry import chat_openai, get_client, register_llm, shared_firebase_ref
+from history_window import create_history_window
+from llm_scheduler import scheduled_ainvoke, scheduled_invoke
+# Firebase helpers live in firebase_utils (no LLM imports) and are re-exported here
+from firebase_utils import (READ_CACHE_DATA_TYPES, FirebaseReadCache, check_client_exists, firebase_data_key,
+                            firebase_read_cache, load_from_firebase, sanitize_dict, sanitize_key,
+                            save_many_to_firebase, save_to_firebase, start_invalidation_listener)
 
 # Patch note 20260103
 #Removed memory.add_user_message(human_input) from before the LLM call.
@@ -30,79 +33,34 @@ from typing import Optional
 #Added the question topic detector (is_past_detail_question) to activate “recall-failure state machine”
 
 
-# Initialize the language models
-llm = ChatOpenAI(
+# Language models and the Firebase reference are created on first use (client_registry.py);
+# every LLM call goes through the record/replay cache (PSYCHE_LLM_CACHE_MODE)
+register_llm("sp.llm", lambda: chat_openai(
     temperature=0.7,
     model="gpt-5.1-2025-11-13",
-)
+))
 
-chat_llm = ChatOpenAI(
+register_llm("sp.chat_llm", lambda: chat_openai(
     temperature=0.7,
     model="gpt-5.1-2025-11-13",
     streaming=True,
-    callbacks=[StreamingStdOutCallbackHandler()]
-)
-
-firebase_ref = get_firebase_ref()
-
-# Fixed date
-FIXED_DATE = "2025-12-01"
-
+    stream_to_stdout=True,
+))
 
-def sanitize_key(key):
-    sanitized = re.sub(r'[$#\[\]/.]', '_', str(key))
-    return sanitized if sanitized else '_'
+# Module attributes kept for callers that used the former module-level clients
+_LAZY_CLIENTS = {"llm": "sp.llm", "chat_llm": "sp.chat_llm"}
 
 
-def sanitize_dict(data):
-    if isinstance(data, dict):
-        return {sanitize_key(k): sanitize_dict(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [sanitize_dict(item) for item in data]
-    else:
-        return data
+def __getattr__(name):
+    if name in _LAZY_CLIENTS:
+        return get_client(_LAZY_CLIENTS[name])
+    if name == "firebase_ref":
+        return shared_firebase_ref()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def save_to_firebase(firebase_ref, client_number, data_type, content):
-    if firebase_ref is not None:
-        try:
-            if "version" in data_type:
-                version_part = data_type.split("version")[1]
-                formatted_version = version_part.replace(".", "_")
-                data_type = f"{data_type.split('version')[0]}version{formatted_version}"
-
-            sanitized_path = sanitize_key(f"clients/{client_number}/{data_type}")
-            sanitized_content = sanitize_dict(content)
-            firebase_ref.child(sanitized_path).set(sanitized_content)
-        except Exception as e:
-            st.error(f"Failed to save data to Firebase: {str(e)}")
-    else:
-        st.error("Firebase reference is not available. Data not saved.")
-
-
-def load_from_firebase(firebase_ref, client_number, data_type):
-    if firebase_ref is not None:
-        try:
-            if "version" in data_type:
-                version_part = data_type.split("version")[1]
-                formatted_version = version_part.replace(".", "_")
-                data_type = f"{data_type.split('version')[0]}version{formatted_version}"
-
-            sanitized_path = sanitize_key(f"clients/{client_number}/{data_type}")
-            return firebase_ref.child(sanitized_path).get()
-        except Exception as e:
-            st.error(f"Error loading data from Firebase: {str(e)}")
-    return None
-
-
-def check_client_exists(firebase_ref, client_number):
-    try:
-        client_path = f"clients_{client_number}_given_information"
-        client_data = firebase_ref.child(client_path).get()
-        return client_data is not None
-    except Exception as e:
-        st.error(f"Error checking client existence: {str(e)}")
-        return False
+# Fixed date
+FIXED_DATE = "2025-12-01"
 
 
 def clean_data(data):
@@ -226,14 +184,15 @@ def profile_maker(profile_version, given_information, client_number, prompt):
         return None
 
     chat_prompt = PromptTemplate.from_template(prompt)
+    llm = get_client("sp.llm")
     chain = chat_prompt | llm
 
     try:
-        result = chain.invoke({
+        result = scheduled_invoke(chain, {
             "current_date": FIXED_DATE,
             "given_information": given_information,
             "profile_form": json.dumps(profile_form, indent=2),
-        })
+        }, llm=llm)
     except KeyError as e:
         st.error(f"Error: Missing key in prompt template: {e}")
         return None
@@ -259,12 +218,13 @@ def profile_maker(profile_version, given_information, client_number, prompt):
         st.error(f"An unexpected error occurred while processing the result: {str(e)}")
         return None
 
-    save_to_firebase(firebase_ref, client_number, f"profile_version{profile_version}", parsed_result)
+    save_to_firebase(shared_firebase_ref(), client_number, f"profile_version{profile_version}", parsed_result)
     return parsed_result
 
 
 @st.cache_data
 def history_maker(profile_version, client_number, prompt):
+    firebase_ref = shared_firebase_ref()
     profile_json = load_from_firebase(firebase_ref, client_number, f"profile_version{profile_version}")
 
     if profile_json is None:
@@ -272,12 +232,13 @@ def history_maker(profile_version, client_number, prompt):
         return None
 
     chat_prompt = PromptTemplate.from_template(prompt)
+    llm = get_client("sp.llm")
     chain = chat_prompt | llm
 
-    result = chain.invoke({
+    result = scheduled_invoke(chain, {
         "current_date": FIXED_DATE,
         "profile_json": json.dumps(profile_json, indent=2)
-    })
+    }, llm=llm)
 
     save_to_firebase(firebase_ref, client_number, f"history_version{profile_version}", result.content)
     return result.content
@@ -285,10 +246,12 @@ def history_maker(profile_version, client_number, prompt):
 
 @st.cache_data
 def beh_dir_maker(profile_version, beh_dir_version, client_number, prompt, given_information):
+    firebase_ref = shared_firebase_ref()
     profile_json = load_from_firebase(firebase_ref, client_number, f"profile_version{profile_version}")
     history = load_from_firebase(firebase_ref, client_number, f"history_version{profile_version}")
 
     chat_prompt = PromptTemplate.from_template(prompt)
+    llm = get_client("sp.llm")
     chain = chat_prompt | llm
 
     diag = get_diag_from_given_information(given_information)
@@ -311,13 +274,13 @@ def beh_dir_maker(profile_version, beh_dir_version, client_number, prompt, given
         st.error(f"Error reading required files: {str(e)}")
         return None
 
-    result = chain.invoke({
+    result = scheduled_invoke(chain, {
         "given_information": given_information,
         "profile_json": json.dumps(profile_json, indent=2),
         "history": history,
         "mse_few_shot": mse_few_shot_content,
         "instruction_form": instruction_form_content
-    })
+    }, llm=llm)
 
     save_to_firebase(firebase_ref, client_number, f"beh_dir_version{beh_dir_version}", result.content)
     return result.content
@@ -381,46 +344,33 @@ def remove_detailed_examples_from_profile(profile_json):
     return cleaned_profile
 
 
-def create_conversational_agent(profile_version, beh_dir_version, client_number, system_prompt):
-    given_information = load_from_firebase(firebase_ref, client_number, "given_information")
-    profile_json = load_from_firebase(firebase_ref, client_number, f"profile_version{profile_version}")
-    history = load_from_firebase(firebase_ref, client_number, f"history_version{profile_version}")
-    behavioral_instruction = load_from_firebase(firebase_ref, client_number, f"beh_dir_version{beh_dir_version}")
+RECALL_FAILURE_TEXT = (
+    "RECALL-FAILURE MODE (take precedence over everything above)):\n"
+    "Although the following information defines your background, you experience difficulty "
+    "spontaneously recalling or articulating parts of it due to your current depressive state.\n"
+    "ALWAYS and ONLY respond that you DON'T KNOW, in a natural way.\n"
+)
 
-    # NEW: diagnosis extracted once and used to gate recall-failure mode
-    diag = get_diag_from_given_information(given_information or "")
 
-    # IMPORTANT: system_prompt MUST contain {recall_failure_mode} placeholder.
-    # If it doesn't, we safely append it at the end (so the code doesn't crash).
-    if "{recall_failure_mode}" not in system_prompt:
-        system_prompt = system_prompt + "\n\n{recall_failure_mode}\n"
-
-    chat_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{human_input}")
-    ])
+def create_recall_failure_state_machine(diag, rng=None):
+    """
+    Recall-failure state machine shared by the sync and async SP agents.
 
-    memory = InMemoryChatMessageHistory()
-    chain = chat_prompt | chat_llm
+    Returns a function step(human_input) -> recall_failure_mode string for this turn.
+    State variables:
+    - current_prob: Current activation probability (0.8 -> 0.4 -> 0.0)
+    - is_mode_on: Whether recall failure mode is currently active
+    - rng: Random generator of this agent (seeded from the global one, so random.seed()
+      still makes runs reproducible); its state is part of the checkpoint
 
-    # -------------------------------
-    # NEW: recall-failure state machine
-    # -------------------------------
-    # State variables:
-    # - current_prob: Current activation probability (0.8 -> 0.4 -> 0.0)
-    # - is_mode_on: Whether recall failure mode is currently active
+    step.get_state() / step.set_state(state) read and restore all three
+    (see simulation_checkpoint.py).
+    """
     current_prob = 0.8
     is_mode_on = False
+    rng = rng or random.Random(random.getrandbits(64))
 
-    RECALL_FAILURE_TEXT = (
-        "RECALL-FAILURE MODE (take precedence over everything above)):\n"
-        "Although the following information defines your background, you experience difficulty "
-        "spontaneously recalling or articulating parts of it due to your current depressive state.\n"
-        "ALWAYS and ONLY respond that you DON'T KNOW, in a natural way.\n"
-    )
-
-    def agent(human_input: str):
+    def step(human_input: str) -> str:
         nonlocal current_prob, is_mode_on
 
         # 1) Decide whether we are in a "past detail" topic
@@ -440,7 +390,7 @@ def create_conversational_agent(profile_version, beh_dir_version, client_number,
                 current_prob = 0.8
             else:
                 # Try to activate with current_prob
-                if random.random() < current_prob:
+                if rng.random() < current_prob:
                     # Success: turn ON and decrease prob by 0.4
                     is_mode_on = True
                     current_prob -= 0.4
@@ -450,26 +400,107 @@ def create_conversational_agent(profile_version, beh_dir_version, client_number,
                     current_prob = 0.8
 
         # 4) Construct recall_failure_mode string for this turn
-        recall_failure_mode = RECALL_FAILURE_TEXT if is_mode_on else ""
+        return RECALL_FAILURE_TEXT if is_mode_on else ""
+
+    def get_state():
+        return {'current_prob': current_prob, 'is_mode_on': is_mode_on, 'rng_state': rng.getstate()}
+
+    def set_state(state):
+        nonlocal current_prob, is_mode_on
+        current_prob = state['current_prob']
+        is_mode_on = state['is_mode_on']
+        if state.get('rng_state') is not None:
+            rng.setstate(state['rng_state'])
+
+    step.get_state = get_state
+    step.set_state = set_state
+    return step
+
+
+def render_static_system_prompt(system_prompt, static_inputs):
+    """
+    Pre-render everything in the SP system prompt except {recall_failure_mode}.
+    Returns the rendered fragments around each {recall_failure_mode} placeholder,
+    so a turn only needs recall_failure_mode.join(fragments).
+    """
+    fragments = []
+    for part in system_prompt.split("{recall_failure_mode}"):
+        template = PromptTemplate.from_template(part)
+        fragments.append(template.format(**{k: static_inputs[k] for k in template.input_variables}))
+    return fragments
+
+
+def _prepare_conversational_agent(profile_version, beh_dir_version, client_number, system_prompt,
+                                  history_turns=None, history_token_budget=None):
+    """
+    Load SP data and build the memory, per-turn message builder and optional history
+    window shared by both agent variants.
+    history_turns / history_token_budget enable bounded-history mode (see history_window.py);
+    both None keeps sending the full conversation every turn.
+    """
+    firebase_ref = shared_firebase_ref()
+    given_information = load_from_firebase(firebase_ref, client_number, "given_information")
+    profile_json = load_from_firebase(firebase_ref, client_number, f"profile_version{profile_version}")
+    history = load_from_firebase(firebase_ref, client_number, f"history_version{profile_version}")
+    behavioral_instruction = load_from_firebase(firebase_ref, client_number, f"beh_dir_version{beh_dir_version}")
+
+    # NEW: diagnosis extracted once and used to gate recall-failure mode
+    diag = get_diag_from_given_information(given_information or "")
+
+    # IMPORTANT: system_prompt MUST contain {recall_failure_mode} placeholder.
+    # If it doesn't, we safely append it at the end (so the code doesn't crash).
+    if "{recall_failure_mode}" not in system_prompt:
+        system_prompt = system_prompt + "\n\n{recall_failure_mode}\n"
+
+    # Static part of the system message is rendered once per agent
+    # (profile JSON serialization and template formatting no longer run every turn).
+    system_fragments = render_static_system_prompt(system_prompt, {
+        "given_information": given_information,
+        "current_date": FIXED_DATE,
+        "profile_json": json.dumps(profile_json, indent=2),
+        "history": history,
+        "behavioral_instruction": behavioral_instruction,
+    })
+
+    memory = InMemoryChatMessageHistory()
+
+    # -------------------------------
+    # NEW: recall-failure state machine
+    # -------------------------------
+    next_recall_failure_mode = create_recall_failure_state_machine(diag)
+
+    # Bounded-history mode: older turns are summarized with the non-streaming llm
+    history_window = create_history_window(lambda: get_client("sp.llm"), history_turns, history_token_budget)
+
+    def build_messages(human_input: str, chat_history=None):
+        recall_failure_mode = next_recall_failure_mode(human_input)
 
         # -------------------------------
         # FIX 1: Duplicate-last-user-message issue
         # -------------------------------
-        # We DO NOT add the current human_input to memory before calling the chain,
-        # because the prompt already includes ("human", "{human_input}").
+        # We DO NOT add the current human_input to memory before calling the model,
+        # because the current question is appended as the final HumanMessage.
         # If we add it first, the same question appears twice: once in chat_history and once as human_input.
-        messages = list(memory.messages) if memory.messages else []
+        return [
+            SystemMessage(content=recall_failure_mode.join(system_fragments)),
+            *(memory.messages if chat_history is None else chat_history),
+            HumanMessage(content=human_input),
+        ]
 
-        response = chain.invoke({
-            "given_information": given_information,
-            "current_date": FIXED_DATE,
-            "profile_json": json.dumps(profile_json, indent=2),
-            "history": history,
-            "behavioral_instruction": behavioral_instruction,
-            "recall_failure_mode": recall_failure_mode,
-            "chat_history": messages,
-            "human_input": human_input
-        })
+    build_messages.recall_failure = next_recall_failure_mode
+    return memory, build_messages, history_window
+
+
+def create_conversational_agent(profile_version, beh_dir_version, client_number, system_prompt,
+                                history_turns=None, history_token_budget=None):
+    memory, build_messages, history_window = _prepare_conversational_agent(
+        profile_version, beh_dir_version, client_number, system_prompt, history_turns, history_token_budget)
+    chat_llm = get_client("sp.chat_llm")
+
+    def agent(human_input: str):
+        chat_history = history_window.window(memory.messages) if history_window else None
+        # Messages are built once: retries must not advance the recall-failure state again
+        response = scheduled_invoke(chat_llm, build_messages(human_input, chat_history))
 
         # Now append the turn to memory AFTER receiving the model response
         memory.add_user_message(human_input)
@@ -477,6 +508,36 @@ def create_conversational_agent(profile_version, beh_dir_version, client_number,
 
         return response.content
 
+    # Exposed so a simulation checkpoint can save / restore the agent's state
+    agent.recall_failure = build_messages.recall_failure
+    agent.history_window = history_window
+    return agent, memory
+
+
+def create_async_conversational_agent(profile_version, beh_dir_version, client_number, system_prompt,
+                                      history_turns=None, history_token_budget=None):
+    """
+    Awaitable twin of create_conversational_agent (uses ainvoke).
+    Same memory semantics and recall-failure state machine, so an asyncio event loop
+    can drive many simulated interviews without one thread per conversation.
+    """
+    memory, build_messages, history_window = _prepare_conversational_agent(
+        profile_version, beh_dir_version, client_number, system_prompt, history_turns, history_token_budget)
+    chat_llm = get_client("sp.chat_llm")
+
+    async def agent(human_input: str):
+        chat_history = await history_window.awindow(memory.messages) if history_window else None
+        response = await scheduled_ainvoke(chat_llm, build_messages(human_input, chat_history))
+
+        # Append the turn to memory AFTER receiving the model response
+        memory.add_user_message(human_input)
+        memory.add_ai_message(response.content)
+
+        return response.content
+
+    # Exposed so a simulation checkpoint can save / restore the agent's state
+    agent.recall_failure = build_messages.recall_failure
+    agent.history_window = history_window
     return agent, memory
 
 
@@ -2,6 +2,7 @@ import streamlit as st
 from Home import check_participant
 from firebase_config import get_firebase_ref
 from SP_utils import *
+from SP_utils import chat_llm
 import uuid
 
 instructions = """
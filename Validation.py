@@ -3,6 +3,7 @@ from Home import check_participant
 from firebase_config import get_firebase_ref
 from SP_utils import *
 from langchain_core.chat_history import InMemoryChatMessageHistory
+from llm_scheduler import INTERACTIVE, llm_priority
 
 
 instructions = """
@@ -108,7 +109,9 @@ def validation_page(client_number, profile_version=6.0, beh_dir_version=6.0, con
             with st.chat_message("assistant"):
                 message_placeholder = st.empty()
                 # The agent function now handles adding user message to memory
-                full_response = agent(prompt)
+                # Live chat: admitted ahead of background simulations / evaluations
+                with llm_priority(INTERACTIVE):
+                    full_response = agent(prompt)
                 message_placeholder.markdown(full_response)
     else:
         st.warning("Please load client data first.")
@@ -0,0 +1,197 @@
+"""
+Vectorized Inter-Rater Agreement
+Likert 평정 신뢰도 (Krippendorff's Alpha - ordinal, Weighted Kappa) + bootstrap 신뢰구간
+
+Ratings come in two layouts (NaN = missing):
+- reliability matrix: units × coders (Krippendorff's alpha)
+- rating tensor:      coders × cases × items (pairwise weighted kappa, bootstrapped over cases)
+
+Values are mapped onto `levels` (default Likert 1-5; any number of coders and levels),
+coincidence / confusion matrices are built with one-hot outer products, and D_o / D_e
+are matrix reductions. Per-unit (per-case) contributions are kept separate, so a
+bootstrap replicate is a single weighted sum instead of a full recomputation.
+
+Ratings that are not one of `levels` are treated as missing.
+"""
+
+from itertools import combinations
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_LEVELS = (1, 2, 3, 4, 5)
+DEFAULT_N_BOOT = 2000
+DEFAULT_CI = 0.95
+
+
+# ================================
+# Shared helpers
+# ================================
+def level_indices(ratings, levels: Sequence[float] = DEFAULT_LEVELS) -> np.ndarray:
+    """Index of each rating in `levels` (-1 for missing / unknown values)."""
+    levels = np.asarray(levels, dtype=float)
+    ratings = np.asarray(ratings, dtype=float)
+    idx = np.clip(np.searchsorted(levels, ratings), 0, len(levels) - 1)
+    valid = ~np.isnan(ratings) & (levels[idx] == ratings)
+    return np.where(valid, idx, -1)
+
+
+def one_hot(ratings, levels: Sequence[float] = DEFAULT_LEVELS) -> np.ndarray:
+    """ratings (...) -> (..., n_levels) indicator array (all zeros where missing)."""
+    idx = level_indices(ratings, levels)
+    return (idx[..., None] == np.arange(len(levels))).astype(float)
+
+
+def bootstrap_weights(n_units: int, n_boot: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_boot, n_units) resampling counts: how often each unit is drawn in each replicate."""
+    draws = rng.integers(0, n_units, size=(n_boot, n_units))
+    draws += np.arange(n_boot)[:, None] * n_units
+    return np.bincount(draws.ravel(), minlength=n_boot * n_units).reshape(n_boot, n_units).astype(float)
+
+
+def percentile_ci(samples: np.ndarray, ci: float = DEFAULT_CI) -> Optional[Tuple[float, float]]:
+    samples = samples[~np.isnan(samples)]
+    if samples.size == 0:
+        return None
+    tail = (1 - ci) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+# ================================
+# Krippendorff's Alpha (ordinal)
+# ================================
+def ordinal_distance(levels: Sequence[float] = DEFAULT_LEVELS) -> np.ndarray:
+    """
+    Distance between levels: summed squared steps between them, normalized to a maximum of 1
+    (for evenly spaced Likert levels this is |c - k| / (n_levels - 1)).
+    """
+    steps = np.diff(np.asarray(levels, dtype=float)) ** 2
+    position = np.concatenate([[0.0], np.cumsum(steps)])
+    delta = np.abs(position[:, None] - position[None, :])
+    max_delta = delta.max()
+    return delta / max_delta if max_delta > 0 else delta
+
+
+def unit_coincidences(matrix, levels: Sequence[float] = DEFAULT_LEVELS) -> np.ndarray:
+    """
+    Per-unit coincidence matrices (n_units, n_levels, n_levels) for a units × coders matrix:
+    o_u = (n_u n_u^T - diag(n_u)) / (m_u - 1), zero for units with fewer than 2 ratings.
+    """
+    counts = one_hot(matrix, levels).sum(axis=1)  # (units, levels)
+    m = counts.sum(axis=1)
+    scale = np.divide(1.0, m - 1, out=np.zeros_like(m), where=m >= 2)
+    pairs = counts[:, :, None] * counts[:, None, :]
+    diag = np.arange(counts.shape[1])
+    pairs[:, diag, diag] -= counts
+    return pairs * scale[:, None, None]
+
+
+def alpha_from_coincidence(coincidence: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """alpha = 1 - D_o / D_e for one or a batch (..., L, L) of coincidence matrices (NaN if undefined)."""
+    n_total = coincidence.sum(axis=(-2, -1))
+    n_c = coincidence.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d_o = (coincidence * delta).sum(axis=(-2, -1)) / n_total
+        d_e = np.einsum('...c,ck,...k->...', n_c, delta, n_c) / (n_total * (n_total - 1))
+        alpha = 1 - d_o / d_e
+    return np.where((n_total > 0) & (d_e != 0), alpha, np.nan)
+
+
+def _alpha_units(matrix, levels):
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim != 2:
+        return None
+    # Units with fewer than 2 ratings carry no pairable values
+    matrix = matrix[np.sum(~np.isnan(matrix), axis=1) >= 2]
+    if len(matrix) < 2:
+        return None
+    return unit_coincidences(matrix, levels)
+
+
+def krippendorff_alpha_ordinal(matrix, levels: Sequence[float] = DEFAULT_LEVELS) -> Optional[float]:
+    """Krippendorff's alpha for a units × coders matrix (None when fewer than 2 pairable units or D_e = 0)."""
+    per_unit = _alpha_units(matrix, levels)
+    if per_unit is None:
+        return None
+    alpha = alpha_from_coincidence(per_unit.sum(axis=0), ordinal_distance(levels))
+    return None if np.isnan(alpha) else float(alpha)
+
+
+def krippendorff_alpha_bootstrap(matrix, levels: Sequence[float] = DEFAULT_LEVELS, n_boot: int = DEFAULT_N_BOOT,
+                                 ci: float = DEFAULT_CI, seed: Optional[int] = 0) -> Optional[Tuple[float, float]]:
+    """Percentile bootstrap CI of alpha, resampling units with replacement."""
+    per_unit = _alpha_units(matrix, levels)
+    if per_unit is None:
+        return None
+    n_units, n_levels = per_unit.shape[0], per_unit.shape[1]
+    weights = bootstrap_weights(n_units, n_boot, np.random.default_rng(seed))
+    replicates = (weights @ per_unit.reshape(n_units, -1)).reshape(n_boot, n_levels, n_levels)
+    return percentile_ci(alpha_from_coincidence(replicates, ordinal_distance(levels)), ci)
+
+
+# ================================
+# Weighted Kappa (pairwise, Cohen's)
+# ================================
+def kappa_weight_matrix(n_levels: int, weights: str = 'quadratic') -> np.ndarray:
+    """Disagreement weights on level indices (same as sklearn's cohen_kappa_score)."""
+    diff = np.abs(np.arange(n_levels)[:, None] - np.arange(n_levels)[None, :]).astype(float)
+    if weights == 'quadratic':
+        return diff ** 2
+    if weights == 'linear':
+        return diff
+    return (diff > 0).astype(float)
+
+
+def kappa_from_confusion(confusion: np.ndarray, weights: str = 'quadratic') -> np.ndarray:
+    """Weighted kappa for a batch (..., L, L) of confusion matrices (NaN with < 2 pairs or no expected disagreement)."""
+    n = confusion.sum(axis=(-2, -1))
+    w = kappa_weight_matrix(confusion.shape[-1], weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = confusion.sum(axis=-1)[..., :, None] * confusion.sum(axis=-2)[..., None, :] / n[..., None, None]
+        kappa = 1 - (w * confusion).sum(axis=(-2, -1)) / (w * expected).sum(axis=(-2, -1))
+    return np.where(n >= 2, kappa, np.nan)
+
+
+def case_confusions(ratings, levels: Sequence[float] = DEFAULT_LEVELS) -> np.ndarray:
+    """
+    Per-case confusion matrices for every coder pair and item.
+
+    ratings: (coders, cases, items) with NaN for missing
+    Returns: (cases, pairs, items, L, L), pairs in itertools.combinations order
+    """
+    indicators = one_hot(ratings, levels)  # (coders, cases, items, L)
+    pairs = list(combinations(range(indicators.shape[0]), 2))
+    if not pairs:
+        return np.zeros((indicators.shape[1], 0, indicators.shape[2], len(levels), len(levels)))
+    first, second = (np.array(side) for side in zip(*pairs))
+    confusion = indicators[first][..., :, None] * indicators[second][..., None, :]  # (pairs, cases, items, L, L)
+    return confusion.swapaxes(0, 1)
+
+
+def mean_pairwise_weighted_kappa(ratings, levels: Sequence[float] = DEFAULT_LEVELS,
+                                 weights: str = 'quadratic') -> Optional[Dict[str, float]]:
+    """Mean / SD / count of the defined pairwise kappas over every coder pair × item."""
+    per_case = case_confusions(ratings, levels)
+    kappas = kappa_from_confusion(per_case.sum(axis=0), weights).ravel()
+    kappas = kappas[~np.isnan(kappas)]
+    if kappas.size == 0:
+        return None
+    return {'mean': float(np.mean(kappas)), 'std': float(np.std(kappas)), 'n': int(kappas.size)}
+
+
+def weighted_kappa_bootstrap(ratings, levels: Sequence[float] = DEFAULT_LEVELS, weights: str = 'quadratic',
+                             n_boot: int = DEFAULT_N_BOOT, ci: float = DEFAULT_CI,
+                             seed: Optional[int] = 0) -> Optional[Tuple[float, float]]:
+    """Percentile bootstrap CI of the mean pairwise kappa, resampling cases with replacement."""
+    per_case = case_confusions(ratings, levels)
+    n_cases = per_case.shape[0]
+    if n_cases < 2 or per_case.shape[1] == 0:
+        return None
+    resampled = bootstrap_weights(n_cases, n_boot, np.random.default_rng(seed))
+    replicates = (resampled @ per_case.reshape(n_cases, -1)).reshape((n_boot,) + per_case.shape[1:])
+    kappas = kappa_from_confusion(replicates, weights).reshape(n_boot, -1)
+    defined = ~np.isnan(kappas)
+    with np.errstate(invalid='ignore'):
+        means = np.where(defined, kappas, 0).sum(axis=1) / defined.sum(axis=1)
+    return percentile_ci(means, ci)
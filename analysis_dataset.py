@@ -0,0 +1,375 @@
+"""
+Analysis Dataset
+Figure / Correlation 페이지들이 공유하는 분석용 데이터셋 (PSYCHE · Expert · Element · PIQSCA)
+
+The Figure and correlation pages used to re-read the Firebase results and re-parse
+them with their own copies of load_expert_scores / load_psyche_scores /
+load_element_scores on every rerun. This module does both once:
+- the results snapshot is read through firebase_catalog and kept for SNAPSHOT_TTL_SECONDS
+- the snapshot is hashed, and the parsed tables are cached per content hash
+  (st.cache_resource, so every session and every page shares them)
+
+AnalysisDataset holds tidy pandas tables and returns the dict shapes the plotting
+code already uses (psyche_scores(), expert_scores_by_validator(), element_scores(), ...).
+The cached dataset is shared, so the tables must be treated as read-only; the dict
+views are rebuilt on every call and can be modified freely.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from expert_validation_utils import sanitize_firebase_key
+from firebase_catalog import load_catalog, load_experiment_results
+from firebase_config import get_firebase_ref
+from resampling import CI_METHODS, DEFAULT_RESAMPLES, confidence_band, correlation_comparison_table
+
+Experiment = Tuple[int, int]
+
+# Snapshot freshness: pages reuse the same Firebase read for this long
+SNAPSHOT_TTL_SECONDS = 600
+
+# Catalogued prefixes read with the PSYCHE results
+RESULT_PREFIXES = ('expert', 'piqsca')
+
+# `rater` value of PSYCHE rows in AnalysisDataset.elements (other rows use the validator name)
+PSYCHE_RATER = "PSYCHE"
+
+PIQSCA_ITEMS = ('process_of_the_interview', 'techniques', 'information_for_diagnosis')
+
+# Category weights used by the category-level correlation figures
+CATEGORY_WEIGHTS = {'Subjective': 1, 'Impulsivity': 5, 'Behavior': 2}
+
+# Regression-line 95% CI of the correlation plots: "t" (t-distribution) or "bootstrap" (sidebar)
+CI_METHOD = "t"
+BOOTSTRAP_RESAMPLES = DEFAULT_RESAMPLES
+
+# PSYCHE-Expert correlation comparisons (A vs B): model family, basic (smaller) vs guided (large), disorder
+CORRELATION_COMPARISONS = [("GPT", "Claude"), ("Basic", "Guided"), ("MDD", "BD"), ("MDD", "OCD"), ("BD", "OCD")]
+
+
+def snapshot_version(root_data: Dict[str, Any]) -> str:
+    """Content hash of a results snapshot (same data -> same version)."""
+    payload = json.dumps(root_data or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _value(value):
+    return None if _missing(value) else value
+
+
+# ================================
+# Dataset
+# ================================
+@dataclass(frozen=True)
+class AnalysisDataset:
+    """
+    Tidy analysis tables built from one results snapshot.
+
+    Tables:
+    - experiments:   client_num, exp_num, psyche_key, psyche_score
+    - expert_scores: validator, client_num, exp_num, expert_score (experiments without a score are omitted)
+    - elements:      rater, client_num, exp_num, element, score, weighted_score
+                     (rater = PSYCHE_RATER or the validator name; PSYCHE_RUBRIC elements only)
+    - piqsca:        validator, client_num, exp_num, <PIQSCA_ITEMS>, piqsca
+    """
+    version: str
+    experiment_numbers: Tuple[Experiment, ...]
+    validators: Tuple[str, ...]
+    experiments: pd.DataFrame
+    expert_scores: pd.DataFrame
+    elements: pd.DataFrame
+    piqsca: pd.DataFrame
+    psyche_keys: Tuple[str, ...] = ()
+    psyche_structure_sample: Optional[Dict[str, Any]] = None
+
+    # ---------- dict views (shapes used by the figure code) ----------
+    def psyche_scores(self) -> Dict[Experiment, Any]:
+        """{(client_num, exp_num): psyche_score or None} for every experiment."""
+        scores = {
+            (int(row.client_num), int(row.exp_num)): _value(row.psyche_score)
+            for row in self.experiments.itertuples(index=False)
+        }
+        return {exp: scores.get(exp) for exp in self.experiment_numbers}
+
+    def expert_scores_by_validator(self) -> Dict[str, Dict[Experiment, Any]]:
+        """{validator: {(client_num, exp_num): expert_score or None}} for every validator and experiment."""
+        expert_data = {validator: {exp: None for exp in self.experiment_numbers} for validator in self.validators}
+        for row in self.expert_scores.itertuples(index=False):
+            expert_data[row.validator][(int(row.client_num), int(row.exp_num))] = _value(row.expert_score)
+        return expert_data
+
+    def average_expert_scores(self) -> Dict[Experiment, Optional[float]]:
+        """{(client_num, exp_num): mean expert score over validators, or None}."""
+        means = self.expert_scores.groupby(['client_num', 'exp_num'])['expert_score'].mean()
+        return {exp: (float(means[exp]) if exp in means.index and not _missing(means[exp]) else None)
+                for exp in self.experiment_numbers}
+
+    def element_scores(self) -> Tuple[Dict[Experiment, Dict[str, Dict[str, float]]],
+                                      Dict[str, Dict[Experiment, Dict[str, Dict[str, float]]]]]:
+        """
+        Returns:
+        - psyche_element_scores: {(client_num, exp_num): {element_name: {score, weighted_score}}}
+        - expert_element_scores: {validator: {(client_num, exp_num): {element_name: {score, weighted_score}}}}
+        """
+        psyche_element_scores = {}
+        expert_element_scores = {validator: {} for validator in self.validators}
+        for row in self.elements.itertuples(index=False):
+            value = {}
+            if not _missing(row.score):
+                value['score'] = row.score
+            if not _missing(row.weighted_score):
+                value['weighted_score'] = row.weighted_score
+            target = psyche_element_scores if row.rater == PSYCHE_RATER else expert_element_scores[row.rater]
+            target.setdefault((int(row.client_num), int(row.exp_num)), {})[row.element] = value
+        return psyche_element_scores, expert_element_scores
+
+    def category_scores(self, use_expert_weighted_score: bool = True):
+        """
+        Category-level scores (Subjective, Impulsivity, Behavior) weighted with CATEGORY_WEIGHTS.
+
+        Expert elements use their stored weighted_score when use_expert_weighted_score is set
+        (score × weight otherwise, as for PSYCHE).
+
+        Returns:
+        - psyche_category_scores: {(client_num, exp_num): {'Subjective': float, 'Impulsivity': float, 'Behavior': float}}
+        - expert_category_scores: {validator: {(client_num, exp_num): {...}}}
+        """
+        from evaluator import PSYCHE_RUBRIC
+        from weight_sensitivity import rubric_categories
+        categories = {element: category for element, category in rubric_categories(PSYCHE_RUBRIC).items()
+                      if category in CATEGORY_WEIGHTS}
+
+        def _category_totals(elements, use_weighted_score):
+            totals = {category: 0 for category in CATEGORY_WEIGHTS}
+            for element, value in elements.items():
+                category = categories.get(element)
+                if category is None:
+                    continue
+                if use_weighted_score and 'weighted_score' in value:
+                    totals[category] += value['weighted_score']
+                elif 'score' in value:
+                    totals[category] += value['score'] * CATEGORY_WEIGHTS[category]
+            return totals
+
+        psyche_el, expert_el = self.element_scores()
+        psyche_category_scores = {exp: _category_totals(psyche_el[exp], False)
+                                  for exp in self.experiment_numbers if exp in psyche_el}
+        expert_category_scores = {
+            validator: {exp: _category_totals(expert_el[validator][exp], use_expert_weighted_score)
+                        for exp in self.experiment_numbers if exp in expert_el[validator]}
+            for validator in self.validators
+        }
+        return psyche_category_scores, expert_category_scores
+
+    def piqsca_by_validator(self) -> Tuple[Dict[str, Dict[Experiment, float]], List[str]]:
+        """
+        Returns:
+        - piqsca_by_validator: {validator: {(client_num, exp_num): piqsca_score}}
+        - validators_found: validators who have PIQSCA data
+        """
+        piqsca_by_validator = {}
+        for row in self.piqsca.itertuples(index=False):
+            piqsca_by_validator.setdefault(row.validator, {})[(int(row.client_num), int(row.exp_num))] = row.piqsca
+        return piqsca_by_validator, list(piqsca_by_validator.keys())
+
+
+# ================================
+# Parsing (root snapshot -> tables)
+# ================================
+def _psyche_records(root_data: Dict[str, Any], client_num, exp_num) -> List[Tuple[str, Dict[str, Any]]]:
+    """Keys clients_<client>_psyche_..._<exp> in snapshot order (the model tag in between is ignored)."""
+    prefix = f"clients_{client_num}_psyche_"
+    suffix = f"_{exp_num}"
+    return [(key, data or {}) for key, data in root_data.items()
+            if key.startswith(prefix) and key.endswith(suffix)]
+
+
+def _element_rows(rater: str, exp: Experiment, element_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for element, value in element_data.items():
+        value = value if isinstance(value, dict) else {}
+        rows.append({
+            'rater': rater, 'client_num': exp[0], 'exp_num': exp[1], 'element': element,
+            'score': value.get('score'), 'weighted_score': value.get('weighted_score'),
+        })
+    return rows
+
+
+def build_analysis_dataset(root_data: Dict[str, Any], experiment_numbers: Sequence[Experiment],
+                           validators: Sequence[str], version: Optional[str] = None) -> AnalysisDataset:
+    """Parse a results snapshot (load_experiment_results output) into an AnalysisDataset."""
+    from evaluator import PSYCHE_RUBRIC
+    valid_elements = set(PSYCHE_RUBRIC.keys())
+    root_data = root_data or {}
+    experiment_numbers = tuple((int(c), int(e)) for c, e in experiment_numbers)
+    validators = tuple(validators)
+
+    experiment_rows, element_rows, psyche_keys = [], [], []
+    psyche_structure_sample = None
+    for exp in experiment_numbers:
+        records = _psyche_records(root_data, *exp)
+        psyche_keys.extend(key for key, _ in records)
+
+        # Score: first record carrying psyche_score; elements: first matching record
+        psyche_key, psyche_score = None, None
+        for key, record in records:
+            if 'psyche_score' in record:
+                psyche_key, psyche_score = key, record['psyche_score']
+                break
+        experiment_rows.append({'client_num': exp[0], 'exp_num': exp[1],
+                                'psyche_key': psyche_key, 'psyche_score': psyche_score})
+
+        if not records:
+            continue
+        key, record = records[0]
+        if psyche_structure_sample is None:
+            psyche_structure_sample = {
+                'key': key,
+                'top_level_keys': list(record.keys())[:10],
+                'has_elements': 'elements' in record
+            }
+        if 'elements' in record and isinstance(record['elements'], dict):
+            element_data = {k: v for k, v in record['elements'].items() if k in valid_elements}
+        else:
+            # Older records store element scores directly on the record
+            element_data = {k: v for k, v in record.items() if k in valid_elements and isinstance(v, dict)}
+        element_rows.extend(_element_rows(PSYCHE_RATER, exp, element_data))
+
+    expert_rows = []
+    for validator in validators:
+        sanitized_name = sanitize_firebase_key(validator)
+        for exp in experiment_numbers:
+            data = root_data.get(f"expert_{sanitized_name}_{exp[0]}_{exp[1]}", {}) or {}
+            if 'expert_score' in data:
+                score = data['expert_score']
+            else:
+                score = data.get('psyche_score')  # backward compatibility
+            if score is not None:
+                expert_rows.append({'validator': validator, 'client_num': exp[0], 'exp_num': exp[1],
+                                    'expert_score': score})
+            elements = data.get('elements') or {}
+            element_rows.extend(_element_rows(
+                validator, exp, {k: v for k, v in elements.items() if k in valid_elements}))
+
+    piqsca_rows = []
+    for key, data in root_data.items():
+        # piqsca_{validator_name}_{client_num}_{exp_num} (validator name may contain '_')
+        if not key.startswith('piqsca_') or not data:
+            continue
+        parts = key.split('_')
+        if len(parts) < 4:
+            continue
+        try:
+            exp_num = int(parts[-1])
+            client_num = int(parts[-2])
+        except ValueError:
+            continue
+        items = {item: data.get(item, 0) for item in PIQSCA_ITEMS}
+        piqsca_rows.append({'validator': '_'.join(parts[1:-2]), 'client_num': client_num, 'exp_num': exp_num,
+                            **items, 'piqsca': sum(items.values())})
+
+    return AnalysisDataset(
+        version=version or snapshot_version(root_data),
+        experiment_numbers=experiment_numbers,
+        validators=validators,
+        experiments=pd.DataFrame(experiment_rows, columns=['client_num', 'exp_num', 'psyche_key', 'psyche_score']),
+        expert_scores=pd.DataFrame(expert_rows, columns=['validator', 'client_num', 'exp_num', 'expert_score']),
+        elements=pd.DataFrame(element_rows, columns=['rater', 'client_num', 'exp_num', 'element',
+                                                     'score', 'weighted_score']),
+        piqsca=pd.DataFrame(piqsca_rows, columns=['validator', 'client_num', 'exp_num', *PIQSCA_ITEMS, 'piqsca']),
+        psyche_keys=tuple(psyche_keys),
+        psyche_structure_sample=psyche_structure_sample,
+    )
+
+
+# ================================
+# Shared Caches
+# ================================
+@st.cache_resource(ttl=SNAPSHOT_TTL_SECONDS, show_spinner=False)
+def load_results_snapshot(experiment_numbers: Tuple[Experiment, ...],
+                          include: Tuple[str, ...] = RESULT_PREFIXES) -> Tuple[str, Dict[str, Any]]:
+    """(version, snapshot) of the PSYCHE results + catalogued prefixes, shared across sessions."""
+    root_data = load_experiment_results(get_firebase_ref(), experiment_numbers, include=include)
+    return snapshot_version(root_data), root_data
+
+
+@st.cache_resource(ttl=SNAPSHOT_TTL_SECONDS, show_spinner=False)
+def load_catalog_snapshot(names: Tuple[str, ...]) -> Dict[str, Any]:
+    """Shared snapshot of catalogued prefixes (e.g. ('sp_validation',)); treat as read-only."""
+    return load_catalog(get_firebase_ref(), *names)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _dataset_for_version(version: str, experiment_numbers: Tuple[Experiment, ...], validators: Tuple[str, ...],
+                         _root_data: Dict[str, Any]) -> AnalysisDataset:
+    return build_analysis_dataset(_root_data, experiment_numbers, validators, version=version)
+
+
+def get_analysis_dataset(experiment_numbers: Sequence[Experiment], validators: Sequence[str]) -> AnalysisDataset:
+    """
+    Shared AnalysisDataset for the given experiments and validators.
+
+    Re-parsing happens only when the snapshot content changes; within
+    SNAPSHOT_TTL_SECONDS not even Firebase is read again.
+    """
+    experiment_numbers = tuple((int(c), int(e)) for c, e in experiment_numbers)
+    version, root_data = load_results_snapshot(experiment_numbers)
+    return _dataset_for_version(version, experiment_numbers, tuple(validators), root_data)
+
+
+def clear_analysis_cache():
+    """Drop the cached snapshots (next access reads Firebase again; unchanged data keeps its dataset)."""
+    load_results_snapshot.clear()
+    load_catalog_snapshot.clear()
+
+
+# ================================
+# Correlation statistics shared by the figure pages
+# ================================
+def ci_method_sidebar():
+    """Sidebar choice of the regression CI band used by regression_ci."""
+    st.sidebar.selectbox("Regression CI method", CI_METHODS, index=CI_METHODS.index(CI_METHOD), key='ci_method',
+                         help="t: t-distribution band / bootstrap: percentile band of resampled regression lines")
+
+
+def regression_ci(x_arr, y_arr, x_line, y_line, t_halfwidth):
+    """Regression-line 95% CI band: t-distribution or bootstrap (sidebar 'CI method')."""
+    return confidence_band(x_arr, y_arr, x_line, y_line, t_halfwidth,
+                           method=st.session_state.get('ci_method', CI_METHOD), n_resamples=BOOTSTRAP_RESAMPLES)
+
+
+def correlation_comparison_groups(experiment_numbers: Sequence[Experiment], model_by_exp: Dict[int, str],
+                                  disorder_map: Dict[int, str]) -> Dict[str, List[Experiment]]:
+    """Experiment groups for the PSYCHE-Expert correlation comparisons (model family, basic/guided, disorder)."""
+    models = {exp: model_by_exp.get(exp[1], 'unknown') for exp in experiment_numbers}
+    groups = {
+        'GPT': [exp for exp in experiment_numbers if models[exp].startswith('gpt')],
+        'Claude': [exp for exp in experiment_numbers if models[exp].startswith('claude')],
+        'Basic': [exp for exp in experiment_numbers if models[exp].endswith('smaller')],
+        'Guided': [exp for exp in experiment_numbers if models[exp].endswith('large')],
+    }
+    for client_num, disorder in disorder_map.items():
+        groups[disorder.upper()] = [exp for exp in experiment_numbers if exp[0] == client_num]
+    return groups
+
+
+def show_correlation_comparisons(psyche_scores: Dict, avg_expert_scores: Dict, groups: Dict[str, List[Experiment]]):
+    """Bootstrap CIs of r per group and permutation tests on the difference in r."""
+    st.caption(f"Bootstrap {BOOTSTRAP_RESAMPLES:,} resamples (95% percentile CI) · "
+               "two-sided permutation test on Δr = r(A) − r(B)")
+    rows = correlation_comparison_table(psyche_scores, avg_expert_scores, groups, CORRELATION_COMPARISONS,
+                                        n_resamples=BOOTSTRAP_RESAMPLES)
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    else:
+        st.info("비교할 데이터가 부족합니다 (그룹당 3개 이상 필요).")
@@ -0,0 +1,356 @@
+"""
+Batch Re-Evaluation
+PSYCHE RUBRIC / 채점 함수 변경 후 저장된 모든 실험을 한 번에 재채점
+
+Re-scores every stored experiment without opening the evaluation page once per
+client and experiment:
+1. one shallow key listing finds every clients_<c>_construct_sp_<c>_<exp> /
+   construct_paca_ pair and the stored PSYCHE results clients_<c>_psyche_..._<exp>
+2. field values of all experiments are collected into one DataFrame (one
+   ConstructIndex per construct)
+3. impulsivity / behavior / binary fields are scored for all experiments in one
+   vectorized pass (same rules as evaluator.score_*)
+4. g-eval fields of all experiments go through evaluator.g_eval_many (concurrent,
+   identical inputs scored once, G-Eval score cache)
+5. the new results replace the stored ones in one multi-path Firebase update, and
+   a diff against the previously stored scores is returned
+
+Experiments with constructs but no stored PSYCHE result are scored but not written
+(their result key, psyche_<diagnosis>_<model>_<exp>, is only chosen on the evaluation page).
+
+Usage:
+    python batch_evaluator.py --dry-run --diff-csv rubric_change.csv
+    python batch_evaluator.py --client 6201 --client 6202 --max-concurrency 8
+"""
+
+import argparse
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from evaluator import (PSYCHE_RUBRIC, G_EVAL_MAX_CONCURRENCY, ConstructIndex, g_eval_many, get_value_from_construct,
+                       normalize_value, split_multiple_values)
+from firebase_catalog import list_root_keys, load_keys
+from firebase_config import get_firebase_ref
+from llm_cache import CACHE_MODES, configure_llm_cache
+from llm_scheduler import configure_rate_limits, parse_rate_limits
+from firebase_utils import sanitize_dict
+
+Experiment = Tuple[str, str]
+
+# clients_<client>_construct_<sp|paca>_<client>_<exp>, as saved by firebase_utils.save_to_firebase
+CONSTRUCT_KEY_PATTERN = re.compile(r"^clients_([^_]+)_construct_(sp|paca)_[^_]+_(.+)$")
+
+# Rubric types scored by level difference (impulsivity: PACA - SP, behavior: |PACA - SP|)
+ORDINAL_TYPES = ("impulsivity", "behavior")
+
+PRESENCE_ALIASES = ['true', 'yes', 'presence', '+', '(+)']
+ABSENCE_ALIASES = ['false', 'no', 'absence', '-', '(-)']
+
+# Score changes smaller than this are not reported in the diff
+DIFF_TOLERANCE = 1e-9
+
+
+# ================================
+# Key discovery
+# ================================
+def find_construct_pairs(root_keys: Iterable[str], clients: Optional[Iterable[str]] = None
+                         ) -> Dict[Experiment, Tuple[str, str]]:
+    """{(client, exp): (sp_key, paca_key)} for experiments with both constructs stored."""
+    clients = {str(c) for c in clients} if clients else None
+    found: Dict[Experiment, Dict[str, str]] = {}
+    for key in root_keys:
+        match = CONSTRUCT_KEY_PATTERN.match(key)
+        if match and (clients is None or match.group(1) in clients):
+            found.setdefault((match.group(1), match.group(3)), {})[match.group(2)] = key
+    return {exp: (keys['sp'], keys['paca']) for exp, keys in sorted(found.items())
+            if 'sp' in keys and 'paca' in keys}
+
+
+def find_result_keys(root_keys: Iterable[str], experiments: Iterable[Experiment]) -> Dict[Experiment, List[str]]:
+    """Stored PSYCHE result keys clients_<client>_psyche_..._<exp> per experiment."""
+    root_keys = list(root_keys)
+    result_keys = {}
+    for client_num, exp_num in experiments:
+        prefix, suffix = f"clients_{client_num}_psyche_", f"_{exp_num}"
+        result_keys[(client_num, exp_num)] = [key for key in root_keys
+                                              if key.startswith(prefix) and key.endswith(suffix)]
+    return result_keys
+
+
+# ================================
+# Field table
+# ================================
+def build_field_frame(constructs: Dict[Experiment, Tuple[Dict[str, Any], Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    One row per (experiment, rubric field) with the SP / PACA values. Fields with
+    weight 0 are left out, as evaluator.evaluate_constructs leaves them out of its results.
+
+    Columns: client_num, exp_num, field, type, weight, sp_value, paca_value, missing
+    """
+    rows = []
+    for (client_num, exp_num), (sp_construct, paca_construct) in constructs.items():
+        sp_index, paca_index = ConstructIndex(sp_construct), ConstructIndex(paca_construct)
+        for field_name, rubric_entry in PSYCHE_RUBRIC.items():
+            if rubric_entry.get("weight", 1) <= 0:
+                continue
+            sp_value = get_value_from_construct(sp_index, field_name)
+            paca_value = get_value_from_construct(paca_index, field_name)
+            rows.append({
+                'client_num': client_num, 'exp_num': exp_num, 'field': field_name,
+                'type': rubric_entry.get("type", "g-eval"), 'weight': rubric_entry.get("weight", 1),
+                'sp_value': sp_value, 'paca_value': paca_value,
+                'missing': not sp_value or not paca_value,
+            })
+    columns = ['client_num', 'exp_num', 'field', 'type', 'weight', 'sp_value', 'paca_value', 'missing']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _map_unique(values: pd.Series, fn) -> pd.Series:
+    """values.map(fn), calling fn once per distinct str(value)."""
+    texts = values.map(str)
+    lookup = {text: fn(text) for text in texts.unique()}
+    return texts.map(lookup)
+
+
+def _level_table(types: Iterable[str]) -> pd.DataFrame:
+    """(field, normalized value) -> level for the rubric fields of `types` (normalized keys as in score_*)."""
+    rows = []
+    for field_name, rubric_entry in PSYCHE_RUBRIC.items():
+        if rubric_entry.get("type") in types:
+            for value, level in rubric_entry.get("values", {}).items():
+                if normalize_value(value) is not None:
+                    rows.append({'field': field_name, 'value': normalize_value(value), 'level': level})
+    table = pd.DataFrame(rows, columns=['field', 'value', 'level'])
+    return table.drop_duplicates(['field', 'value'], keep='last')
+
+
+# ================================
+# Vectorized deterministic scoring
+# ================================
+def score_ordinal_fields(frame: pd.DataFrame) -> pd.Series:
+    """
+    Impulsivity / behavior scores for the rows of `frame` (same rules as
+    evaluator.score_impulsivity / score_behavior): every PACA value is compared
+    with the SP level, the scores of the valid PACA values are averaged, and an
+    unknown SP value or no valid PACA value scores 0.
+    """
+    if frame.empty:
+        return pd.Series(dtype=float)
+    levels = _level_table(ORDINAL_TYPES).set_index(['field', 'value'])['level']
+
+    sp_norm = _map_unique(frame['sp_value'], normalize_value)
+    sp_level = pd.Series(levels.reindex(pd.MultiIndex.from_arrays([frame['field'], sp_norm])).to_numpy(),
+                         index=frame.index)
+
+    # One row per PACA value (multiple values are split as in split_multiple_values)
+    paca_parts = _map_unique(frame['paca_value'], lambda text: split_multiple_values(normalize_value(text)))
+    parts = pd.DataFrame({'row': frame.index, 'field': frame['field'], 'type': frame['type'],
+                          'part': paca_parts}).explode('part').dropna(subset=['part'])
+    parts['paca_level'] = levels.reindex(pd.MultiIndex.from_arrays([parts['field'], parts['part']])).to_numpy()
+    parts['sp_level'] = sp_level.reindex(parts['row']).to_numpy()
+    parts = parts.dropna(subset=['paca_level', 'sp_level'])
+
+    # impulsivity: Δ = PACA - SP (1 if Δ=0, 0.5 if Δ=1, else 0); behavior: same on |Δ|
+    delta = parts['paca_level'].to_numpy(dtype=float) - parts['sp_level'].to_numpy(dtype=float)
+    delta = np.where(parts['type'].to_numpy() == "behavior", np.abs(delta), delta)
+    parts['score'] = np.select([delta == 0, delta == 1], [1.0, 0.5], default=0.0)
+
+    return parts.groupby('row')['score'].mean().reindex(frame.index, fill_value=0.0)
+
+
+def _binary_norm(values: pd.Series) -> pd.Series:
+    norm = _map_unique(values, normalize_value).fillna("")
+    return norm.replace({**{alias: 'presence' for alias in PRESENCE_ALIASES},
+                         **{alias: 'absence' for alias in ABSENCE_ALIASES}})
+
+
+def score_binary_fields(frame: pd.DataFrame) -> pd.Series:
+    """Binary scores (same rules as evaluator.score_binary): 1 for a normalized / presence-absence match, else 0."""
+    if frame.empty:
+        return pd.Series(dtype=float)
+    return (_binary_norm(frame['sp_value']) == _binary_norm(frame['paca_value'])).astype(float)
+
+
+def score_g_eval_fields(frame: pd.DataFrame, max_concurrency: int = G_EVAL_MAX_CONCURRENCY,
+                        use_cache: bool = True) -> pd.Series:
+    """G-Eval scores of all g-eval rows at once (see evaluator.g_eval_many)."""
+    if frame.empty:
+        return pd.Series(dtype=float)
+    items = list(zip(frame['field'], frame['sp_value'], frame['paca_value']))
+    return pd.Series(g_eval_many(items, max_concurrency, use_cache), index=frame.index)
+
+
+def score_field_frame(frame: pd.DataFrame, max_concurrency: int = G_EVAL_MAX_CONCURRENCY,
+                      use_cache: bool = True) -> pd.DataFrame:
+    """Add score / method / weighted_score columns to a build_field_frame table."""
+    frame = frame.copy()
+    frame['score'] = 0.0
+    frame['method'] = "UNKNOWN_TYPE"
+    frame.loc[frame['missing'], 'method'] = "MISSING_VALUE"
+
+    present = ~frame['missing']
+    rows = present & frame['type'].isin(ORDINAL_TYPES)
+    frame.loc[rows, 'score'] = score_ordinal_fields(frame[rows])
+    frame.loc[rows, 'method'] = frame.loc[rows, 'type'].str.capitalize()
+
+    rows = present & (frame['type'] == "binary")
+    frame.loc[rows, 'score'] = score_binary_fields(frame[rows])
+    frame.loc[rows, 'method'] = "Binary"
+
+    rows = present & (frame['type'] == "g-eval")
+    frame.loc[rows, 'score'] = score_g_eval_fields(frame[rows], max_concurrency, use_cache)
+    frame.loc[rows, 'method'] = "G-Eval"
+
+    frame['weighted_score'] = frame['score'] * frame['weight']
+    return frame
+
+
+# ================================
+# Results and diff
+# ================================
+def evaluation_records(scored: pd.DataFrame) -> Dict[Experiment, Dict[str, Any]]:
+    """Per-experiment result dicts in the format the evaluation page saves (fields + psyche_score)."""
+    records = {}
+    for (client_num, exp_num), group in scored.groupby(['client_num', 'exp_num'], sort=False):
+        evaluation_data = {
+            row.field: {
+                'sp_content': str(row.sp_value) if row.sp_value is not None else '',
+                'paca_content': str(row.paca_value) if row.paca_value is not None else '',
+                'score': float(row.score),
+                'weight': row.weight,
+                'weighted_score': float(row.weighted_score),
+            }
+            for row in group.itertuples(index=False)
+        }
+        evaluation_data['psyche_score'] = float(group['weighted_score'].sum())
+        records[(client_num, exp_num)] = evaluation_data
+    return records
+
+
+def _stored_score(stored: Dict[str, Any], field_name: str) -> Optional[float]:
+    value = stored.get(field_name)
+    if field_name == 'psyche_score':
+        return None if value is None else float(value)
+    return float(value['score']) if isinstance(value, dict) and value.get('score') is not None else None
+
+
+def diff_scores(records: Dict[Experiment, Dict[str, Any]], result_keys: Dict[Experiment, List[str]],
+                stored_results: Dict[str, Any], tolerance: float = DIFF_TOLERANCE) -> pd.DataFrame:
+    """
+    Changed scores per stored result key (fields and psyche_score).
+
+    Columns: key, client_num, exp_num, field, stored_score (NaN if absent), new_score, change
+    """
+    rows = []
+    for exp, evaluation_data in records.items():
+        for key in result_keys.get(exp, []):
+            stored = stored_results.get(key) or {}
+            for field_name, new_value in evaluation_data.items():
+                new_score = new_value if field_name == 'psyche_score' else new_value['score']
+                stored_score = _stored_score(stored, field_name)
+                if stored_score is not None and abs(new_score - stored_score) <= tolerance:
+                    continue
+                rows.append({
+                    'key': key, 'client_num': exp[0], 'exp_num': exp[1], 'field': field_name,
+                    'stored_score': np.nan if stored_score is None else stored_score,
+                    'new_score': new_score,
+                    'change': np.nan if stored_score is None else new_score - stored_score,
+                })
+    columns = ['key', 'client_num', 'exp_num', 'field', 'stored_score', 'new_score', 'change']
+    return pd.DataFrame(rows, columns=columns)
+
+
+# ================================
+# Batch run
+# ================================
+def batch_reevaluate(firebase_ref, clients: Optional[Iterable[str]] = None,
+                     max_concurrency: int = G_EVAL_MAX_CONCURRENCY, use_cache: bool = True,
+                     dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Re-score every stored SP / PACA construct pair and write the results back.
+
+    Returns:
+        - scores: scored field table (score_field_frame)
+        - diff: diff_scores against the previously stored results
+        - written: result keys updated in Firebase (none with dry_run)
+        - unsaved: experiments without a stored PSYCHE result key
+    """
+    root_keys = list_root_keys(firebase_ref)
+    pairs = find_construct_pairs(root_keys, clients)
+    result_keys = find_result_keys(root_keys, pairs)
+
+    all_result_keys = [key for keys in result_keys.values() for key in keys]
+    loaded = load_keys(firebase_ref, [key for keys in pairs.values() for key in keys] + all_result_keys)
+    constructs = {exp: (loaded.get(sp_key), loaded.get(paca_key)) for exp, (sp_key, paca_key) in pairs.items()}
+    constructs = {exp: pair for exp, pair in constructs.items() if pair[0] and pair[1]}
+
+    scored = score_field_frame(build_field_frame(constructs), max_concurrency, use_cache)
+    records = evaluation_records(scored)
+    diff = diff_scores(records, result_keys, loaded)
+
+    updates = {key: sanitize_dict(records[exp]) for exp, keys in result_keys.items() if exp in records
+               for key in keys}
+    if updates and not dry_run:
+        firebase_ref.update(updates)
+
+    return {
+        'scores': scored,
+        'diff': diff,
+        'written': [] if dry_run else sorted(updates),
+        'unsaved': sorted(exp for exp in records if not result_keys.get(exp)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score every stored experiment against the current PSYCHE RUBRIC.")
+    parser.add_argument("--client", action="append", default=[], help="Only this client number (repeatable)")
+    parser.add_argument("--max-concurrency", type=int, default=G_EVAL_MAX_CONCURRENCY,
+                        help="G-Eval requests in flight at once")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the G-Eval score cache")
+    parser.add_argument("--dry-run", action="store_true", help="Score and diff only, do not write results")
+    parser.add_argument("--diff-csv", help="Write the score diff to this CSV file")
+    parser.add_argument("--llm-cache", choices=CACHE_MODES,
+                        help="LLM response cache mode (default: PSYCHE_LLM_CACHE_MODE or passthrough)")
+    parser.add_argument("--rate-limit", action="append", default=[], type=parse_rate_limits,
+                        metavar="PROVIDER[:MODEL]=RPM/TPM",
+                        help="LLM quota, e.g. openai=5000/2000000 (repeatable; default: PSYCHE_LLM_RATE_LIMITS)")
+    args = parser.parse_args()
+
+    if args.llm_cache:
+        configure_llm_cache(args.llm_cache)
+    for limits in args.rate_limit:
+        configure_rate_limits(limits)
+
+    firebase_ref = get_firebase_ref()
+    if firebase_ref is None:
+        print("Firebase reference not available")
+        return 1
+
+    started = time.time()
+    result = batch_reevaluate(firebase_ref, clients=args.client or None, max_concurrency=args.max_concurrency,
+                              use_cache=not args.no_cache, dry_run=args.dry_run)
+
+    diff = result['diff']
+    experiments = result['scores'][['client_num', 'exp_num']].drop_duplicates()
+    print(f"Scored {len(experiments)} experiment(s) in {time.time() - started:.0f}s")
+    if diff.empty:
+        print("No score changes.")
+    else:
+        print(diff.to_string(index=False))
+    if args.diff_csv:
+        diff.to_csv(args.diff_csv, index=False)
+    if args.dry_run:
+        print(f"\nDry run: {diff['key'].nunique()} stored result key(s) would change")
+    else:
+        print(f"\nUpdated {len(result['written'])} result key(s)")
+    for client_num, exp_num in result['unsaved']:
+        print(f"No stored PSYCHE result for client={client_num} exp={exp_num} (not written)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+"""
+Lazy Client Registry
+LLM 클라이언트와 Firebase reference를 처음 사용할 때 생성 (페이지 로딩 시간 단축)
+
+Modules register a factory per client when they are imported, which is cheap: no
+provider SDK (langchain_openai / langchain_anthropic / langchain_ollama) is imported
+and nothing is constructed. get_client(name) builds the client on first use, once per
+process, and every caller shares that instance afterwards:
+
+    register_llm("sp.llm", lambda: chat_openai(temperature=0.7, model="gpt-5.1-2025-11-13"))
+    ...
+    chain = prompt | get_client("sp.llm")
+
+LLM factories registered through register_llm() install the record/replay LLM cache
+(llm_cache.py) before the first client is built. The Firebase root reference is the
+built-in "firebase" client (see shared_firebase_ref).
+"""
+
+import threading
+from typing import Any, Callable, Dict, List
+
+FIREBASE_CLIENT = "firebase"
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_clients: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def register_client(name: str, factory: Callable[[], Any], replace: bool = False):
+    """
+    Register the factory of a named client. Re-registering an existing name is a no-op
+    (e.g. on module reload) unless replace=True, which also drops the built instance.
+    """
+    with _lock:
+        if name in _factories and not replace:
+            return
+        _factories[name] = factory
+        _clients.pop(name, None)
+
+
+def register_llm(name: str, factory: Callable[[], Any], replace: bool = False):
+    """register_client for chat models: the LLM cache is configured before the factory runs."""
+    def build():
+        from llm_cache import configure_llm_cache
+        configure_llm_cache()
+        return factory()
+
+    register_client(name, build, replace=replace)
+
+
+def get_client(name: str) -> Any:
+    """The shared instance of a registered client, built on first use (None results are not kept)."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        if name not in _clients:
+            if name not in _factories:
+                raise KeyError(f"Unknown client '{name}'. Registered: {sorted(_factories)}")
+            client = _factories[name]()
+            if client is None:
+                return None
+            _clients[name] = client
+        return _clients[name]
+
+
+def built_clients() -> List[str]:
+    """Names of the clients that have been created so far."""
+    with _lock:
+        return sorted(_clients)
+
+
+def reset_clients(*names: str):
+    """Drop built instances (all when no name is given) so the next get_client() rebuilds them."""
+    with _lock:
+        for name in names or list(_clients):
+            _clients.pop(name, None)
+
+
+# ================================
+# Built-in clients and provider helpers
+# ================================
+def _firebase_ref():
+    from firebase_config import get_firebase_ref
+    return get_firebase_ref()
+
+
+register_client(FIREBASE_CLIENT, _firebase_ref)
+
+
+def shared_firebase_ref():
+    """Firebase root reference, initialized on first use (a failed initialization is retried next time)."""
+    return get_client(FIREBASE_CLIENT)
+
+
+def _stream_to_stdout(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if kwargs.pop("stream_to_stdout", False):
+        from langchain_core.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+        kwargs["callbacks"] = [StreamingStdOutCallbackHandler()]
+    return kwargs
+
+
+def chat_openai(**kwargs):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(**_stream_to_stdout(kwargs))
+
+
+def chat_anthropic(**kwargs):
+    from langchain_anthropic import ChatAnthropic
+    return ChatAnthropic(**_stream_to_stdout(kwargs))
+
+
+def chat_ollama(**kwargs):
+    from langchain_ollama import ChatOllama
+    return ChatOllama(**_stream_to_stdout(kwargs))
@@ -0,0 +1,26 @@
+"""
+Shared pytest fixtures
+The bundled client-simulation-default-rtdb-*-export.json dumps, keyed by their RTDB root key
+"""
+
+import glob
+import json
+import os
+import re
+
+import pytest
+
+from local_rtdb import EXPORT_PATTERN
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def bundled_exports():
+    """{root key: exported value} of every bundled export, in root key order (a fresh copy per test)."""
+    exports = {}
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, EXPORT_PATTERN))):
+        key = re.fullmatch(r"client-simulation-default-rtdb-(.+)-export\.json", os.path.basename(path)).group(1)
+        with open(path, "r", encoding="utf-8") as f:
+            exports[key] = json.load(f)
+    return exports
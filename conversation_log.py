@@ -0,0 +1,196 @@
+"""
+Streaming Conversation Log
+대화 턴을 생성되는 즉시 conversation_log_* 에 저장 (중단된 실험 이어서 진행 가능)
+
+Turns are written as child entries of the existing log key,
+
+    clients_<c>_conversation_log_<c>_<exp>/data/<index> = {speaker, message}
+
+so each save sends only the new turns, and a finished log has the same shape as one
+saved in a single blob ('data' is read back as a list). The run metadata (versions,
+timestamp, total_turns, stop_reason) is merged into the same key by the final save.
+The writer's first flush marks the log status "in_progress" and the final save sets it
+to "complete"; only a log still marked "in_progress" is an unfinished run that can be
+resumed (logs saved in one blob, e.g. before streaming existed, carry no status):
+
+    turns = load_unfinished_conversation(firebase_ref, client_number, exp_number)
+    restore_memories(turns, paca_memory, sp_memory)
+    writer = ConversationLogWriter(firebase_ref, client_number, exp_number, start_index=len(turns))
+    for speaker, message in resume_conversation(paca_agent, sp_agent, turns):
+        writer.append(speaker, message)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+from firebase_utils import firebase_data_key, load_from_firebase, sanitize_dict
+
+Turn = Tuple[str, str]
+
+# Turns buffered before a write (1 = every turn is saved as soon as it is generated)
+DEFAULT_FLUSH_EVERY = 1
+
+# Values of a log's 'status' field
+LOG_STATUS_IN_PROGRESS = "in_progress"
+LOG_STATUS_COMPLETE = "complete"
+
+
+def conversation_log_type(client_number, exp_number) -> str:
+    """data_type of an experiment's conversation log (see firebase_utils.save_to_firebase)."""
+    return f"conversation_log_{client_number}_{exp_number}"
+
+
+def log_turns(log: Optional[Dict[str, Any]]) -> List[Turn]:
+    """(speaker, message) turns of a stored conversation log, in order."""
+    data = (log or {}).get('data') or []
+    if isinstance(data, dict):
+        # Sparse indices come back as a dict keyed by the index string
+        data = [data[key] for key in sorted(data, key=int)]
+    return [(entry.get('speaker'), entry.get('message')) for entry in data if isinstance(entry, dict)]
+
+
+def is_unfinished(log: Optional[Dict[str, Any]]) -> bool:
+    """A streamed log whose run was never completed (still marked in_progress by its writer)."""
+    return bool(log) and log.get('status') == LOG_STATUS_IN_PROGRESS
+
+
+def load_unfinished_conversation(firebase_ref, client_number, exp_number) -> Optional[List[Turn]]:
+    """Persisted turns of an unfinished run, or None when there is nothing to resume."""
+    log = load_from_firebase(firebase_ref, client_number, conversation_log_type(client_number, exp_number))
+    return log_turns(log) if is_unfinished(log) else None
+
+
+class ConversationLogWriter:
+    """
+    Append-only writer for one conversation log.
+
+    append() buffers a turn and writes the buffer every `flush_every` turns with one
+    update() of only the new data/<index> children. A failed write keeps the buffer,
+    so the turns are retried on the next flush. The first write also sets the log's
+    status to in_progress; the final save sets it to complete.
+    """
+
+    def __init__(self, firebase_ref, client_number, exp_number, flush_every: int = DEFAULT_FLUSH_EVERY,
+                 start_index: int = 0):
+        self.firebase_ref = firebase_ref
+        self.client_number = client_number
+        self.exp_number = exp_number
+        self.data_type = conversation_log_type(client_number, exp_number)
+        self.key = firebase_data_key(client_number, self.data_type)
+        self.flush_every = max(1, flush_every)
+        self.written = start_index
+        self._buffer: List[Turn] = []
+        self._status_written = False
+
+    def append(self, speaker: str, message: str):
+        self._buffer.append((speaker, message))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def extend(self, turns: Iterable[Turn]):
+        for speaker, message in turns:
+            self.append(speaker, message)
+
+    @property
+    def total_turns(self) -> int:
+        return self.written + len(self._buffer)
+
+    def pending_updates(self) -> Dict[str, Any]:
+        """
+        Buffered turns as {data/<index>: turn} paths relative to the log key. Values are not
+        sanitized yet: pass them to save_many_to_firebase(merge_items=...), which sanitizes them.
+        """
+        return {
+            f"data/{self.written + i}": {'speaker': speaker, 'message': message}
+            for i, (speaker, message) in enumerate(self._buffer)
+        }
+
+    def mark_flushed(self):
+        """Record that pending_updates() was committed by the caller (e.g. with the final save)."""
+        self.written += len(self._buffer)
+        self._buffer = []
+
+    def clear(self):
+        """Delete the stored log (before re-running an experiment number from scratch)."""
+        if self.firebase_ref is not None:
+            self.firebase_ref.child(self.key).delete()
+        self.written = 0
+        self._buffer = []
+        self._status_written = False
+
+    def truncate(self, total_turns: int):
+        """Drop stored turns from index total_turns on (e.g. turns newer than the checkpoint a run resumes from)."""
+        self._buffer = []
+        if total_turns >= self.written:
+            return
+        if self.firebase_ref is not None:
+            self.firebase_ref.child(self.key).update({f"data/{i}": None for i in range(total_turns, self.written)})
+        self.written = total_turns
+
+    def flush(self) -> bool:
+        if not self._buffer:
+            return True
+        if self.firebase_ref is None:
+            return False
+        updates = {path: sanitize_dict(turn) for path, turn in self.pending_updates().items()}
+        if not self._status_written:
+            updates['status'] = LOG_STATUS_IN_PROGRESS
+        try:
+            self.firebase_ref.child(self.key).update(updates)
+        except Exception as e:
+            st.warning(f"Failed to save conversation turns to Firebase (will retry): {str(e)}")
+            return False
+        self._status_written = True
+        self.mark_flushed()
+        return True
+
+
+def restore_memories(turns: Sequence[Turn], paca_memory, sp_memory):
+    """
+    Rebuild both agents' chat histories from persisted turns exactly as the run left
+    them: the greeting seeded into both memories, then every agent call's
+    (question, answer) pair in its own memory. The SP agent's recall-failure state is
+    not replayed.
+    """
+    paca_memory.clear()
+    sp_memory.clear()
+    if not turns:
+        return
+    paca_memory.add_ai_message(turns[0][1])
+    sp_memory.add_user_message(turns[0][1])
+    for (_, question), (speaker, answer) in zip(turns, turns[1:]):
+        memory = paca_memory if speaker == "PACA" else sp_memory
+        memory.add_user_message(question)
+        memory.add_ai_message(answer)
+
+
+def resume_conversation(paca_agent, sp_agent, turns: Sequence[Turn], max_turns: int = 300,
+                        termination_detector=None):
+    """
+    Continue simulate_conversation after the persisted `turns` (greeting included);
+    yields only the new turns. max_turns counts the whole run, as in simulate_conversation.
+    The agents' memories must already hold `turns` (see restore_memories).
+    """
+    if termination_detector is not None:
+        yield from termination_detector.watch(
+            resume_conversation(paca_agent, sp_agent, turns, max_turns), history=turns)
+        return
+
+    if not turns:
+        return
+    current_speaker = "PACA" if turns[-1][0] == "SP" else "SP"
+    current_message = turns[-1][1]
+
+    # simulate_conversation yields the greeting plus one turn per iteration
+    for _ in range(max_turns - (len(turns) - 1)):
+        if current_speaker == "SP":
+            response = sp_agent(current_message)
+            yield ("SP", response)
+            current_speaker = "PACA"
+        else:
+            response = paca_agent(current_message, is_initial_prompt=False)
+            yield ("PACA", response)
+            current_speaker = "SP"
+
+        current_message = response
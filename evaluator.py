@@ -1,12 +1,26 @@
 import pandas as pd
 import json
 import re
-from typing import Dict, Any, List, Tuple
-from langchain_openai import ChatOpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.prompts import PromptTemplate
 import streamlit as st
+from client_registry import chat_openai, get_client, register_llm
+from g_eval_cache import GEvalScoreCache, prompt_template_version
+from llm_scheduler import LLMUnavailableError, scheduled_invoke
 
-llm = ChatOpenAI(temperature=0, model="gpt-4")
+# Judge model, created on first use (client_registry.py); calls go through the LLM cache
+JUDGE_MODEL = "gpt-4"
+EVALUATOR_LLM = "evaluator.llm"
+register_llm(EVALUATOR_LLM, lambda: chat_openai(temperature=0, model=JUDGE_MODEL))
+
+
+def __getattr__(name):
+    # Former module-level client, now created lazily
+    if name == "llm":
+        return get_client(EVALUATOR_LLM)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================================================
@@ -163,50 +177,141 @@ def flatten_construct(construct: Dict[str, Any], parent_key='') -> Dict[str, Any
     return items
 
 
-def get_value_from_construct(construct: Dict[str, Any], field_name: str) -> Any:
+# Rubric fields aggregated over Present illness -> symptom_n (field -> key in each symptom dict)
+SYMPTOM_FIELDS = {
+    'symptom name': 'name',
+    'alleviating factor': 'alleviating factor',
+    'exacerbating factor': 'exacerbating factor',
+    'length': 'length',
+}
+
+# Rubric fields aggregated over Family history (field -> numbered key prefix, un-numbered legacy key)
+FAMILY_HISTORY_FIELDS = {
+    'diagnosis': ('diagnosis_', 'diagnosis'),
+    'substance use': ('substance_use_', 'substance use'),
+}
+
+_EMPTY_VALUES = ['none', 'n/a', 'null']
+
+
+def _is_filled(value) -> bool:
+    return bool(value) and bool(str(value).strip()) and str(value).lower() not in _EMPTY_VALUES
+
+
+def _bullet_list(values: List[str]) -> Optional[str]:
+    return '\n'.join(f"- {val}" for val in values) if values else None
+
+
+def _max_length(values: List[str]) -> Optional[str]:
+    try:
+        lengths = [int(v) for v in values if v.replace('-', '').isdigit()]
+        if lengths:
+            return str(max(lengths))
+    except:
+        pass
+    return None
+
+
+def _symptom_views(present_illness: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """All SYMPTOM_FIELDS values of one Present illness section, collected in a single walk."""
+    collected = {field: [] for field in SYMPTOM_FIELDS}
+    for key in sorted(present_illness.keys()):
+        symptom_data = present_illness[key]
+        if not key.startswith('symptom_') or not isinstance(symptom_data, dict):
+            continue
+        for field, actual_key in SYMPTOM_FIELDS.items():
+            value = symptom_data.get(actual_key)
+            if value:
+                collected[field].append(str(value))
+
+    views = {field: _bullet_list(values) for field, values in collected.items()}
+    # For 'length', the maximum value instead of a list
+    views['length'] = _max_length(collected['length']) if collected['length'] else None
+    return views
+
+
+def _family_history_views(family_history: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """All FAMILY_HISTORY_FIELDS values of one Family history section, collected in a single walk."""
+    collected = {field: [] for field in FAMILY_HISTORY_FIELDS}
+    for key in sorted(family_history.keys()):
+        for field, (key_prefix, _) in FAMILY_HISTORY_FIELDS.items():
+            if key.startswith(key_prefix) and _is_filled(family_history[key]):
+                collected[field].append(str(family_history[key]))
+
+    # Also check for non-numbered keys (diagnosis, substance use) - for backward compatibility
+    for field, (_, legacy_key) in FAMILY_HISTORY_FIELDS.items():
+        val = family_history.get(legacy_key)
+        if legacy_key in family_history and _is_filled(val) and str(val) not in collected[field]:
+            collected[field].append(str(val))
+
+    return {field: _bullet_list(values) for field, values in collected.items()}
+
+
+class ConstructIndex:
+    """
+    Lookup index over one construct, built in a single pass.
+
+    Holds the case-insensitive top-level keys, the flattened construct keyed by
+    lowercase path and by normalized last path component, and the pre-aggregated
+    symptom / family-history views, so each field lookup is a dict access instead
+    of a re-flatten of the whole construct. Build one per construct and pass it to
+    get_value_from_construct for every field.
+    """
+
+    def __init__(self, construct: Dict[str, Any]):
+        self.construct = construct
+        self.top_level: Dict[str, Any] = {}
+        self.paths: Dict[str, Any] = {}
+        self.last_parts: Dict[str, Any] = {}
+
+        # First match wins, in construct order (same as the former linear scans)
+        for key, val in construct.items():
+            self.top_level.setdefault(key.lower(), val)
+        for key, val in flatten_construct(construct).items():
+            self.paths.setdefault(key.lower(), val)
+            self.last_parts.setdefault(key.split('.')[-1].lower().replace(' ', '_'), val)
+
+        present_illness = construct.get('Present illness', {})
+        self.symptoms = _symptom_views(present_illness) if isinstance(present_illness, dict) and present_illness else {}
+        family_history = construct.get('Family history', {})
+        self.family_history = (_family_history_views(family_history)
+                               if isinstance(family_history, dict) and family_history else {})
+
+    def get(self, field_name: str) -> Any:
+        field_lower = field_name.lower()
+
+        # Special handling for symptom-related and Family history fields
+        if field_lower in SYMPTOM_FIELDS:
+            return self.symptoms.get(field_lower)
+        if field_lower in FAMILY_HISTORY_FIELDS:
+            return self.family_history.get(field_lower)
+
+        # Top-level field, then full flattened path
+        if field_lower in self.top_level:
+            return self.top_level[field_lower]
+        if field_lower in self.paths:
+            return self.paths[field_lower]
+
+        # Match on last part of key path (handles both "triggering factor" and "triggering_factor")
+        return self.last_parts.get(field_lower.replace(' ', '_'))
+
+
+def get_value_from_construct(construct, field_name: str) -> Any:
     """
     Retrieve value from construct by field name (case-insensitive, nested-aware).
     Returns the value as-is (could be string, list, dict, etc.) or None if not found.
     
+    construct may be a ConstructIndex; when looking up several fields of the same
+    construct, build the index once and pass it instead of the dict.
+    
     Special handling for symptom fields: collects all symptom_1, symptom_2, etc. into a combined text.
     Special handling for family history fields: collects all diagnosis_n, substance_use_n into combined text.
     """
     if construct is None:
         return None
-    
-    # Special handling for symptom-related fields
-    if field_name.lower() in ['symptom name', 'alleviating factor', 'exacerbating factor', 'length']:
-        return get_symptom_field_value(construct, field_name)
-    
-    # Special handling for Family history fields
-    if field_name.lower() == 'diagnosis':
-        return get_family_history_field_value(construct, 'diagnosis')
-    if field_name.lower() == 'substance use':
-        return get_family_history_field_value(construct, 'substance use')
-    
-    # First, try direct access to top-level fields
-    field_lower = field_name.lower()
-    for key, val in construct.items():
-        if key.lower() == field_lower:
-            return val
-    
-    # Then flatten and search
-    flat = flatten_construct(construct)
-    
-    # Direct exact match
-    for key, val in flat.items():
-        if key.lower() == field_lower:
-            return val
-    
-    # Match on last part of key path (handles both "triggering factor" and "triggering_factor")
-    field_normalized = field_lower.replace(' ', '_')
-    for key, val in flat.items():
-        last_part = key.split('.')[-1].lower()
-        last_part_normalized = last_part.replace(' ', '_')
-        if last_part == field_lower or last_part_normalized == field_normalized:
-            return val
-    
-    return None
+    if not isinstance(construct, ConstructIndex):
+        construct = ConstructIndex(construct)
+    return construct.get(field_name)
 
 
 def get_family_history_field_value(construct: Dict[str, Any], field_type: str) -> str:
@@ -223,42 +328,7 @@ def get_family_history_field_value(construct: Dict[str, Any], field_type: str) -
     family_history = construct.get('Family history', {})
     if not family_history:
         return None
-    
-    values = []
-    
-    # Determine the key prefix to search for
-    if field_type.lower() == 'diagnosis':
-        key_prefix = 'diagnosis_'
-    elif field_type.lower() == 'substance use':
-        key_prefix = 'substance_use_'
-    else:
-        return None
-    
-    # Iterate through keys to find diagnosis_1, diagnosis_2, etc. or substance_use_1, substance_use_2, etc.
-    for key in sorted(family_history.keys()):
-        if key.startswith(key_prefix):
-            value = family_history[key]
-            if value and str(value).strip() and str(value).lower() not in ['none', 'n/a', 'null']:
-                values.append(str(value))
-    
-    # Also check for non-numbered keys (diagnosis, substance use) - for backward compatibility
-    if field_type.lower() == 'diagnosis' and 'diagnosis' in family_history:
-        val = family_history['diagnosis']
-        if val and str(val).strip() and str(val).lower() not in ['none', 'n/a', 'null']:
-            if str(val) not in values:  # Avoid duplicates
-                values.append(str(val))
-    elif field_type.lower() == 'substance use' and 'substance use' in family_history:
-        val = family_history['substance use']
-        if val and str(val).strip() and str(val).lower() not in ['none', 'n/a', 'null']:
-            if str(val) not in values:  # Avoid duplicates
-                values.append(str(val))
-    
-    # Combine all values
-    if not values:
-        return None
-    
-    # Return as bullet points for better readability
-    return '\n'.join(f"- {val}" for val in values)
+    return _family_history_views(family_history).get(field_type.lower())
 
 
 def get_symptom_field_value(construct: Dict[str, Any], field_name: str) -> str:
@@ -276,57 +346,14 @@ def get_symptom_field_value(construct: Dict[str, Any], field_name: str) -> str:
     present_illness = construct.get('Present illness', {})
     if not present_illness:
         return None
-    
-    # Collect all symptom_n entries
-    symptom_values = []
-    
-    # Iterate through keys to find symptom_1, symptom_2, etc.
-    for key in sorted(present_illness.keys()):
-        if key.startswith('symptom_'):
-            symptom_data = present_illness[key]
-            if isinstance(symptom_data, dict):
-                # Map field_name to actual key in symptom dict
-                field_map = {
-                    'symptom name': 'name',
-                    'alleviating factor': 'alleviating factor',
-                    'exacerbating factor': 'exacerbating factor',
-                    'length': 'length'
-                }
-                
-                actual_key = field_map.get(field_name.lower())
-                if actual_key and actual_key in symptom_data:
-                    value = symptom_data[actual_key]
-                    if value:
-                        symptom_values.append(str(value))
-    
-    # Combine all values
-    if not symptom_values:
-        return None
-    
-    # For 'length', return the maximum value
-    if field_name.lower() == 'length':
-        try:
-            lengths = [int(v) for v in symptom_values if v.replace('-', '').isdigit()]
-            if lengths:
-                return str(max(lengths))
-        except:
-            pass
-        return None
-    
-    # For text fields, return as bullet points for better readability
-    return '\n'.join(f"- {val}" for val in symptom_values)
+    return _symptom_views(present_illness).get(field_name.lower())
 
 
 # ============================================================================
 # SCORING FUNCTIONS
 # ============================================================================
 
-def g_eval(field_name: str, sp_text: str, paca_text: str) -> float:
-    """G-Eval scoring using LLM."""
-    if not sp_text or not paca_text:
-        return 0.0
-    
-    prompt_template = """Task: Compare two psychiatric assessment texts for similarity.
+G_EVAL_PROMPT = """Task: Compare two psychiatric assessment texts for similarity.
 
 Original (SP): {original_text}
 
@@ -337,31 +364,183 @@ Score between 0 (completely different) and 1 (identical in meaning).
 
 Return ONLY a single float between 0 and 1."""
 
+G_EVAL_BATCH_PROMPT = """Task: Compare pairs of psychiatric assessment texts for similarity, one pair per field.
+
+{field_pairs}
+
+For each field, evaluate on accuracy, completeness, and meaning preservation.
+Score between 0 (completely different) and 1 (identical in meaning).
+
+Return ONLY a JSON object mapping each field name to a single float between 0 and 1."""
+
+# How g-eval fields are scored in evaluate_constructs
+G_EVAL_MODES = ("serial", "concurrent", "batched")
+# Parallel g-eval requests in concurrent mode
+G_EVAL_MAX_CONCURRENCY = 6
+
+# One score cache per judge prompt template version (see g_eval_cache.py)
+_g_eval_caches: Dict[str, GEvalScoreCache] = {}
+_g_eval_caches_lock = threading.Lock()
+
+
+def parse_g_eval_score(result: str) -> float:
+    """Extract the float score from a g-eval response (0.0 if none)."""
+    match = re.search(r'(0?\.\d+|1\.0|1)', result.strip())
+    if match:
+        score = float(match.group(1))
+        return max(0, min(1, score))
+    return 0.0
+
+
+def request_g_eval(sp_text: str, paca_text: str) -> float:
+    """One g-eval LLM request (raises on API errors; no Streamlit calls, safe in worker threads)."""
     prompt = PromptTemplate(
         input_variables=["original_text", "generated_text"],
-        template=prompt_template
+        template=G_EVAL_PROMPT
     )
     
+    llm = get_client(EVALUATOR_LLM)
     chain = prompt | llm
     
-    try:
-        response = chain.invoke({
-            "original_text": sp_text,
-            "generated_text": paca_text,
-        })
-        
-        result = response.content if hasattr(response, 'content') else str(response)
-        
-        # Extract float from response
-        match = re.search(r'(0?\.\d+|1\.0|1)', result.strip())
-        if match:
-            score = float(match.group(1))
-            return max(0, min(1, score))
-        
+    response = scheduled_invoke(chain, {
+        "original_text": sp_text,
+        "generated_text": paca_text,
+    }, llm=llm)
+    
+    result = response.content if hasattr(response, 'content') else str(response)
+    return parse_g_eval_score(result)
+
+
+def get_g_eval_cache(template: str = G_EVAL_PROMPT) -> GEvalScoreCache:
+    """Shared score cache for one judge prompt template (Firebase-backed when available)."""
+    version = prompt_template_version(template)
+    with _g_eval_caches_lock:
+        if version not in _g_eval_caches:
+            from firebase_config import get_firebase_ref
+            _g_eval_caches[version] = GEvalScoreCache(
+                get_firebase_ref(), model=JUDGE_MODEL, prompt_version=version)
+        return _g_eval_caches[version]
+
+
+def g_eval(field_name: str, sp_text: str, paca_text: str, use_cache: bool = True) -> float:
+    """G-Eval scoring using LLM (identical inputs are served from the score cache)."""
+    if not sp_text or not paca_text:
         return 0.0
+    
+    cache = get_g_eval_cache() if use_cache else None
+    if cache is not None:
+        cached_score = cache.get(field_name, sp_text, paca_text)
+        if cached_score is not None:
+            return cached_score
+    
+    try:
+        score = request_g_eval(sp_text, paca_text)
+    except LLMUnavailableError:
+        # Retries exhausted: fail the evaluation rather than record a 0.0 score
+        raise
     except Exception as e:
         st.warning(f"G-eval error for {field_name}: {str(e)}")
         return 0.0
+    
+    if cache is not None:
+        cache.put(field_name, sp_text, paca_text, score)
+    return score
+
+
+def g_eval_concurrent(pairs: Dict[str, Tuple[str, str]],
+                      max_concurrency: int = G_EVAL_MAX_CONCURRENCY,
+                      use_cache: bool = True) -> Dict[str, float]:
+    """
+    Score {field_name: (sp_text, paca_text)} with one g-eval request per field,
+    at most `max_concurrency` in flight. Same prompt and parsing as g_eval.
+    """
+    fields = list(pairs.keys())
+    scores = g_eval_many([(field_name, *pairs[field_name]) for field_name in fields], max_concurrency, use_cache)
+    return dict(zip(fields, scores))
+
+
+def g_eval_many(items: List[Tuple[str, Any, Any]],
+                max_concurrency: int = G_EVAL_MAX_CONCURRENCY,
+                use_cache: bool = True) -> List[float]:
+    """
+    Score a list of (field_name, sp_text, paca_text) items, e.g. the g-eval fields of
+    many experiments at once. Items with identical inputs share one request; at most
+    `max_concurrency` requests are in flight and new scores are cached in one write.
+    """
+    cache = get_g_eval_cache() if use_cache and items else None
+    
+    # One request per distinct input (cache key when caching, raw texts otherwise)
+    keys = [cache.key(*item) if cache is not None else (item[0], str(item[1]), str(item[2])) for item in items]
+    unique = dict(zip(keys, items))
+    scores = {}
+    if cache is not None:
+        for key, item in unique.items():
+            cached_score = cache.get(*item)
+            if cached_score is not None:
+                scores[key] = cached_score
+    pending = {key: item for key, item in unique.items() if key not in scores}
+    
+    new_entries = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pending)))) as executor:
+            futures = {
+                key: executor.submit(request_g_eval, sp_text, paca_text)
+                for key, (_, sp_text, paca_text) in pending.items()
+            }
+            for key, future in futures.items():
+                try:
+                    scores[key] = future.result()
+                    new_entries.append((*pending[key], scores[key]))
+                except LLMUnavailableError:
+                    raise
+                except Exception as e:
+                    # Warnings are emitted from the script thread (worker threads have no Streamlit context)
+                    st.warning(f"G-eval error for {pending[key][0]}: {str(e)}")
+                    scores[key] = 0.0
+    
+    if cache is not None:
+        cache.put_entries(new_entries)
+    return [scores[key] for key in keys]
+
+
+def g_eval_batched(pairs: Dict[str, Tuple[str, str]], use_cache: bool = True) -> Dict[str, float]:
+    """
+    Score all fields in one structured request and parse the per-field score map.
+    Fields missing from the reply (or an unparsable reply) fall back to per-field g-eval.
+    Batched scores are cached under the batch prompt's own template version.
+    """
+    cache = get_g_eval_cache(G_EVAL_BATCH_PROMPT) if use_cache and pairs else None
+    scores = cache.get_many(pairs) if cache is not None else {}
+    pending = {field_name: pair for field_name, pair in pairs.items() if field_name not in scores}
+    if not pending:
+        return scores
+    
+    field_pairs = "\n\n".join(
+        f"Field: {field_name}\nOriginal (SP): {sp_text}\nGenerated (PACA): {paca_text}"
+        for field_name, (sp_text, paca_text) in pending.items()
+    )
+    
+    new_entries = {}
+    try:
+        response = scheduled_invoke(get_client(EVALUATOR_LLM), G_EVAL_BATCH_PROMPT.format(field_pairs=field_pairs))
+        result = response.content if hasattr(response, 'content') else str(response)
+        match = re.search(r'\{.*\}', result, re.DOTALL)
+        score_map = json.loads(match.group()) if match else {}
+        for field_name in pending:
+            if field_name in score_map:
+                scores[field_name] = parse_g_eval_score(str(score_map[field_name]))
+                new_entries[field_name] = (*pending[field_name], scores[field_name])
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        st.warning(f"Batched G-eval error: {str(e)}")
+    
+    if cache is not None:
+        cache.put_many(new_entries)
+    
+    missing = {field_name: pair for field_name, pair in pending.items() if field_name not in scores}
+    scores.update(g_eval_concurrent(missing, use_cache=use_cache))
+    return scores
 
 
 def score_impulsivity(sp_value: str, paca_value: str, values_map: Dict[str, int]) -> Tuple[float, str]:
@@ -538,9 +717,11 @@ def score_binary(sp_value: str, paca_value: str) -> Tuple[float, str]:
 # MAIN EVALUATION FUNCTION
 # ============================================================================
 
-def evaluate_construct(field_name: str, sp_value: str, paca_value: str) -> Tuple[float, str, int]:
+def evaluate_construct(field_name: str, sp_value: str, paca_value: str,
+                       g_eval_score: Optional[float] = None) -> Tuple[float, str, int]:
     """
     Evaluate a single field using PSYCHE RUBRIC.
+    g_eval_score: precomputed G-Eval score for this field (skips the LLM call)
     Returns: (score, method_description, weight)
     """
     
@@ -574,18 +755,28 @@ def evaluate_construct(field_name: str, sp_value: str, paca_value: str) -> Tuple
         return score, f"Behavior({desc})", weight
     
     elif scoring_type == "g-eval":
-        score = g_eval(field_name, sp_value, paca_value)
-        return score, "G-Eval", weight
+        if g_eval_score is None:
+            g_eval_score = g_eval(field_name, sp_value, paca_value)
+        return g_eval_score, "G-Eval", weight
     
     else:
         st.warning(f"Unknown scoring type '{scoring_type}' for field '{field_name}'")
         return 0.0, "UNKNOWN_TYPE", weight
 
 
-def evaluate_constructs(sp_construct: Dict[str, Any], paca_construct: Dict[str, Any]) -> Tuple[Dict[str, float], Dict[str, str], float, Dict[str, Any]]:
+def evaluate_constructs(sp_construct: Dict[str, Any], paca_construct: Dict[str, Any],
+                        g_eval_mode: str = "concurrent",
+                        max_concurrency: int = G_EVAL_MAX_CONCURRENCY,
+                        use_cache: bool = True) -> Tuple[Dict[str, float], Dict[str, str], float, Dict[str, Any]]:
     """
     Evaluate both constructs against PSYCHE RUBRIC.
     
+    g_eval_mode (G_EVAL_MODES):
+        - serial: one g-eval request after another (original behavior)
+        - concurrent: g-eval fields scored in parallel, at most max_concurrency requests at once
+        - batched: all g-eval fields scored in one structured request
+    use_cache: reuse stored G-Eval scores for identical (field, SP text, PACA text) inputs
+    
     Returns:
         - field_scores: Dict[field_name -> score]
         - field_methods: Dict[field_name -> method_description]
@@ -597,14 +788,40 @@ def evaluate_constructs(sp_construct: Dict[str, Any], paca_construct: Dict[str,
     field_weights = {}
     detailed_results = {}
     
+    if g_eval_mode not in G_EVAL_MODES:
+        raise ValueError(f"Unknown g_eval_mode '{g_eval_mode}'. Choose from {G_EVAL_MODES}")
+    
     st.write("### Starting Evaluation Against PSYCHE RUBRIC")
     
+    # One lookup index per construct, shared by every rubric field
+    sp_index = ConstructIndex(sp_construct) if sp_construct is not None else None
+    paca_index = ConstructIndex(paca_construct) if paca_construct is not None else None
+    values = {
+        field_name: (get_value_from_construct(sp_index, field_name),
+                     get_value_from_construct(paca_index, field_name))
+        for field_name in PSYCHE_RUBRIC.keys()
+    }
+    
+    # Score all g-eval fields up front
+    g_eval_pairs = {
+        field_name: (sp_value, paca_value)
+        for field_name, (sp_value, paca_value) in values.items()
+        if PSYCHE_RUBRIC[field_name].get("type", "g-eval") == "g-eval" and sp_value and paca_value
+    }
+    if g_eval_mode == "concurrent":
+        g_eval_scores = g_eval_concurrent(g_eval_pairs, max_concurrency, use_cache=use_cache)
+    elif g_eval_mode == "batched":
+        g_eval_scores = g_eval_batched(g_eval_pairs, use_cache=use_cache)
+    else:
+        g_eval_scores = {
+            field_name: g_eval(field_name, sp_value, paca_value, use_cache=use_cache)
+            for field_name, (sp_value, paca_value) in g_eval_pairs.items()
+        }
+    
     # Evaluate each field in PSYCHE RUBRIC
-    for field_name in PSYCHE_RUBRIC.keys():
-        sp_value = get_value_from_construct(sp_construct, field_name)
-        paca_value = get_value_from_construct(paca_construct, field_name)
-        
-        score, method, weight = evaluate_construct(field_name, sp_value, paca_value)
+    for field_name, (sp_value, paca_value) in values.items():
+        score, method, weight = evaluate_construct(field_name, sp_value, paca_value,
+                                                   g_eval_score=g_eval_scores.get(field_name))
         
         if weight > 0:  # Only include fields that are in rubric
             field_scores[field_name] = score
@@ -667,7 +884,8 @@ def load_given_form(form_path: str) -> Dict[str, Any]:
 def evaluate_paca_performance(
     client_number: str,
     sp_construct: Dict[str, Any],
-    paca_construct: Dict[str, Any]
+    paca_construct: Dict[str, Any],
+    g_eval_mode: str = "concurrent"
 ) -> Tuple[Dict[str, float], Dict[str, str], float, pd.DataFrame, Dict[str, Any]]:
     """
     Main evaluation function using PSYCHE RUBRIC.
@@ -676,6 +894,7 @@ def evaluate_paca_performance(
         client_number: Client ID
         sp_construct: SP construct dictionary
         paca_construct: PACA construct dictionary
+        g_eval_mode: serial / concurrent / batched (see evaluate_constructs)
     
     Returns:
         - field_scores: Individual field scores
@@ -695,7 +914,7 @@ def evaluate_paca_performance(
     st.write("**PACA Construct:**", paca_construct)
     
     # Evaluate
-    field_scores, field_methods, weighted_score, detailed_results = evaluate_constructs(sp_construct, paca_construct)
+    field_scores, field_methods, weighted_score, detailed_results = evaluate_constructs(sp_construct, paca_construct, g_eval_mode)
     
     st.write(f"## Overall PSYCHE Score (Sum): {weighted_score:.2f}")
     
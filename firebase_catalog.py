@@ -0,0 +1,138 @@
+"""
+Firebase Key-Prefix Catalog
+Realtime Database 루트를 통째로 내려받지 않고, 필요한 prefix의 key만 골라 읽는 데이터 접근 계층
+
+All data lives as flat root keys (clients_6201_psyche_..., expert_..., sp_validation_...).
+Instead of `firebase_ref.get()` on the whole root, list the root keys shallowly and
+read only the children whose key matches a catalogued prefix.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import streamlit as st
+
+
+# ================================
+# Key Prefix Catalog
+# ================================
+KEY_PREFIXES = {
+    'sp_validation': 'sp_validation_',
+    'sp_validation_progress': 'sp_validation_progress_',
+    'sp_conversation': 'sp_conversation_',
+    'sp_progress': 'sp_progress_',
+    'expert': 'expert_',
+    'piqsca': 'piqsca_',
+    'clients': 'clients_',
+    'g_eval_cache': 'g_eval_cache',
+}
+
+# Parallel child reads (firebase_admin uses a blocking HTTP session per request)
+MAX_READ_WORKERS = 8
+
+
+def client_prefix(client_number, data_type: str = "") -> str:
+    """Prefix of a client's keys as written by firebase_utils.save_to_firebase.
+
+    e.g. client_prefix(6201, "psyche_") -> "clients_6201_psyche_"
+    """
+    return f"clients_{client_number}_{data_type}"
+
+
+def get_prefix(name: str) -> str:
+    """Look up a catalogued prefix by name (raises KeyError for unknown names)."""
+    return KEY_PREFIXES[name]
+
+
+# ================================
+# Shallow Key Listing
+# ================================
+def list_root_keys(firebase_ref) -> List[str]:
+    """Return all root keys without downloading their values (shallow read)."""
+    if firebase_ref is None:
+        return []
+    try:
+        keys = firebase_ref.get(shallow=True)
+    except Exception as e:
+        st.error(f"Failed to list Firebase keys: {str(e)}")
+        return []
+    return sorted(keys.keys()) if isinstance(keys, dict) else []
+
+
+def find_keys(firebase_ref, prefixes: Iterable[str] = (), key_filter: Optional[Callable[[str], bool]] = None,
+              root_keys: Optional[List[str]] = None) -> List[str]:
+    """Return root keys that start with any of `prefixes` and pass `key_filter`.
+
+    Args:
+        firebase_ref: Firebase root reference
+        prefixes: Key prefixes (empty = all keys)
+        key_filter: Optional extra predicate on the key
+        root_keys: Pre-fetched result of list_root_keys (avoids a second listing)
+    """
+    prefixes = tuple(prefixes)
+    if root_keys is None:
+        root_keys = list_root_keys(firebase_ref)
+    return [
+        key for key in root_keys
+        if (not prefixes or key.startswith(prefixes)) and (key_filter is None or key_filter(key))
+    ]
+
+
+# ================================
+# Targeted Child Reads
+# ================================
+def load_keys(firebase_ref, keys: Iterable[str]) -> Dict[str, Any]:
+    """Read the given root children concurrently.
+
+    Returns:
+        dict: {key: value} for keys that exist (missing keys are omitted)
+    """
+    keys = list(dict.fromkeys(keys))
+    if firebase_ref is None or not keys:
+        return {}
+
+    def _read(key):
+        try:
+            return key, firebase_ref.child(key).get()
+        except Exception as e:
+            st.warning(f"Failed to read '{key}' from Firebase: {str(e)}")
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(keys))) as executor:
+        results = list(executor.map(_read, keys))
+
+    return {key: value for key, value in results if value is not None}
+
+
+def load_by_prefix(firebase_ref, *prefixes: str, key_filter: Optional[Callable[[str], bool]] = None,
+                   root_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Load only the root subtrees whose key matches one of `prefixes`.
+
+    The returned dict has the same shape as the corresponding slice of
+    `firebase_ref.get()`, so existing `load_*(root_data)` helpers work unchanged.
+    """
+    keys = find_keys(firebase_ref, prefixes, key_filter=key_filter, root_keys=root_keys)
+    return load_keys(firebase_ref, keys)
+
+
+def load_catalog(firebase_ref, *names: str) -> Dict[str, Any]:
+    """Load subtrees for catalogued prefix names, e.g. load_catalog(ref, 'expert', 'piqsca')."""
+    return load_by_prefix(firebase_ref, *(get_prefix(name) for name in names))
+
+
+def load_experiment_results(firebase_ref, experiment_numbers, include=('expert',)) -> Dict[str, Any]:
+    """Load PSYCHE results for (client, exp) pairs plus the requested catalogued prefixes.
+
+    PSYCHE scores are stored as clients_<client>_psyche_<...>_<exp>, so only keys
+    with those client prefixes and exp suffixes are read.
+    """
+    psyche_prefixes = tuple(sorted({client_prefix(client_num, "psyche_") for client_num, _ in experiment_numbers}))
+    exp_suffixes = tuple(sorted({f"_{exp_num}" for _, exp_num in experiment_numbers}))
+    other_prefixes = tuple(get_prefix(name) for name in include)
+
+    def _wanted(key):
+        if key.startswith(psyche_prefixes):
+            return key.endswith(exp_suffixes)
+        return key.startswith(other_prefixes)
+
+    return load_by_prefix(firebase_ref, *(psyche_prefixes + other_prefixes), key_filter=_wanted)
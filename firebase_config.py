@@ -1,10 +1,16 @@
-import firebase_admin
-from firebase_admin import credentials, db
 import streamlit as st
 import json
+import os
+
+# "local" serves every get_firebase_ref() caller from the file-backed stand-in (local_rtdb.py)
+FIREBASE_BACKEND_ENV = "PSYCHE_FIREBASE_BACKEND"
 
 
 def initialize_firebase():
+    # Imported here so modules that only import get_firebase_ref don't load the Firebase SDK
+    import firebase_admin
+    from firebase_admin import credentials, db
+
     if not firebase_admin._apps:
         try:
 
@@ -61,6 +67,9 @@ def initialize_firebase():
 
 
 def get_firebase_ref():
+    if os.environ.get(FIREBASE_BACKEND_ENV, "firebase").lower() == "local":
+        from local_rtdb import get_local_ref
+        return get_local_ref()
     ref = initialize_firebase()
     if ref is None:
         st.error(
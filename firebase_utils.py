@@ -0,0 +1,200 @@
+"""
+Firebase Data Access Helpers
+클라이언트별 Firebase 데이터 저장/로드 (LLM / langchain 의존성 없음)
+
+Key sanitizing, save / load of a client's data_type and the read-through cache
+under load_from_firebase. Kept free of LLM imports so pages that only read stored
+data do not pay for them; SP_utils re-exports everything here.
+"""
+
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+
+def sanitize_key(key):
+    sanitized = re.sub(r'[$#\[\]/.]', '_', str(key))
+    return sanitized if sanitized else '_'
+
+
+def sanitize_dict(data):
+    if isinstance(data, dict):
+        return {sanitize_key(k): sanitize_dict(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [sanitize_dict(item) for item in data]
+    else:
+        return data
+
+
+def firebase_data_key(client_number, data_type):
+    """Root key of a client's data_type, e.g. clients_6201_construct_sp_6201_101."""
+    if "version" in data_type:
+        version_part = data_type.split("version")[1]
+        formatted_version = version_part.replace(".", "_")
+        data_type = f"{data_type.split('version')[0]}version{formatted_version}"
+
+    return sanitize_key(f"clients/{client_number}/{data_type}")
+
+
+# ================================
+# Read-through cache for load_from_firebase
+# ================================
+# Immutable per-client artifacts that are read on every agent creation / page rerun
+READ_CACHE_DATA_TYPES = ("given_information", "profile_version", "history_version", "beh_dir_version")
+
+
+class FirebaseReadCache:
+    """
+    Process-wide LRU + TTL cache of loaded values, keyed by sanitized root key.
+    Values are deep-copied in and out, so callers may mutate what they get.
+    Invalidated by save_to_firebase / save_many_to_firebase and, optionally, an RTDB
+    listener (start_invalidation_listener). ttl_seconds <= 0 or max_entries <= 0 disables it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        """Cached value or None (None is never cached)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        if not self.enabled or value is None:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop the entry of a root key (a child path invalidates its root key); None clears everything."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key.strip("/").split("/")[0], None)
+
+
+firebase_read_cache = FirebaseReadCache(
+    max_entries=int(os.environ.get("PSYCHE_FIREBASE_CACHE_SIZE", 256)),
+    ttl_seconds=float(os.environ.get("PSYCHE_FIREBASE_CACHE_TTL", 600)),
+)
+
+
+def start_invalidation_listener(firebase_ref, cache: FirebaseReadCache = None):
+    """
+    Invalidate cached entries when data under firebase_ref changes (e.g. edits made by
+    another process or in the console). Returns the listener registration (call .close()
+    to stop) or None when the reference does not support listen().
+    Listen on a narrow subtree where possible: RTDB first sends the whole subtree.
+    """
+    cache = cache or firebase_read_cache
+    if firebase_ref is None or not hasattr(firebase_ref, "listen"):
+        return None
+    base = getattr(firebase_ref, "path", "/").strip("/")
+
+    def on_change(event):
+        path = "/".join(part for part in (base, (event.path or "").strip("/")) if part)
+        cache.invalidate(path or None)
+
+    return firebase_ref.listen(on_change)
+
+
+def save_to_firebase(firebase_ref, client_number, data_type, content):
+    if firebase_ref is not None:
+        try:
+            sanitized_path = firebase_data_key(client_number, data_type)
+            sanitized_content = sanitize_dict(content)
+            firebase_ref.child(sanitized_path).set(sanitized_content)
+            firebase_read_cache.invalidate(sanitized_path)
+        except Exception as e:
+            st.error(f"Failed to save data to Firebase: {str(e)}")
+    else:
+        st.error("Firebase reference is not available. Data not saved.")
+
+
+def save_many_to_firebase(firebase_ref, client_number, items, merge_items=()):
+    """
+    Save several (data_type, content) pairs of one client in a single multi-path update,
+    so they are written together or not at all (one round-trip instead of one per item).
+    merge_items: (data_type, {child path: value}) pairs merged into the existing data
+    instead of replacing it (e.g. metadata of a streamed conversation log).
+    Returns True when the update was committed.
+    """
+    if firebase_ref is None:
+        st.error("Firebase reference is not available. Data not saved.")
+        return False
+    try:
+        updates = {
+            firebase_data_key(client_number, data_type): sanitize_dict(content)
+            for data_type, content in items
+        }
+        for data_type, fields in merge_items:
+            key = firebase_data_key(client_number, data_type)
+            updates.update({f"{key}/{path}": sanitize_dict(value) for path, value in fields.items()})
+        if updates:
+            firebase_ref.update(updates)
+            for path in updates:
+                firebase_read_cache.invalidate(path)
+        return True
+    except Exception as e:
+        st.error(f"Failed to save data to Firebase: {str(e)}")
+        return False
+
+
+def load_from_firebase(firebase_ref, client_number, data_type, use_cache=None):
+    """
+    Load a client's data_type. use_cache=None caches only READ_CACHE_DATA_TYPES
+    (immutable artifacts); True / False force caching on / off for this read.
+    """
+    if firebase_ref is not None:
+        try:
+            sanitized_path = firebase_data_key(client_number, data_type)
+            if use_cache is None:
+                use_cache = data_type.startswith(READ_CACHE_DATA_TYPES)
+            if use_cache and firebase_read_cache.enabled:
+                value = firebase_read_cache.get(sanitized_path)
+                if value is None:
+                    value = firebase_ref.child(sanitized_path).get()
+                    firebase_read_cache.put(sanitized_path, value)
+                return value
+            return firebase_ref.child(sanitized_path).get()
+        except Exception as e:
+            st.error(f"Error loading data from Firebase: {str(e)}")
+    return None
+
+
+def check_client_exists(firebase_ref, client_number):
+    try:
+        client_path = f"clients_{client_number}_given_information"
+        client_data = firebase_ref.child(client_path).get()
+        return client_data is not None
+    except Exception as e:
+        st.error(f"Error checking client existence: {str(e)}")
+        return False
@@ -0,0 +1,123 @@
+"""
+Content-Addressed G-Eval Score Cache
+
+G-Eval scores depend only on the field, the (SP, PACA) text pair, the judge model
+and the prompt template, so re-evaluating identical data (e.g. after a rubric
+weight change) can reuse stored scores instead of calling the judge again.
+
+Entries are keyed on sha256(field | normalized SP text | normalized PACA text |
+judge model | prompt-template version) and stored in Firebase next to the
+evaluation results, under the root key G_EVAL_CACHE_KEY:
+
+    g_eval_cache/<hash> = {field, model, prompt_version, score, timestamp}
+
+Only successful judge responses are cached (API errors are never stored).
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+import streamlit as st
+
+G_EVAL_CACHE_KEY = "g_eval_cache"
+
+
+def normalize_text(text) -> str:
+    """Normalize a construct value so formatting-only differences share a cache entry."""
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def prompt_template_version(template: str) -> str:
+    """Version id of a prompt template (changes whenever the template text changes)."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def g_eval_cache_key(field_name: str, sp_text, paca_text, model: str, prompt_version: str) -> str:
+    payload = "\x1f".join([field_name, normalize_text(sp_text), normalize_text(paca_text), model, prompt_version])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GEvalScoreCache:
+    """
+    In-memory view of g_eval_cache/ with write-through to Firebase.
+    The Firebase node is read once, lazily, on the first lookup.
+    """
+
+    def __init__(self, firebase_ref=None, model: str = "", prompt_version: str = ""):
+        self.firebase_ref = firebase_ref
+        self.model = model
+        self.prompt_version = prompt_version
+        self._scores: Dict[str, float] = {}
+        self._loaded = firebase_ref is None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                entries = self.firebase_ref.child(G_EVAL_CACHE_KEY).get() or {}
+            except Exception as e:
+                st.warning(f"Failed to load G-Eval score cache: {str(e)}")
+                return
+            for key, entry in entries.items():
+                if isinstance(entry, dict) and "score" in entry:
+                    self._scores[key] = float(entry["score"])
+
+    def key(self, field_name: str, sp_text, paca_text) -> str:
+        return g_eval_cache_key(field_name, sp_text, paca_text, self.model, self.prompt_version)
+
+    def get(self, field_name: str, sp_text, paca_text) -> Optional[float]:
+        self._load()
+        return self._scores.get(self.key(field_name, sp_text, paca_text))
+
+    def get_many(self, pairs: Dict[str, Tuple[str, str]]) -> Dict[str, float]:
+        """Cached scores for {field_name: (sp_text, paca_text)} (misses are omitted)."""
+        self._load()
+        found = {}
+        for field_name, (sp_text, paca_text) in pairs.items():
+            score = self._scores.get(self.key(field_name, sp_text, paca_text))
+            if score is not None:
+                found[field_name] = score
+        return found
+
+    def put(self, field_name: str, sp_text, paca_text, score: float):
+        self.put_many({field_name: (sp_text, paca_text, score)})
+
+    def put_many(self, entries: Dict[str, Tuple[str, str, float]]):
+        """Store {field_name: (sp_text, paca_text, score)} in memory and in one Firebase update."""
+        self.put_entries([(field_name, *entry) for field_name, entry in entries.items()])
+
+    def put_entries(self, entries: Iterable[Tuple[str, str, str, float]]):
+        """Store (field_name, sp_text, paca_text, score) tuples in memory and in one Firebase update."""
+        entries = list(entries)
+        if not entries:
+            return
+        updates = {}
+        with self._lock:
+            for field_name, sp_text, paca_text, score in entries:
+                key = self.key(field_name, sp_text, paca_text)
+                self._scores[key] = score
+                updates[key] = {
+                    'field': field_name,
+                    'model': self.model,
+                    'prompt_version': self.prompt_version,
+                    'score': score,
+                    'timestamp': int(time.time()),
+                }
+        if self.firebase_ref is None:
+            return
+        try:
+            self.firebase_ref.child(G_EVAL_CACHE_KEY).update(updates)
+        except Exception as e:
+            st.warning(f"Failed to save G-Eval scores to cache: {str(e)}")
+
+    def __len__(self):
+        self._load()
+        return len(self._scores)
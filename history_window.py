@@ -0,0 +1,138 @@
+"""
+Token-Budgeted Chat History Window
+
+Bounded-history mode for agents backed by InMemoryChatMessageHistory.
+The full conversation stays in memory (for saving and construct generation);
+only the messages sent to the LLM are windowed:
+- the last N turns are kept word-for-word
+- older turns are folded into an incrementally updated summary
+- a token budget caps the size of summary + verbatim turns
+
+With this, per-turn prompt size stays flat deep into a 300-turn simulation.
+"""
+
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.prompts import PromptTemplate
+
+from llm_scheduler import scheduled_ainvoke, scheduled_invoke
+
+SUMMARY_PREFIX = "[Summary of the earlier part of this conversation]\n"
+
+summary_prompt = """Progressively summarize the psychiatric interview below, adding onto the previous summary and returning a new summary.
+Keep every clinically relevant fact (symptoms, onset, duration, triggers, stressors, family history, risk, what has already been asked and answered).
+Write the summary in the same language as the conversation. Return ONLY the new summary.
+
+Previous summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+
+def approximate_token_count(messages: Sequence[BaseMessage]) -> int:
+    """Cheap, provider-independent token estimate (~2 chars per token for mixed Korean/English)."""
+    return sum(len(str(m.content)) // 2 + 4 for m in messages)
+
+
+def format_lines(messages: Sequence[BaseMessage]) -> str:
+    role_names = {"human": "Human", "ai": "AI", "system": "System"}
+    return "\n".join(f"{role_names.get(m.type, m.type)}: {m.content}" for m in messages)
+
+
+class RollingSummaryWindow:
+    """
+    Windowed view over a chat history with a rolling summary of older turns.
+
+    Args:
+        summarizer_llm: Chat model used to update the summary
+        keep_last_turns: Turns (human + AI message pairs) always kept verbatim
+        max_tokens: Token budget for summary + verbatim messages (None = no budget)
+        summarize_every_turns: Fold older turns in batches of this size, so the
+            summary is updated every few turns instead of on every call
+        token_counter: Function estimating tokens of a message list
+    """
+
+    def __init__(self, summarizer_llm, keep_last_turns: int = 10, max_tokens: Optional[int] = None,
+                 summarize_every_turns: int = 5,
+                 token_counter: Callable[[Sequence[BaseMessage]], int] = approximate_token_count):
+        self.summarizer_llm = summarizer_llm
+        self.summarizer_chain = PromptTemplate.from_template(summary_prompt) | summarizer_llm
+        self.keep_last_messages = max(1, keep_last_turns) * 2
+        self.max_tokens = max_tokens
+        self.fold_batch_messages = max(1, summarize_every_turns) * 2
+        self.token_counter = token_counter
+        self.summary = ""
+        self.folded = 0  # number of leading messages already folded into the summary
+
+    def reset(self):
+        self.summary = ""
+        self.folded = 0
+
+    def _summary_messages(self) -> List[BaseMessage]:
+        return [HumanMessage(content=SUMMARY_PREFIX + self.summary)] if self.summary else []
+
+    def _fold_inputs(self, messages: Sequence[BaseMessage], until: int):
+        return {
+            "summary": self.summary or "(none)",
+            "new_lines": format_lines(messages[self.folded:until]),
+        }
+
+    def _fold_target(self, messages: Sequence[BaseMessage]) -> int:
+        """Index up to which messages should be folded into the summary on this call."""
+        if len(messages) < self.folded:
+            # Memory was cleared or replaced (e.g. reset_agent_memory)
+            self.reset()
+
+        target = self.folded
+        # Fold in batches once the verbatim tail exceeds keep_last + batch
+        if len(messages) - target > self.keep_last_messages + self.fold_batch_messages:
+            target = len(messages) - self.keep_last_messages
+
+        # Enforce the token budget (always keep at least the last turn verbatim)
+        if self.max_tokens is not None:
+            while (target < len(messages) - 2
+                   and self.token_counter(self._summary_messages() + list(messages[target:])) > self.max_tokens):
+                target += 2
+        return target
+
+    def window(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Return the messages to send to the LLM: summary (if any) + recent turns verbatim."""
+        messages = list(messages)
+        target = self._fold_target(messages)
+        if target > self.folded:
+            response = scheduled_invoke(self.summarizer_chain, self._fold_inputs(messages, target),
+                                        llm=self.summarizer_llm)
+            self.summary = str(response.content).strip()
+            self.folded = target
+        return self._summary_messages() + messages[self.folded:]
+
+    async def awindow(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Async twin of window (summary update uses ainvoke)."""
+        messages = list(messages)
+        target = self._fold_target(messages)
+        if target > self.folded:
+            response = await scheduled_ainvoke(self.summarizer_chain, self._fold_inputs(messages, target),
+                                               llm=self.summarizer_llm)
+            self.summary = str(response.content).strip()
+            self.folded = target
+        return self._summary_messages() + messages[self.folded:]
+
+
+def create_history_window(summarizer_factory: Callable[[], object], history_turns: Optional[int] = None,
+                          history_token_budget: Optional[int] = None) -> Optional[RollingSummaryWindow]:
+    """
+    Build a window when bounded history is requested; None keeps the full-history behavior.
+    summarizer_factory returns a non-streaming client (so summaries are not echoed with the
+    agent's output); it is only called when a window is built.
+    """
+    if history_turns is None and history_token_budget is None:
+        return None
+    return RollingSummaryWindow(
+        summarizer_factory(),
+        keep_last_turns=history_turns if history_turns is not None else 10,
+        max_tokens=history_token_budget,
+    )
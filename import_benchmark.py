@@ -0,0 +1,147 @@
+"""
+Page Import-Time Benchmark
+Streamlit 페이지별 cold import 시간 측정 (페이지 로딩 속도 비교용)
+
+For every page, the page's top-level import statements are run in a fresh
+interpreter with `python -X importtime`, i.e. what a cold Streamlit process pays
+before the page draws anything. The reported time is the summed cumulative import
+time of the top-level modules minus that of an empty interpreter, as the minimum
+over --repeat runs; the heaviest top-level imports are listed per page.
+
+Usage:
+    python import_benchmark.py                      # pages/*.py
+    python import_benchmark.py --all --json after.json
+    python import_benchmark.py --compare before.json pages/13_SP_Quantitative.py
+
+Save a run with --json on one commit and pass it to --compare on another to get
+per-page speedups.
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(REPO_ROOT, "pages")
+
+
+def find_pages(include_subfolders: bool = False) -> List[str]:
+    pattern = os.path.join(PAGES_DIR, "**", "*.py") if include_subfolders else os.path.join(PAGES_DIR, "*.py")
+    return sorted(glob.glob(pattern, recursive=include_subfolders))
+
+
+def page_imports(path: str) -> str:
+    """The page's module-level import statements as one code snippet."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in statements)
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """{top-level module: cumulative ms} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith("  "):  # nested import, already included in its parent's cumulative time
+            continue
+        modules[name.strip()] = modules.get(name.strip(), 0.0) + int(cumulative) / 1000
+    return modules
+
+
+def run_importtime(code: str, env: Dict[str, str], timeout: float) -> Tuple[Optional[Dict[str, float]], str]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        return None, error_lines[-1] if error_lines else f"exit code {result.returncode}"
+    return parse_importtime(result.stderr), ""
+
+
+def benchmark_page(path: str, baseline: Dict[str, float], env: Dict[str, str], repeat: int,
+                   timeout: float) -> Dict[str, object]:
+    code = page_imports(path)
+    totals, modules, error = [], {}, ""
+    for _ in range(repeat):
+        try:
+            run, error = run_importtime(code, env, timeout)
+        except subprocess.TimeoutExpired:
+            run, error = None, f"timed out after {timeout:.0f}s"
+        if run is None:
+            break
+        page_only = {name: ms for name, ms in run.items() if name not in baseline}
+        totals.append(sum(page_only.values()))
+        if not modules or totals[-1] == min(totals):
+            modules = page_only
+    heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:3]
+    return {
+        "page": os.path.relpath(path, REPO_ROOT),
+        "import_ms": round(min(totals), 1) if totals else None,
+        "median_ms": round(statistics.median(totals), 1) if totals else None,
+        "heaviest": [[name, round(ms, 1)] for name, ms in heaviest],
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of Streamlit pages.")
+    parser.add_argument("pages", nargs="*", help="Page files (default: pages/*.py)")
+    parser.add_argument("--all", action="store_true", help="Include the pages in subfolders of pages/")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh-interpreter runs per page (minimum is reported)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a page's import run is aborted")
+    parser.add_argument("--local-firebase", action="store_true",
+                        help="Run with PSYCHE_FIREBASE_BACKEND=local so no page reaches the network")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Results JSON of an earlier run; adds per-page speedups")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    if args.local_firebase:
+        env["PSYCHE_FIREBASE_BACKEND"] = "local"
+
+    pages = [os.path.abspath(page) for page in args.pages] or find_pages(args.all)
+    baseline, error = run_importtime("pass", env, args.timeout)
+    if baseline is None:
+        raise SystemExit(f"Could not start the interpreter: {error}")
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = {row["page"]: row for row in json.load(f)}
+
+    results = []
+    for path in pages:
+        row = benchmark_page(path, baseline, env, max(1, args.repeat), args.timeout)
+        before = previous.get(row["page"], {}).get("import_ms")
+        if before and row["import_ms"]:
+            row["before_ms"] = before
+            row["speedup"] = round(before / row["import_ms"], 1)
+        results.append(row)
+
+        if row["error"]:
+            print(f"{row['page']}: ERROR {row['error']}", flush=True)
+            continue
+        speedup = f"  ({row['before_ms']:.0f} ms before, {row['speedup']}x)" if "speedup" in row else ""
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in row["heaviest"])
+        print(f"{row['page']}: {row['import_ms']:.0f} ms{speedup}  [{heaviest}]", flush=True)
+
+    measured = [row["import_ms"] for row in results if row["import_ms"] is not None]
+    if measured:
+        print(f"\n{len(measured)} pages, total {sum(measured):.0f} ms, median {statistics.median(measured):.0f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if any(row["error"] for row in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""
+LLM Response Cache (record / replay / passthrough)
+
+A LangChain cache that every chat model (SP_utils.llm/chat_llm, evaluator.llm,
+PACA paca_llm_*) goes through once configure_llm_cache() has run. client_registry
+runs it before the first chat model is built; an explicit earlier call (e.g. a CLI's
+--llm-cache) is kept.
+Entries are keyed on model name, temperature and a hash of the fully rendered
+messages, and are stored in a local SQLite file.
+
+Modes (env PSYCHE_LLM_CACHE_MODE, default "passthrough"):
+- passthrough: cache is ignored, every call hits the API (original behavior)
+- record: return cached responses when present, otherwise call the API and store
+- replay: only return cached responses; a miss raises LLMCacheMiss (offline re-runs)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+
+CACHE_MODES = ("passthrough", "record", "replay")
+DEFAULT_CACHE_PATH = "data/llm_cache/llm_cache.sqlite"
+
+
+class LLMCacheMiss(KeyError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def _parse_llm_string(llm_string: str) -> Tuple[str, Optional[float]]:
+    """Extract (model name, temperature) from LangChain's llm_string."""
+    model, temperature = "", None
+    serialized = llm_string.split("---", 1)[0]
+    try:
+        kwargs = json.loads(serialized).get("kwargs", {})
+        model = kwargs.get("model_name") or kwargs.get("model") or ""
+        temperature = kwargs.get("temperature")
+    except (ValueError, AttributeError):
+        pass
+    return str(model), temperature
+
+
+def make_cache_key(model: str, temperature: Optional[float], prompt: str, llm_string: str = "") -> str:
+    """Cache key: model name, temperature and hash of the rendered messages (plus remaining LLM params)."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    params_hash = hashlib.sha256(llm_string.encode("utf-8")).hexdigest()
+    return f"{model}|{temperature}|{prompt_hash}|{params_hash}"
+
+
+class RecordReplayCache(BaseCache):
+    """SQLite-backed LangChain cache with record / replay / passthrough modes."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, mode: str = "record"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'. Choose from {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # check_same_thread=False: worker pools share one connection under self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT,"
+                " temperature REAL,"
+                " prompt_hash TEXT,"
+                " response TEXT,"
+                " created_at REAL DEFAULT (strftime('%s','now'))"
+                ")"
+            )
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        if self.mode == "passthrough":
+            return None
+        model, temperature = _parse_llm_string(llm_string)
+        key = make_cache_key(model, temperature, prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded response for model={model} temperature={temperature}")
+            return None
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        if self.mode != "record":
+            return
+        model, temperature = _parse_llm_string(llm_string)
+        key = make_cache_key(model, temperature, prompt, llm_string)
+        response = json.dumps([dumps(generation) for generation in return_val])
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, temperature, prompt_hash, response) VALUES (?, ?, ?, ?, ?)",
+                (key, model, temperature, prompt_hash, response)
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+_configured_cache = None
+_configured = False
+
+
+def configure_llm_cache(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[RecordReplayCache]:
+    """
+    Install the global LangChain cache used by all chat models.
+    Safe to call from every module that creates an LLM client; only the first call
+    (or a call with a different mode/path) changes the configuration.
+    """
+    global _configured_cache, _configured
+    if mode is None and path is None and _configured:
+        return _configured_cache
+    _configured = True
+    mode = mode or os.environ.get("PSYCHE_LLM_CACHE_MODE", "passthrough")
+    path = path or os.environ.get("PSYCHE_LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+    if mode == "passthrough":
+        if _configured_cache is not None:
+            set_llm_cache(None)
+            _configured_cache = None
+        return None
+
+    if _configured_cache is None or _configured_cache.mode != mode or _configured_cache.path != path:
+        _configured_cache = RecordReplayCache(path=path, mode=mode)
+        set_llm_cache(_configured_cache)
+    return _configured_cache
@@ -0,0 +1,549 @@
+"""
+LLM Call Scheduler
+모든 LLM 호출의 공급자별 속도 제한 / 재시도 / 서킷 브레이커 / 우선순위 처리
+
+Every LLM request of the app goes through one process-wide scheduler:
+
+- rate limits per provider and model: token buckets for requests/min and tokens/min,
+  plus an optional cap on requests in flight
+- retries with jittered exponential backoff for rate limits (429), overloads, 5xx,
+  timeouts and connection errors; a Retry-After header is honoured and pauses the
+  whole provider/model lane, so other callers do not run into the same 429
+- a circuit breaker per provider: after repeated server / connection failures no
+  request is sent until a cooldown has passed, then one probe decides whether to close
+- priority lanes: waiting "interactive" calls (Validation.py chats) are admitted
+  before waiting "batch" calls (simulations, construct generation, g-eval)
+
+    response = scheduled_invoke(chain, inputs, llm=get_client("sp.llm"))
+    with llm_priority(INTERACTIVE):
+        reply = agent(prompt)
+
+Calls are "batch" unless marked otherwise. A call that still fails after its retries
+(or waits longer than max_wait for admission) raises LLMUnavailableError, so callers
+can tell a lost request apart from a real answer instead of scoring it as 0.
+
+Limits are configured per "provider" or "provider:model" (the more specific entry
+wins), e.g. with PSYCHE_LLM_RATE_LIMITS="openai=5000/2000000,anthropic=50/40000"
+(requests/min / tokens/min, either may be empty) or configure_rate_limits().
+Without a configured limit only retries and the circuit breaker apply.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_LANES = (INTERACTIVE, BATCH)  # admission order
+
+RATE_LIMITS_ENV = "PSYCHE_LLM_RATE_LIMITS"
+
+# Status codes worth retrying (529 = Anthropic overloaded)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Exception class names of the provider SDKs / httpx for transient failures
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError", "OverloadedError",
+    "ServiceUnavailableError", "TimeoutException", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+
+# Output tokens assumed for a request before its real usage is known
+DEFAULT_OUTPUT_TOKENS = 300
+
+
+class LLMUnavailableError(RuntimeError):
+    """An LLM request could not be completed (retries exhausted, circuit open or admission timed out)."""
+
+
+# ================================
+# Priority lanes
+# ================================
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=None)
+_default_priority = BATCH
+
+
+@contextmanager
+def llm_priority(lane: str):
+    """Run the LLM calls made inside the block (in this thread / task) in `lane`."""
+    if lane not in PRIORITY_LANES:
+        raise ValueError(f"Unknown priority lane '{lane}'. Choose from {PRIORITY_LANES}")
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get() or _default_priority
+
+
+# ================================
+# Limits, retry policy, error classification
+# ================================
+@dataclass(frozen=True)
+class RateLimit:
+    """Quota of one provider or provider/model (None = unlimited)."""
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    max_concurrent: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None, rng: Optional[random.Random] = None) -> float:
+        """Full-jitter exponential backoff; a server-given Retry-After is the lower bound."""
+        backoff = (rng or random).uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if _status_code(error) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return _status_code(error) == 429 or any(cls.__name__ == "RateLimitError" for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Retry-After (seconds) / retry-after-ms of the error's HTTP response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to backoff
+    return None
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimit]:
+    """'openai=5000/2000000,anthropic:claude-3-haiku-20240307=50/' -> {key: RateLimit}."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+        key, _, values = entry.partition("=")
+        requests, _, tokens = values.partition("/")
+        if not key.strip() or not values:
+            raise ValueError(f"Expected PROVIDER[:MODEL]=RPM/TPM, got '{entry}'")
+        limits[key.strip()] = RateLimit(float(requests) if requests.strip() else None,
+                                        float(tokens) if tokens.strip() else None)
+    return limits
+
+
+def estimate_tokens(inputs: Any) -> int:
+    """Rough prompt size (~2 chars per token for mixed Korean/English, as history_window)."""
+    if isinstance(inputs, dict):
+        return sum(estimate_tokens(value) for value in inputs.values())
+    if isinstance(inputs, (list, tuple)):
+        return sum(estimate_tokens(value) for value in inputs)
+    return len(str(getattr(inputs, "content", inputs))) // 2 + 4
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported by the provider (LangChain usage_metadata), if any."""
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and usage.get("total_tokens") is not None:
+        return int(usage["total_tokens"])
+    return None
+
+
+# ================================
+# Building blocks
+# ================================
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute of quota."""
+
+    def __init__(self, per_minute: float, now: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float, now: float):
+        """Take `amount` (negative gives it back); the level may go below zero to record debt."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; after `cooldown`
+    seconds one probe request is let through (half-open). A successful probe closes the
+    circuit, a failed one re-opens it with a doubled cooldown (up to max_cooldown).
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.opened = 0
+
+    def wait_time(self, now: float) -> Optional[float]:
+        """0 when a request may be sent, seconds until the next probe, or None while a probe is out."""
+        if self.opened_at is None:
+            return 0.0
+        remaining = self.opened_at + self.cooldown - now
+        if remaining > 0:
+            return remaining
+        return None if self.probing else 0.0
+
+    def on_admit(self):
+        if self.opened_at is not None:
+            self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self.opened_at is not None and self.probing:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self.opened_at, self.probing = now, False
+        elif self.opened_at is None and self.failures >= self.failure_threshold:
+            self.opened_at = now
+            self.opened += 1
+
+    def release_probe(self):
+        self.probing = False
+
+
+class _Lane:
+    """Admission state of one provider/model."""
+
+    def __init__(self, limit: RateLimit, now: float):
+        self.limit = RateLimit()
+        self.requests = self.tokens = None
+        self.apply(limit, now)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.waiting = []  # heap of (lane rank, sequence)
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def apply(self, limit: RateLimit, now: float):
+        """Switch to a new limit (buckets are only replaced when their quota changed)."""
+        if limit.requests_per_minute != self.limit.requests_per_minute:
+            self.requests = TokenBucket(limit.requests_per_minute, now) if limit.requests_per_minute else None
+        if limit.tokens_per_minute != self.limit.tokens_per_minute:
+            self.tokens = TokenBucket(limit.tokens_per_minute, now) if limit.tokens_per_minute else None
+        self.limit = limit
+
+    def wait_time(self, tokens: int, now: float) -> Optional[float]:
+        waits = [self.paused_until - now]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(tokens, now))
+        if self.limit.max_concurrent is not None and self.in_flight >= self.limit.max_concurrent:
+            return None  # until a request finishes
+        return max(0.0, *waits)
+
+
+# ================================
+# Scheduler
+# ================================
+class LLMScheduler:
+    """
+    Process-wide admission, retry and circuit-breaker logic for LLM calls.
+
+    Args:
+        rate_limits: {"provider" or "provider:model": RateLimit}
+        retry: Backoff policy for retryable errors
+        failure_threshold / cooldown: Circuit breaker settings (per provider)
+        max_wait: Seconds a call may wait for admission before LLMUnavailableError (None = no limit)
+        clock / sleep / async_sleep / rng: Time source, waits between attempts (and async admission
+            polls) and backoff jitter; replaced by fakes in tests
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, RateLimit]] = None, retry: RetryPolicy = RetryPolicy(),
+                 failure_threshold: int = 5, cooldown: float = 30.0, max_wait: Optional[float] = 600.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], Any] = time.sleep,
+                 async_sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+                 rng: Optional[random.Random] = None):
+        self.rate_limits = dict(rate_limits or {})
+        self.retry = retry
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.rng = rng
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    # -------- configuration --------
+    def configure(self, key: str, limit: Optional[RateLimit]):
+        """Set (or with None remove) the limit of "provider" or "provider:model"."""
+        with self._condition:
+            if limit is None:
+                self.rate_limits.pop(key, None)
+            else:
+                self.rate_limits[key] = limit
+            for (provider, model), lane in self._lanes.items():
+                lane.apply(self._limit(provider, model), self.clock())
+            self._condition.notify_all()
+
+    def set_max_concurrent(self, provider: str, limit: Optional[int]):
+        """Cap requests in flight per provider/model lane, keeping the provider's rate limits."""
+        current = self.rate_limits.get(provider, RateLimit())
+        self.configure(provider, RateLimit(current.requests_per_minute, current.tokens_per_minute, limit))
+
+    def _limit(self, provider: str, model: str) -> RateLimit:
+        return self.rate_limits.get(f"{provider}:{model}") or self.rate_limits.get(provider) or RateLimit()
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        lane = self._lanes.get((provider, model))
+        if lane is None:
+            lane = self._lanes[(provider, model)] = _Lane(self._limit(provider, model), self.clock())
+        return lane
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters per "provider:model" plus circuit openings per provider."""
+        with self._condition:
+            stats = {f"{provider}:{model}": dict(lane.stats) for (provider, model), lane in self._lanes.items()}
+            for provider, breaker in self._breakers.items():
+                stats.setdefault(provider, {})["circuit_opened"] = breaker.opened
+            return stats
+
+    # -------- admission --------
+    def _enqueue(self, provider: str, model: str, priority: Optional[str]):
+        lane = self._lane(provider, model)
+        ticket = (PRIORITY_LANES.index(priority or current_priority()), next(self._sequence))
+        heapq.heappush(lane.waiting, ticket)
+        return lane, ticket
+
+    def _try_admit(self, lane: _Lane, ticket, provider: str, tokens: int) -> Optional[float]:
+        """Admit `ticket` (returns 0) or return how long to wait (None = until notified)."""
+        now = self.clock()
+        if lane.waiting[0] != ticket:
+            return None
+        breaker = self._breaker(provider)
+        breaker_wait = breaker.wait_time(now)
+        if breaker_wait is None or breaker_wait > 0:
+            return breaker_wait
+        wait = lane.wait_time(tokens, now)
+        if wait is None or wait > 0:
+            return wait
+        heapq.heappop(lane.waiting)
+        if lane.requests is not None:
+            lane.requests.consume(1, now)
+        if lane.tokens is not None:
+            lane.tokens.consume(tokens, now)
+        lane.in_flight += 1
+        lane.stats["calls"] += 1
+        breaker.on_admit()
+        self._condition.notify_all()
+        return 0.0
+
+    def _abandon(self, lane: _Lane, ticket):
+        if ticket in lane.waiting:
+            lane.waiting.remove(ticket)
+            heapq.heapify(lane.waiting)
+        self._condition.notify_all()
+
+    def _admission_timeout(self, provider: str, model: str):
+        return LLMUnavailableError(f"{provider}:{model}: no capacity within {self.max_wait:.0f}s "
+                                   f"(rate limit or open circuit)")
+
+    def _acquire(self, provider: str, model: str, tokens: int, priority: Optional[str]) -> _Lane:
+        deadline = None if self.max_wait is None else self.clock() + self.max_wait
+        with self._condition:
+            lane, ticket = self._enqueue(provider, model, priority)
+            try:
+                while True:
+                    wait = self._try_admit(lane, ticket, provider, tokens)
+                    if wait == 0:
+                        return lane
+                    if deadline is not None and self.clock() >= deadline:
+                        raise self._admission_timeout(provider, model)
+                    # Bucket refills and cooldowns are not notified, so waits are bounded
+                    self._condition.wait(timeout=min(wait if wait is not None else 1.0, 1.0))
+            except BaseException:
+                self._abandon(lane, ticket)
+                raise
+
+    async def _aacquire(self, provider: str, model: str, tokens: int, priority: Optional[str]) -> _Lane:
+        deadline = None if self.max_wait is None else self.clock() + self.max_wait
+        with self._condition:
+            lane, ticket = self._enqueue(provider, model, priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(lane, ticket, provider, tokens)
+                if wait == 0:
+                    return lane
+                if deadline is not None and self.clock() >= deadline:
+                    raise self._admission_timeout(provider, model)
+                await self.async_sleep(min(wait if wait is not None else 0.05, 1.0))
+        except BaseException:
+            with self._condition:
+                self._abandon(lane, ticket)
+            raise
+
+    def _release(self, lane: _Lane, provider: str, estimated_tokens: int, attempt: int, response: Any = None,
+                 error: Optional[BaseException] = None) -> Optional[float]:
+        """Book the outcome of one attempt; returns the retry delay, or None when not retrying."""
+        with self._condition:
+            now = self.clock()
+            lane.in_flight -= 1
+            breaker = self._breaker(provider)
+            used = response_tokens(response) if response is not None else None
+            if lane.tokens is not None and used is not None:
+                lane.tokens.consume(used - estimated_tokens, now)
+            self._condition.notify_all()
+
+            if error is None:
+                breaker.record_success()
+                return None
+            if not isinstance(error, Exception) or not is_retryable(error):
+                # An HTTP error response (400, 401, ...) still shows that the provider is up
+                if isinstance(error, Exception) and _status_code(error) is not None:
+                    breaker.record_success()
+                else:
+                    breaker.release_probe()
+                return None
+            delay = self.retry.delay(attempt, retry_after_seconds(error), self.rng)
+            if is_rate_limited(error):
+                # Quota, not an outage: pause the whole lane instead of tripping the breaker
+                lane.stats["rate_limited"] += 1
+                lane.paused_until = max(lane.paused_until, now + delay)
+                breaker.release_probe()
+            else:
+                breaker.record_failure(now)
+            if attempt + 1 == self.retry.max_attempts:
+                lane.stats["failed"] += 1
+            else:
+                lane.stats["retries"] += 1
+            return delay
+
+    # -------- calls --------
+    def call(self, fn: Callable[[], Any], provider: str, model: str = "", tokens: int = 0,
+             priority: Optional[str] = None) -> Any:
+        """Run fn() (one LLM request) under the limits of provider/model, retrying transient errors."""
+        estimated = tokens + DEFAULT_OUTPUT_TOKENS
+        for attempt in range(self.retry.max_attempts):
+            lane = self._acquire(provider, model, estimated, priority)
+            try:
+                response = fn()
+            except BaseException as e:
+                delay = self._release(lane, provider, estimated, attempt, error=e)
+                if delay is None:
+                    raise
+                if attempt + 1 == self.retry.max_attempts:
+                    raise LLMUnavailableError(f"{provider}:{model} failed after {attempt + 1} attempts: {e}") from e
+                self.sleep(delay)
+                continue
+            self._release(lane, provider, estimated, attempt, response=response)
+            return response
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], provider: str, model: str = "", tokens: int = 0,
+                    priority: Optional[str] = None) -> Any:
+        """Awaitable twin of call; fn() returns the coroutine of one LLM request."""
+        estimated = tokens + DEFAULT_OUTPUT_TOKENS
+        for attempt in range(self.retry.max_attempts):
+            lane = await self._aacquire(provider, model, estimated, priority)
+            try:
+                response = await fn()
+            except BaseException as e:
+                delay = self._release(lane, provider, estimated, attempt, error=e)
+                if delay is None:
+                    raise
+                if attempt + 1 == self.retry.max_attempts:
+                    raise LLMUnavailableError(f"{provider}:{model} failed after {attempt + 1} attempts: {e}") from e
+                await self.async_sleep(delay)
+                continue
+            self._release(lane, provider, estimated, attempt, response=response)
+            return response
+
+
+scheduler = LLMScheduler(parse_rate_limits(os.environ.get(RATE_LIMITS_ENV, "")))
+
+
+def configure_rate_limits(limits: Dict[str, RateLimit]):
+    """Set provider / provider:model limits of the shared scheduler (see parse_rate_limits)."""
+    for key, limit in limits.items():
+        scheduler.configure(key, limit)
+
+
+def set_default_priority(lane: str):
+    """Lane of calls made outside llm_priority() blocks in this process."""
+    global _default_priority
+    if lane not in PRIORITY_LANES:
+        raise ValueError(f"Unknown priority lane '{lane}'. Choose from {PRIORITY_LANES}")
+    _default_priority = lane
+
+
+# ================================
+# LangChain helpers
+# ================================
+_PROVIDERS = {"ChatOpenAI": "openai", "AzureChatOpenAI": "openai", "ChatAnthropic": "anthropic",
+              "ChatOllama": "ollama"}
+
+
+def llm_identity(llm: Any) -> Tuple[str, str]:
+    """(provider, model) of a LangChain chat model."""
+    provider = next((_PROVIDERS[cls.__name__] for cls in type(llm).__mro__ if cls.__name__ in _PROVIDERS),
+                    type(llm).__name__.lower())
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    return provider, str(model)
+
+
+def scheduled_invoke(runnable: Any, inputs: Any, llm: Any = None, priority: Optional[str] = None) -> Any:
+    """runnable.invoke(inputs) through the shared scheduler; `llm` is the chat model behind a chain."""
+    provider, model = llm_identity(llm if llm is not None else runnable)
+    return scheduler.call(lambda: runnable.invoke(inputs), provider, model, estimate_tokens(inputs), priority)
+
+
+async def scheduled_ainvoke(runnable: Any, inputs: Any, llm: Any = None, priority: Optional[str] = None) -> Any:
+    """Awaitable twin of scheduled_invoke."""
+    provider, model = llm_identity(llm if llm is not None else runnable)
+    return await scheduler.acall(lambda: runnable.ainvoke(inputs), provider, model, estimate_tokens(inputs), priority)
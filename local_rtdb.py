@@ -0,0 +1,331 @@
+"""
+Local Realtime Database Stand-in
+Firebase 없이 오프라인 벤치마크 / 부하 테스트 / 분석을 위한 로컬 파일 기반 RTDB
+
+Implements the subset of firebase_admin.db.Reference this repo uses (child, get
+incl. shallow=True, set, update with multi-path keys, push, delete) over a JSON
+or SQLite file, with RTDB value semantics: None / empty objects are never stored,
+lists are stored as index-keyed objects and come back as lists when the keys are
+mostly contiguous indices (sparse ones come back as dicts), and keys may not
+contain . $ # [ ] /.
+
+The data is kept per root key (all of this project's data lives in flat root keys),
+so the SQLite backend reads and rewrites only the root keys that are touched.
+
+Selected by firebase_config.get_firebase_ref() when PSYCHE_FIREBASE_BACKEND=local:
+- PSYCHE_LOCAL_DB_PATH: database file (*.json = JSON file, otherwise SQLite;
+  default data/local_rtdb/rtdb.sqlite)
+- PSYCHE_LOCAL_DB_SEED: directory with client-simulation-default-rtdb-*-export.json
+  dumps loaded into an empty database
+
+Seeding by hand:
+    python local_rtdb.py --db data/local_rtdb/rtdb.sqlite .
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DB_PATH = "data/local_rtdb/rtdb.sqlite"
+EXPORT_PATTERN = "client-simulation-default-rtdb-*-export.json"
+
+_INVALID_KEY_CHARS = re.compile(r'[.$#\[\]/]')
+_PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+# ================================
+# RTDB value semantics
+# ================================
+def _validate_key(key: str):
+    if not key or _INVALID_KEY_CHARS.search(key):
+        raise ValueError(f"Invalid key '{key}': keys must be non-empty and cannot contain . $ # [ ] /")
+
+
+def to_stored(value: Any) -> Any:
+    """Normalize a value the way RTDB stores it (None = nothing stored)."""
+    if isinstance(value, (list, tuple)):
+        value = {str(i): v for i, v in enumerate(value)}
+    if isinstance(value, dict):
+        stored = {}
+        for key, child in value.items():
+            key = str(key)
+            _validate_key(key)
+            child = to_stored(child)
+            if child is not None:
+                stored[key] = child
+        return stored or None
+    return value
+
+
+def to_returned(value: Any) -> Any:
+    """Stored value as RTDB returns it (index-keyed objects become lists, holes as None)."""
+    if not isinstance(value, dict):
+        return value
+    children = {key: to_returned(child) for key, child in value.items()}
+    if children and all(key.isdigit() and (key == "0" or not key.startswith("0")) for key in children):
+        max_index = max(int(key) for key in children)
+        # RTDB returns an array only when more than half of the indices up to the largest one are set
+        if 2 * len(children) > max_index + 1:
+            return [children.get(str(i)) for i in range(max_index + 1)]
+    return children
+
+
+def push_id() -> str:
+    """Chronologically sortable 20-character key in the same format as RTDB push()."""
+    now = int(time.time() * 1000)
+    timestamp = ""
+    for _ in range(8):
+        timestamp = _PUSH_CHARS[now % 64] + timestamp
+        now //= 64
+    return timestamp + "".join(random.choice(_PUSH_CHARS) for _ in range(12))
+
+
+def _split(path: str) -> List[str]:
+    return [part for part in str(path).split("/") if part]
+
+
+# ================================
+# Storage backends (one value per root key)
+# ================================
+class JSONFileBackend:
+    """Whole database in one JSON file, rewritten atomically after every write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Dict[str, Any] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f) or {}
+
+    def keys(self) -> List[str]:
+        return list(self._data)
+
+    def read(self, key: str) -> Any:
+        return self._data.get(key)
+
+    def write(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if value is None:
+                self._data.pop(key, None)
+            else:
+                self._data[key] = value
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteBackend:
+    """One row per root key; only the touched root keys are read or rewritten."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # check_same_thread=False: worker pools share one connection under LocalDatabase's lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS rtdb (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def keys(self) -> List[str]:
+        return [row[0] for row in self._conn.execute("SELECT key FROM rtdb")]
+
+    def read(self, key: str) -> Any:
+        row = self._conn.execute("SELECT value FROM rtdb WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def write(self, values: Dict[str, Any]):
+        with self._conn:
+            for key, value in values.items():
+                if value is None:
+                    self._conn.execute("DELETE FROM rtdb WHERE key = ?", (key,))
+                else:
+                    self._conn.execute("INSERT OR REPLACE INTO rtdb (key, value) VALUES (?, ?)",
+                                       (key, json.dumps(value, ensure_ascii=False)))
+
+
+class LocalDatabase:
+    """Root-key cache over a backend; every write is applied to the cache and persisted together."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self.backend = JSONFileBackend(path) if path.endswith(".json") else SQLiteBackend(path)
+        self._lock = threading.RLock()
+        self._cache: Dict[str, Any] = {}
+
+    def root_keys(self) -> List[str]:
+        with self._lock:
+            return sorted(self.backend.keys())
+
+    def _root(self, key: str) -> Any:
+        if key not in self._cache:
+            self._cache[key] = self.backend.read(key)
+        return self._cache[key]
+
+    def read(self, parts: List[str]) -> Any:
+        """Stored value at a path (shared with the cache: callers must not mutate it)."""
+        with self._lock:
+            if not parts:
+                return {key: self._root(key) for key in self.backend.keys()} or None
+            node = self._root(parts[0])
+            for part in parts[1:]:
+                if not isinstance(node, dict):
+                    return None
+                node = node.get(part)
+            return node
+
+    def write(self, writes: Dict[str, Any]):
+        """Apply {path: value} writes (None deletes) atomically."""
+        staged = [(_split(path), to_stored(value)) for path, value in writes.items()]
+        with self._lock:
+            # New values of the touched root keys; _set_in copies only the nodes along the
+            # written path, so cached values are never mutated and need no deep copy
+            changes: Dict[str, Any] = {}
+            for parts, value in staged:
+                if not parts:
+                    changes.update({key: None for key in self.backend.keys()})
+                    changes.update(value if isinstance(value, dict) else {})
+                    continue
+                root = parts[0]
+                current = changes[root] if root in changes else self._root(root)
+                changes[root] = _set_in(current, parts[1:], value)
+            self.backend.write(changes)
+            self._cache.update(changes)
+
+    def seed_exports(self, paths: Iterable[str]) -> List[str]:
+        """Load RTDB export dumps; the root key is taken from the file name."""
+        writes = {}
+        for path in paths:
+            name = os.path.basename(path)
+            match = re.fullmatch(r"client-simulation-default-rtdb-(.+)-export\.json", name)
+            key = match.group(1) if match else os.path.splitext(name)[0]
+            with open(path, "r", encoding="utf-8") as f:
+                writes[key] = json.load(f)
+        if writes:
+            self.write(writes)
+        return sorted(writes)
+
+
+def _set_in(node: Any, parts: List[str], value: Any) -> Any:
+    """node with `value` placed at `parts` (empty parents are pruned, as RTDB does)."""
+    if not parts:
+        return value
+    node = dict(node) if isinstance(node, dict) else {}
+    child = _set_in(node.get(parts[0]), parts[1:], value)
+    if child is None:
+        node.pop(parts[0], None)
+    else:
+        node[parts[0]] = child
+    return node or None
+
+
+# ================================
+# db.Reference stand-in
+# ================================
+class LocalReference:
+    """Drop-in for firebase_admin.db.Reference backed by a LocalDatabase."""
+
+    def __init__(self, database: LocalDatabase, path: str = "/"):
+        self._database = database
+        self._parts = _split(path)
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._parts)
+
+    @property
+    def parent(self) -> Optional["LocalReference"]:
+        if not self._parts:
+            return None
+        return LocalReference(self._database, "/".join(self._parts[:-1]))
+
+    def child(self, path: str) -> "LocalReference":
+        if not path or not isinstance(path, str) or re.search(r'[.$#\[\]]', path):
+            raise ValueError(f"Illegal child path: {path}")
+        return LocalReference(self._database, "/".join(self._parts + _split(path)))
+
+    def get(self, shallow: bool = False) -> Any:
+        if shallow and not self._parts:
+            return {key: True for key in self._database.root_keys()} or None
+        value = self._database.read(self._parts)
+        if shallow:
+            if isinstance(value, dict):
+                return {key: True if isinstance(child, dict) else child for key, child in value.items()}
+            return value
+        return to_returned(value)
+
+    def set(self, value: Any):
+        if value is None:
+            raise ValueError("Value must not be None.")
+        self._database.write({self.path: value})
+
+    def update(self, value: Dict[str, Any]):
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        if None in value:
+            raise ValueError("Dictionary must not contain None keys.")
+        self._database.write({f"{self.path}/{path}": child for path, child in value.items()})
+
+    def push(self, value: Any = "") -> "LocalReference":
+        reference = self.child(push_id())
+        reference.set(value)
+        return reference
+
+    def delete(self):
+        self._database.write({self.path: None})
+
+
+_databases: Dict[str, LocalDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_local_ref(path: Optional[str] = None, seed_dir: Optional[str] = None) -> LocalReference:
+    """
+    Root reference of the local database at `path` (env PSYCHE_LOCAL_DB_PATH, default
+    DEFAULT_DB_PATH). One LocalDatabase per file is shared by all callers. An empty
+    database is seeded from the export dumps in `seed_dir` (env PSYCHE_LOCAL_DB_SEED).
+    """
+    path = os.path.abspath(path or os.environ.get("PSYCHE_LOCAL_DB_PATH", DEFAULT_DB_PATH))
+    seed_dir = seed_dir or os.environ.get("PSYCHE_LOCAL_DB_SEED")
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = LocalDatabase(path)
+            if seed_dir and not database.root_keys():
+                database.seed_exports(sorted(glob.glob(os.path.join(seed_dir, EXPORT_PATTERN))))
+    return LocalReference(database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the local Realtime Database stand-in from RTDB export dumps.")
+    parser.add_argument("sources", nargs="+", help=f"Export files or directories containing {EXPORT_PATTERN}")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Database file (*.json or SQLite)")
+    args = parser.parse_args()
+
+    paths = []
+    for source in args.sources:
+        paths.extend(sorted(glob.glob(os.path.join(source, EXPORT_PATTERN))) if os.path.isdir(source) else [source])
+    keys = LocalDatabase(args.db).seed_exports(paths)
+    print(f"Seeded {len(keys)} root keys into {args.db}")
+    for key in keys:
+        print(f"  {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
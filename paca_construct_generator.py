@@ -3,12 +3,113 @@ PACA Construct Generator
 
 Creates a PACA construct by querying the PACA agent for field values.
 The output structure matches the SP construct structure for easy comparison.
+
+Extraction modes (CONSTRUCT_MODES):
+- sequential (default): every question goes through paca_agent and is appended to its memory
+- concurrent: the interview history is frozen once (paca_agent.snapshot_agent()) and all
+  independent questions are sent at the same time against that snapshot; only the
+  per-symptom questions wait for the symptom count / symptom names
+- structured: the whole construct is asked for once as JSON, validated against
+  sp_construct_generator.PSYCHE_RUBRIC_STRUCTURE, and only missing/invalid fields are re-asked
 """
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Tuple
 import re
 
+from sp_construct_generator import PSYCHE_RUBRIC_STRUCTURE
+
+CONSTRUCT_MODES = ("sequential", "concurrent", "structured")
+
+# Parallel construct questions in concurrent mode
+MAX_CONSTRUCT_WORKERS = 8
+
+# (section, key, field name asked, guide) in the order the sequential mode asks them.
+# "Present illness" symptoms are asked right after the chief complaint.
+CONSTRUCT_FIELDS = [
+    ("Chief complaint", "description", "Chief complaint", "Describe in the patient's words"),
+    ("Present illness", "triggering_factor", "triggering factor",
+     "The reason patient came to the hospital at this time"),
+    ("Present illness", "stressor", "stressor",
+     "(multiple answers available) home/work/school/legal issue/medical comorbidity/interpersonal difficulty/null"),
+    ("Family history", "diagnosis", "Family history diagnosis",
+     "Describe a psychiatric family history in detail. Include which family member(s) had what psychiatric condition(s) and when they experienced it, if known. Provide as much detail as you gathered during the interview."),
+    ("Family history", "substance use", "Family history substance use",
+     "Describe a family history of substance use in detail. Include which family member(s) used what substance(s) (alcohol, opioid, cannabinoid, etc.) and when they used it, if known. Provide as much detail as you gathered during the interview."),
+    ("Marriage/Relationship History", "current family structure", "Current family structure", ""),
+    ("Impulsivity", "Suicidal ideation", "Suicidal ideation", "candidate: high/moderate/low"),
+    ("Impulsivity", "Self mutilating behavior risk", "Self mutilating behavior risk", "candidate: high/moderate/low"),
+    ("Impulsivity", "Homicide risk", "Homicide risk", "candidate: high/moderate/low"),
+    ("Impulsivity", "Suicidal plan", "Suicidal plan", "candidate: presence/absence"),
+    ("Impulsivity", "Suicidal attempt", "Suicidal attempt", "candidate: presence/absence"),
+    ("Mental Status Examination", "Mood", "Mood",
+     "candidate (multiple selections allowed, comma-separated): euphoric/elated/euthymic/dysphoric/depressed/irritable"),
+    ("Mental Status Examination", "Affect", "Affect",
+     "candidate (multiple selections allowed, comma-separated): broad/restricted/blunt/flat/labile/anxious/tense/shallow/inadequate/inappropriate"),
+    ("Mental Status Examination", "Verbal productivity", "Verbal productivity", "candidate: increased/moderate/decreased"),
+    ("Mental Status Examination", "Insight", "Insight",
+     "candidate: Complete denial of illness/Slight awareness of being sick and needing help, but denying it at the same time/Awareness of being sick but blaming it on others, external events/Intellectual insight/True emotional insight"),
+    ("Mental Status Examination", "Perception", "Perception",
+     "candidate (multiple selections allowed, comma-separated): Normal/Illusion/Auditory hallucination/Visual hallucination/Olfactory hallucination/Gustatory hallucination/Depersonalization/Derealization/Déjà vu/Jamais vu"),
+    ("Mental Status Examination", "Thought process", "Thought process",
+     "candidate (multiple selections allowed, comma-separated): Normal/Loosening of association/Flight of idea/Circumstantiality/Tangentiality/Word salad/Neologism/Illogical/Irrelevant"),
+    ("Mental Status Examination", "Thought content", "Thought content",
+     "candidate (multiple selections allowed, comma-separated): Normal/Preoccupation/Overvalued idea/Idea of reference/Grandiosity/Obsession/Compulsion/Rumination/Delusion/Phobia"),
+    ("Mental Status Examination", "Spontaneity", "Spontaneity", "candidate: (+)/(-)"),
+    ("Mental Status Examination", "Social judgement", "Social judgement", "candidate: Normal/Impaired"),
+    ("Mental Status Examination", "Reliability", "Reliability", "candidate: Yes/No"),
+]
+
+EMPTY_SYMPTOMS = {"symptom_1": {"name": "N/A", "length": 0, "alleviating factor": "", "exacerbating factor": ""}}
+
+
+# ================================
+# Symptom questions
+# ================================
+prompt_symptoms_count = """Based on the patient interview, how many main psychiatric symptoms did the patient present?
+    Please provide ONLY a number (e.g., 1, 2, etc.).
+    If you did not assess this or are uncertain, provide your best estimate.
+    If multiple features can be reasonably summarized as a single main symptom, count them as one; do not split them unnecessarily."""
+
+
+def symptom_name_prompt(symptom_num: int) -> str:
+    return f"""Based on the patient interview, what is symptom #{symptom_num}? 
+        Please provide ONLY the symptom name in SHORT form (e.g., "Depressed mood", "Insomnia", etc.).
+        If you did not assess this symptom or if there are fewer than {symptom_num} symptoms, state "N/A".
+        Respond in English."""
+
+
+def symptom_detail_prompts(symptom_name: str) -> Dict[str, str]:
+    """Per-symptom follow-up questions (depend on the symptom name)."""
+    return {
+        'length': f"""For the patient's symptom "{symptom_name}", how long has it been present? 
+        Please provide ONLY a number in weeks (e.g., 4, 12, 24). If over 24 weeks, answer 24.
+        If you did not assess this or do not know, state "N/A".""",
+        'alleviating factor': f"""For the patient's symptom "{symptom_name}", what makes it better or improves it?
+        Please provide a concise answer. If you did not assess this aspect or if there are none, state "None".
+        Respond in English.""",
+        'exacerbating factor': f"""For the patient's symptom "{symptom_name}", what makes it worse or triggers it?
+        Please provide a concise answer. If you did not assess this aspect or if there are none, state "None".
+        Respond in English.""",
+    }
+
+
+def parse_symptom_count(response: str) -> int:
+    try:
+        num_symptoms = int(re.search(r'\d+', response).group())
+        return max(1, min(num_symptoms, 5))  # Limit to 1-5 symptoms
+    except:
+        return 1
+
+
+def parse_symptom_duration(response: str) -> int:
+    try:
+        duration = int(re.search(r'\d+', response).group())
+        return max(0, min(duration, 24))  # Limit to 0-24
+    except:
+        return 0
+
 
 def generate_symptoms_from_paca(paca_agent) -> Dict[str, Dict[str, Any]]:
     """
@@ -18,17 +119,7 @@ def generate_symptoms_from_paca(paca_agent) -> Dict[str, Dict[str, Any]]:
     """
     
     # Step 1: Ask how many main symptoms
-    prompt_symptoms_count = """Based on the patient interview, how many main psychiatric symptoms did the patient present?
-    Please provide ONLY a number (e.g., 1, 2, etc.).
-    If you did not assess this or are uncertain, provide your best estimate.
-    If multiple features can be reasonably summarized as a single main symptom, count them as one; do not split them unnecessarily."""
-    
-    response = paca_agent(prompt_symptoms_count)
-    try:
-        num_symptoms = int(re.search(r'\d+', response).group())
-        num_symptoms = max(1, min(num_symptoms, 5))  # Limit to 1-5 symptoms
-    except:
-        num_symptoms = 1
+    num_symptoms = parse_symptom_count(paca_agent(prompt_symptoms_count))
     
     symptoms = {}
     
@@ -38,49 +129,49 @@ def generate_symptoms_from_paca(paca_agent) -> Dict[str, Dict[str, Any]]:
         symptom = {}
         
         # Get symptom name
-        prompt_name = f"""Based on the patient interview, what is symptom #{symptom_num}? 
-        Please provide ONLY the symptom name in SHORT form (e.g., "Depressed mood", "Insomnia", etc.).
-        If you did not assess this symptom or if there are fewer than {symptom_num} symptoms, state "N/A".
-        Respond in English."""
-        
-        response = paca_agent(prompt_name)
+        response = paca_agent(symptom_name_prompt(symptom_num))
         symptom['name'] = response.strip()
         
         if "n/a" in response.lower():
             continue
         
-        # Get symptom duration
-        prompt_duration = f"""For the patient's symptom "{symptom['name']}", how long has it been present? 
-        Please provide ONLY a number in weeks (e.g., 4, 12, 24). If over 24 weeks, answer 24.
-        If you did not assess this or do not know, state "N/A"."""
-        
-        response = paca_agent(prompt_duration)
-        try:
-            duration = int(re.search(r'\d+', response).group())
-            duration = max(0, min(duration, 24))  # Limit to 0-24
-        except:
-            duration = 0
-        symptom['length'] = duration
-        
-        # Get alleviating factors
-        prompt_alleviating = f"""For the patient's symptom "{symptom['name']}", what makes it better or improves it?
-        Please provide a concise answer. If you did not assess this aspect or if there are none, state "None".
-        Respond in English."""
-        
-        response = paca_agent(prompt_alleviating)
-        symptom['alleviating factor'] = response.strip()
-        
-        # Get exacerbating factors
-        prompt_exacerbating = f"""For the patient's symptom "{symptom['name']}", what makes it worse or triggers it?
-        Please provide a concise answer. If you did not assess this aspect or if there are none, state "None".
-        Respond in English."""
-        
-        response = paca_agent(prompt_exacerbating)
-        symptom['exacerbating factor'] = response.strip()
+        # Get symptom duration, alleviating and exacerbating factors
+        prompts = symptom_detail_prompts(symptom['name'])
+        symptom['length'] = parse_symptom_duration(paca_agent(prompts['length']))
+        symptom['alleviating factor'] = paca_agent(prompts['alleviating factor']).strip()
+        symptom['exacerbating factor'] = paca_agent(prompts['exacerbating factor']).strip()
         
         symptoms[f"symptom_{symptom_num}"] = symptom
     
-    return symptoms if symptoms else {"symptom_1": {"name": "N/A", "length": 0, "alleviating factor": "", "exacerbating factor": ""}}
+    return symptoms if symptoms else dict(EMPTY_SYMPTOMS)
+
+
+def generate_symptoms_concurrent(ask, executor) -> Dict[str, Dict[str, Any]]:
+    """
+    Same questions as generate_symptoms_from_paca, fanned out on `executor`:
+    count -> all symptom names at once -> all per-symptom details at once.
+    """
+    num_symptoms = parse_symptom_count(ask(prompt_symptoms_count))
+    
+    names = list(executor.map(ask, [symptom_name_prompt(n + 1) for n in range(num_symptoms)]))
+    assessed = [(n + 1, name.strip()) for n, name in enumerate(names) if "n/a" not in name.lower()]
+    
+    detail_futures = {
+        symptom_num: {key: executor.submit(ask, prompt) for key, prompt in symptom_detail_prompts(name).items()}
+        for symptom_num, name in assessed
+    }
+    
+    symptoms = {}
+    for symptom_num, name in assessed:
+        futures = detail_futures[symptom_num]
+        symptoms[f"symptom_{symptom_num}"] = {
+            'name': name,
+            'length': parse_symptom_duration(futures['length'].result()),
+            'alleviating factor': futures['alleviating factor'].result().strip(),
+            'exacerbating factor': futures['exacerbating factor'].result().strip(),
+        }
+    
+    return symptoms if symptoms else dict(EMPTY_SYMPTOMS)
 
 
 def generate_field(paca_agent, field_name: str, guide: str = "") -> str:
@@ -102,7 +193,21 @@ def generate_field(paca_agent, field_name: str, guide: str = "") -> str:
     return response.strip()
 
 
-def create_paca_construct(paca_agent) -> Dict[str, Any]:
+def assemble_construct(field_values: Dict[Tuple[str, str], str], symptoms: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the construct dict (section order of CONSTRUCT_FIELDS, symptoms first in Present illness)."""
+    paca_construct = {}
+    for section, key, _, _ in CONSTRUCT_FIELDS:
+        if section not in paca_construct:
+            paca_construct[section] = {}
+            if section == "Present illness":
+                # Add symptoms to construct (will be collected as list by sp_construct_generator logic)
+                paca_construct[section].update(symptoms)
+        paca_construct[section][key] = field_values[(section, key)]
+    return paca_construct
+
+
+def create_paca_construct(paca_agent, mode: str = "sequential",
+                          max_workers: int = MAX_CONSTRUCT_WORKERS) -> Dict[str, Any]:
     """
     Create a PACA construct with the same structure as SP construct.
     
@@ -135,121 +240,236 @@ def create_paca_construct(paca_agent) -> Dict[str, Any]:
         }
     }
     """
+    if mode not in CONSTRUCT_MODES:
+        raise ValueError(f"Unknown construct mode '{mode}'. Choose from {CONSTRUCT_MODES}")
+    if mode == "structured":
+        return create_paca_construct_structured(paca_agent)
+    if mode == "concurrent" and hasattr(paca_agent, "snapshot_agent"):
+        return create_paca_construct_concurrent(paca_agent, max_workers=max_workers)
     
-    paca_construct = {}
+    field_values = {}
     
     # === Chief Complaint ===
-    paca_construct["Chief complaint"] = {
-        "description": generate_field(paca_agent, "Chief complaint", "Describe in the patient's words")
-    }
-    
-    # === Present Illness ===
-    paca_construct["Present illness"] = {}
+    section, key, field_name, guide = CONSTRUCT_FIELDS[0]
+    field_values[(section, key)] = generate_field(paca_agent, field_name, guide)
     
-    # Generate multiple symptoms (returns dict with symptom_1, symptom_2, etc.)
+    # === Present Illness symptoms (returns dict with symptom_1, symptom_2, etc.) ===
     symptoms = generate_symptoms_from_paca(paca_agent)
     
-    # Add symptoms to construct (will be collected as list by sp_construct_generator logic)
-    for symptom_key, symptom_data in symptoms.items():
-        paca_construct["Present illness"][symptom_key] = symptom_data
-    
-    # Get triggering factor
-    paca_construct["Present illness"]["triggering_factor"] = generate_field(
-        paca_agent, "triggering factor",
-        "The reason patient came to the hospital at this time"
-    )
-    
-    # Get stressor
-    paca_construct["Present illness"]["stressor"] = generate_field(
-        paca_agent, "stressor",
-        "(multiple answers available) home/work/school/legal issue/medical comorbidity/interpersonal difficulty/null"
-    )
-    
-    # === Family History ===
-    paca_construct["Family history"] = {
-        "diagnosis": generate_field(
-            paca_agent, "Family history diagnosis",
-            "Describe a psychiatric family history in detail. Include which family member(s) had what psychiatric condition(s) and when they experienced it, if known. Provide as much detail as you gathered during the interview."
-        ),
-        "substance use": generate_field(
-            paca_agent, "Family history substance use",
-            "Describe a family history of substance use in detail. Include which family member(s) used what substance(s) (alcohol, opioid, cannabinoid, etc.) and when they used it, if known. Provide as much detail as you gathered during the interview."
-        )
-    }
+    # === Remaining fields, one question at a time ===
+    for section, key, field_name, guide in CONSTRUCT_FIELDS[1:]:
+        field_values[(section, key)] = generate_field(paca_agent, field_name, guide)
     
-    # === Marriage/Relationship History ===
-    paca_construct["Marriage/Relationship History"] = {
-        "current family structure": generate_field(
-            paca_agent, "Current family structure"
-        )
-    }
+    return assemble_construct(field_values, symptoms)
+
+
+def create_paca_construct_concurrent(paca_agent, max_workers: int = MAX_CONSTRUCT_WORKERS) -> Dict[str, Any]:
+    """
+    Concurrent construct extraction over a frozen snapshot of the interview.
     
-    # === Impulsivity ===
-    paca_construct["Impulsivity"] = {
-        "Suicidal ideation": generate_field(
-            paca_agent, "Suicidal ideation",
-            "candidate: high/moderate/low"
-        ),
-        "Self mutilating behavior risk": generate_field(
-            paca_agent, "Self mutilating behavior risk",
-            "candidate: high/moderate/low"
-        ),
-        "Homicide risk": generate_field(
-            paca_agent, "Homicide risk",
-            "candidate: high/moderate/low"
-        ),
-        "Suicidal plan": generate_field(
-            paca_agent, "Suicidal plan",
-            "candidate: presence/absence"
-        ),
-        "Suicidal attempt": generate_field(
-            paca_agent, "Suicidal attempt",
-            "candidate: presence/absence"
-        )
-    }
+    paca_agent.snapshot_agent() returns a stateless responder bound to the current
+    history, so answers don't see each other and the PACA memory is left untouched.
+    """
+    ask = paca_agent.snapshot_agent()
     
-    # === Mental Status Examination ===
-    paca_construct["Mental Status Examination"] = {
-        "Mood": generate_field(
-            paca_agent, "Mood",
-            "candidate (multiple selections allowed, comma-separated): euphoric/elated/euthymic/dysphoric/depressed/irritable"
-        ),
-        "Affect": generate_field(
-            paca_agent, "Affect",
-            "candidate (multiple selections allowed, comma-separated): broad/restricted/blunt/flat/labile/anxious/tense/shallow/inadequate/inappropriate"
-        ),
-        "Verbal productivity": generate_field(
-            paca_agent, "Verbal productivity",
-            "candidate: increased/moderate/decreased"
-        ),
-        "Insight": generate_field(
-            paca_agent, "Insight",
-            "candidate: Complete denial of illness/Slight awareness of being sick and needing help, but denying it at the same time/Awareness of being sick but blaming it on others, external events/Intellectual insight/True emotional insight"
-        ),
-        "Perception": generate_field(
-            paca_agent, "Perception",
-            "candidate (multiple selections allowed, comma-separated): Normal/Illusion/Auditory hallucination/Visual hallucination/Olfactory hallucination/Gustatory hallucination/Depersonalization/Derealization/Déjà vu/Jamais vu"
-        ),
-        "Thought process": generate_field(
-            paca_agent, "Thought process",
-            "candidate (multiple selections allowed, comma-separated): Normal/Loosening of association/Flight of idea/Circumstantiality/Tangentiality/Word salad/Neologism/Illogical/Irrelevant"
-        ),
-        "Thought content": generate_field(
-            paca_agent, "Thought content",
-            "candidate (multiple selections allowed, comma-separated): Normal/Preoccupation/Overvalued idea/Idea of reference/Grandiosity/Obsession/Compulsion/Rumination/Delusion/Phobia"
-        ),
-        "Spontaneity": generate_field(
-            paca_agent, "Spontaneity",
-            "candidate: (+)/(-)"
-        ),
-        "Social judgement": generate_field(
-            paca_agent, "Social judgement",
-            "candidate: Normal/Impaired"
-        ),
-        "Reliability": generate_field(
-            paca_agent, "Reliability",
-            "candidate: Yes/No"
-        )
-    }
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        field_futures = {
+            (section, key): executor.submit(generate_field, ask, field_name, guide)
+            for section, key, field_name, guide in CONSTRUCT_FIELDS
+        }
+        # Symptom chain runs in this thread (it waits on its own futures) and fans out on the same executor
+        symptoms = generate_symptoms_concurrent(ask, executor)
+        field_values = {field: future.result() for field, future in field_futures.items()}
     
-    return paca_construct
+    return assemble_construct(field_values, symptoms)
+
+
+# ================================
+# Structured (single-call JSON) extraction
+# ================================
+structured_prompt = """Based on your psychiatric interview and the entire conversation history, fill in the patient's case summary below.
+Return ONLY a JSON object with exactly these keys (no markdown, no comments).
+Each value is a concise SHORT-ANSWER string following its guideline (the chief complaint may be a sentence).
+"symptoms" lists up to 5 main psychiatric symptoms; count features that can be summarized as a single main symptom as one.
+For each symptom give "name" (short form), "length" (number of weeks present, 24 if over 24 weeks), "alleviating factor" and "exacerbating factor" ("None" if none).
+If you did not assess an aspect during the interview or do not know, use "N/A".
+Respond in English.
+
+{schema}"""
+
+repair_prompt = """Some fields of your previous answer were missing or invalid:
+{problems}
+
+Return ONLY a JSON object with exactly these keys, fixing those fields (no markdown, no comments).
+If you did not assess an aspect during the interview or do not know, use "N/A".
+
+{schema}"""
+
+SYMPTOMS_KEY = "symptoms"
+SYMPTOM_SCHEMA = {
+    "name": "short symptom name",
+    "length": "weeks (number, 0-24)",
+    "alleviating factor": "...",
+    "exacerbating factor": "...",
+}
+
+
+def _normalize_key(key: str) -> str:
+    return re.sub(r"[\s_]+", " ", str(key)).strip().lower()
+
+
+def _field_json_key(section: str, key: str) -> str:
+    """Flat JSON key for a construct field, e.g. 'Impulsivity.Suicidal plan'."""
+    return f"{section}.{key}"
+
+
+def _candidates(guide: str) -> Tuple[List[str], bool]:
+    """Candidate answers listed in a field guide (and whether several may be selected)."""
+    match = re.match(r"candidate( \(multiple selections allowed, comma-separated\))?: (.+)$", guide)
+    if not match:
+        return [], False
+    return [c.strip() for c in match.group(2).split("/")], bool(match.group(1))
+
+
+def rubric_field_locations() -> Dict[str, Tuple[str, str]]:
+    """
+    Map every PSYCHE_RUBRIC_STRUCTURE field to its (section, key) in the PACA construct.
+    Symptom sub-fields map to (section, SYMPTOMS_KEY).
+    """
+    locations = {}
+    for section, spec in PSYCHE_RUBRIC_STRUCTURE.items():
+        fields = {section: spec} if "profile_key" in spec else spec
+        for rubric_field, field_spec in fields.items():
+            if "subfield" in field_spec:
+                locations[rubric_field] = (section, SYMPTOMS_KEY)
+                continue
+            # profile_key ends with the construct key ("..._n" marks numbered SP keys)
+            wanted = _normalize_key(re.sub(r"_n$", "", field_spec["profile_key"].split(".")[-1]))
+            for construct_section, key, _, _ in CONSTRUCT_FIELDS:
+                if construct_section == section and _normalize_key(key) == wanted:
+                    locations[rubric_field] = (construct_section, key)
+                    break
+            else:
+                raise KeyError(f"PSYCHE rubric field '{rubric_field}' has no PACA construct field")
+    return locations
+
+
+def structured_schema(fields=None, include_symptoms: bool = True) -> str:
+    """JSON template sent to the model (field guide as the placeholder value)."""
+    fields = CONSTRUCT_FIELDS if fields is None else fields
+    schema = {_field_json_key(section, key): guide or field_name for section, key, field_name, guide in fields}
+    if include_symptoms:
+        schema[SYMPTOMS_KEY] = [SYMPTOM_SCHEMA]
+    return json.dumps(schema, indent=2, ensure_ascii=False)
+
+
+def parse_json_object(response: str) -> Dict[str, Any]:
+    """Extract the first JSON object from a model response ({} if none parses)."""
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        parsed = json.loads(match.group())
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def validate_field(value: Any, guide: str) -> str:
+    """Return a problem description, or "" when the value is acceptable."""
+    if not isinstance(value, str) or not value.strip():
+        return "missing"
+    answer = value.strip()
+    candidates, multiple = _candidates(guide)
+    if not candidates or answer.lower() in ("n/a", "none"):
+        return ""
+    allowed = {c.lower() for c in candidates}
+    chosen = [a.strip().lower() for a in answer.split(",")] if multiple else [answer.lower()]
+    invalid = [c for c in chosen if c not in allowed]
+    return f"not one of the candidates ({', '.join(invalid)})" if invalid else ""
+
+
+def normalize_symptoms(raw_symptoms: Any) -> Tuple[Dict[str, Dict[str, Any]], str]:
+    """Turn the JSON symptom list into symptom_n entries; returns (symptoms, problem)."""
+    if not isinstance(raw_symptoms, list) or not raw_symptoms:
+        return {}, "missing"
+    symptoms = {}
+    for i, raw in enumerate(raw_symptoms[:5]):
+        if not isinstance(raw, dict) or not str(raw.get("name", "")).strip():
+            return {}, f"symptom {i + 1} has no name"
+        name = str(raw["name"]).strip()
+        if "n/a" in name.lower():
+            continue
+        symptoms[f"symptom_{i + 1}"] = {
+            'name': name,
+            'length': parse_symptom_duration(str(raw.get("length", ""))),
+            'alleviating factor': str(raw.get("alleviating factor", "None")).strip(),
+            'exacerbating factor': str(raw.get("exacerbating factor", "None")).strip(),
+        }
+    return symptoms, ""
+
+
+def validate_structured_answer(answer: Dict[str, Any], fields=None, include_symptoms: bool = True):
+    """
+    Validate a parsed JSON answer against the rubric fields.
+
+    Returns:
+        (field_values, symptoms, problems) where problems maps the JSON key to its issue
+    """
+    fields = CONSTRUCT_FIELDS if fields is None else fields
+    guides = {(section, key): guide for section, key, _, guide in fields}
+    field_values, problems = {}, {}
+
+    for rubric_field, (section, key) in rubric_field_locations().items():
+        if key == SYMPTOMS_KEY or (section, key) not in guides:
+            continue
+        json_key = _field_json_key(section, key)
+        value = answer.get(json_key)
+        problem = validate_field(value, guides[(section, key)])
+        if problem:
+            problems[json_key] = f"{rubric_field}: {problem}"
+        elif "i don't know" in value.lower() or "uncertain" in value.lower():
+            field_values[(section, key)] = "N/A"
+        else:
+            field_values[(section, key)] = value.strip()
+
+    symptoms = {}
+    if include_symptoms:
+        symptoms, problem = normalize_symptoms(answer.get(SYMPTOMS_KEY))
+        if problem:
+            problems[SYMPTOMS_KEY] = f"Symptoms: {problem}"
+
+    return field_values, symptoms, problems
+
+
+def create_paca_construct_structured(paca_agent, max_repair_rounds: int = 1) -> Dict[str, Any]:
+    """
+    Ask for the whole construct as one JSON object, then re-ask only missing/invalid fields.
+
+    Uses paca_agent.snapshot_agent() when available so the PACA memory is left untouched.
+    Fields still invalid after the repair rounds are saved as "N/A" (symptoms: the usual empty entry).
+    """
+    ask = paca_agent.snapshot_agent() if hasattr(paca_agent, "snapshot_agent") else paca_agent
+
+    answer = parse_json_object(ask(structured_prompt.format(schema=structured_schema())))
+    field_values, symptoms, problems = validate_structured_answer(answer)
+
+    for _ in range(max_repair_rounds):
+        if not problems:
+            break
+        retry_fields = [f for f in CONSTRUCT_FIELDS if _field_json_key(f[0], f[1]) in problems]
+        retry_symptoms = SYMPTOMS_KEY in problems
+        response = ask(repair_prompt.format(
+            problems="\n".join(f"- {problem}" for problem in problems.values()),
+            schema=structured_schema(retry_fields, include_symptoms=retry_symptoms),
+        ))
+        retry_values, retry_symptom_values, problems = validate_structured_answer(
+            parse_json_object(response), retry_fields, include_symptoms=retry_symptoms)
+        field_values.update(retry_values)
+        if retry_symptoms:
+            symptoms = retry_symptom_values
+
+    for section, key, _, _ in CONSTRUCT_FIELDS:
+        field_values.setdefault((section, key), "N/A")
+
+    return assemble_construct(field_values, symptoms if symptoms else dict(EMPTY_SYMPTOMS))
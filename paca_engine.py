@@ -0,0 +1,463 @@
+"""
+Unified PACA Engine
+PACA 에이전트와 대화 시뮬레이션 공통 엔진 (모델 추가 = PACA_MODELS 설정 항목 추가)
+
+Every PACA variant is a PacaModel entry: provider, model, prompt variant and the few
+behaviors in which the old per-model modules differed (greeting, whether the agent
+greets through the LLM, per-page agent caching, streaming to stdout). The
+PACA_*_utils.py modules are thin wrappers that pin a variant for their pages.
+
+    register_paca_model(PacaModel("gpt41_interview", "openai", "gpt-4.1-2025-04-14"))
+    paca_agent, paca_memory, version = create_paca_agent("gpt41_interview", paca_version)
+    for speaker, message in simulate_conversation(paca_agent, sp_agent):
+        ...
+
+Clients: one chat model per (provider, model, temperature, stdout streaming) is built
+on first use through client_registry, so variants on the same model share one instance
+and its connections; OpenAI models additionally share one pooled HTTP client
+(configure_connection_pool). Calls go through the shared LLM scheduler (llm_scheduler.py:
+rate limits, retries, circuit breaker); set_max_concurrent_calls caps in-flight calls
+per provider/model, e.g. for run_experiments.py worker pools.
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import streamlit as st
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from client_registry import (chat_anthropic, chat_ollama, chat_openai, get_client, register_client,
+                             register_llm, reset_clients)
+from firebase_utils import save_to_firebase
+from history_window import create_history_window
+from llm_scheduler import estimate_tokens, scheduler
+
+GREETING = "안녕하세요, 저는 정신과 의사 김민수입니다. 이름이 어떻게 되시나요?"
+GREETING_EN = "Hello, I'm Dr. Kim Min-soo, a psychiatrist. What is your name?"
+
+# ================================
+# Prompt variants
+# ================================
+# Current interview prompt (Korean, assessment checklist, conversational style rules)
+interview_prompt = """
+You are an experienced psychiatrist conducting an initial interview with a new patient. Your goal is to gather comprehensive information about the patient's mental health, symptoms, background, and potential diagnoses. Use a combination of open-ended questions, specific inquiries, and follow-up questions to explore the patient's situation in depth. Pay attention to both verbal and non-verbal cues, and use your expertise to guide the conversation towards areas that may be particularly relevant for diagnosis. Proceed in Korean.
+
+The following aspects need to be assessed in the patient: Chief complaint, Present illness, Symptoms, Alleviating factors, Exacerbating factors, Symptom duration, Triggering factors (why the patient decided to visit the hospital today), Stressors, Family history (including diagnoses and substance use), Current family structure, Suicidal ideation, Suicide risk, Self-harming behavior risk, Homicide risk, Suicidal plans, Suicide attempts, Mood, Affect, Verbal productivity, Insight, Perception, Thought process, Thought content, Spontaneity, Social judgment, and Reliability.
+
+IMPORTANT INSTRUCTIONS FOR NATURAL CONVERSATION:
+- You must NEVER use bullet points, lists, headings, or any structured formatting of any kind.
+- Keep your responses brief and conversational, like a real doctor talking to a patient.
+- Never use bullet points, lists, or structured formatting in your responses.
+- Ask one question at a time, waiting for the patient’s response before asking the next.
+- Use natural spoken language with contractions and an informal tone.
+- If the patient mentions something relevant, follow up naturally with a related question.
+- Do not provide summaries, explanations, or meta-commentary unless asked.
+- Keep each response to about 1-3 sentences per turn.
+
+After the interview with the patient is complete, someone will come to ask you about the patient. As an experienced psychiatrist, use appropriate reasoning, your professional judgment, and the information you've gathered during the interview to answer their questions. If you cannot determine something even with appropriate reasoning and your expertise, respond with "I don't know".
+"""
+
+# Earlier prompts of the selectable (claude2 / llama) pages
+open_ended_prompt = """
+You are a psychiatrist conducting an initial interview with a new patient. Your goal is to gather relevant information about the patient's mental health, symptoms, and background. Ask open-ended questions and follow up on the patient's responses to gain a comprehensive understanding of their situation.
+
+After the interview with the patient is complete, someone will come to ask you about the patient. As an experienced psychiatrist, use appropriate reasoning, your professional judgment, and the information you've gathered during the interview to answer their questions. If you cannot determine something even with appropriate reasoning and your expertise, respond with "I don't know".
+"""
+
+guided_prompt = """
+You are an experienced psychiatrist conducting an initial interview with a new patient. Your goal is to gather comprehensive information about the patient's mental health, symptoms, background, and potential diagnoses. Use a combination of open-ended questions, specific inquiries, and follow-up questions to explore the patient's situation in depth. Pay attention to both verbal and non-verbal cues, and use your expertise to guide the conversation towards areas that may be particularly relevant for diagnosis.
+
+The following aspects need to be assessed in the patient: Chief complaint, Present illness, Symptoms, Alleviating factors, Exacerbating factors, Symptom duration, Triggering factors (why the patient decided to visit the hospital today), Stressors, Family history (including diagnoses and substance use), Current family structure, Suicidal ideation, Suicide risk, Self-harming behavior risk, Homicide risk, Suicidal plans, Suicide attempts, Mood, Affect, Verbal productivity, Insight, Perception, Thought process, Thought content, Spontaneity, Social judgment, and Reliability.
+
+After the interview with the patient is complete, someone will come to ask you about the patient. As an experienced psychiatrist, use appropriate reasoning, your professional judgment, and the information you've gathered during the interview to answer their questions. If you cannot determine something even with appropriate reasoning and your expertise, respond with "I don't know".
+"""
+
+PACA_PROMPTS = {
+    "interview": interview_prompt,
+    "open_ended": open_ended_prompt,
+    "guided": guided_prompt,
+}
+
+
+# ================================
+# Model registry
+# ================================
+@dataclass(frozen=True)
+class PacaModel:
+    """
+    One PACA variant.
+
+    Args:
+        name: Variant name (run_experiments.py matrices, checkpoints)
+        provider: "openai", "anthropic" or "ollama"
+        model: Provider model name
+        prompts: PACA_PROMPTS keys; with more than one the page picks one with a selectbox
+        temperature: Sampling temperature
+        stream_to_stdout: Echo streamed tokens to stdout
+        greeting: Hardcoded first PACA turn
+        generate_greeting: Older pages: the agent answers its own greeting once before
+            the interview starts and both messages are kept in its memory
+        cache_agent: Cache agents per (page_id, version, history settings) with st.cache_resource
+    """
+    name: str
+    provider: str
+    model: str
+    prompts: Tuple[str, ...] = ("interview",)
+    temperature: float = 0.7
+    stream_to_stdout: bool = False
+    greeting: str = GREETING
+    generate_greeting: bool = False
+    cache_agent: bool = True
+
+    @property
+    def client_name(self) -> str:
+        """client_registry name of the chat model, shared by every variant with the same settings."""
+        return f"paca.{self.provider}.{self.model}.t{self.temperature}" + (".stdout" if self.stream_to_stdout else "")
+
+    @property
+    def summarizer_client_name(self) -> str:
+        """Non-streaming twin of the chat model for history-window summaries (never echoed to stdout)."""
+        return f"paca.{self.provider}.{self.model}.t{self.temperature}.summarizer"
+
+
+PACA_MODELS: Dict[str, PacaModel] = {}
+
+_CHAT_MODELS = {
+    "openai": chat_openai,
+    "anthropic": chat_anthropic,
+    "ollama": chat_ollama,
+}
+
+
+def _build_llm(model: PacaModel, summarizer: bool = False):
+    kwargs = dict(model=model.model, temperature=model.temperature, streaming=not summarizer,
+                  stream_to_stdout=model.stream_to_stdout and not summarizer)
+    if model.provider == "openai":
+        kwargs.update(http_client=get_client(HTTP_POOL), http_async_client=get_client(ASYNC_HTTP_POOL))
+    return _CHAT_MODELS[model.provider](**kwargs)
+
+
+def register_paca_model(model: PacaModel, replace: bool = False):
+    """Add a variant (and its chat model client) to the registry."""
+    if model.provider not in _CHAT_MODELS:
+        raise ValueError(f"Unknown provider '{model.provider}'. Choose from {sorted(_CHAT_MODELS)}")
+    unknown = [prompt for prompt in model.prompts if prompt not in PACA_PROMPTS]
+    if not model.prompts or unknown:
+        raise ValueError(f"Unknown PACA prompt(s) {unknown}. Choose from {sorted(PACA_PROMPTS)}")
+    if model.name in PACA_MODELS and not replace:
+        raise ValueError(f"PACA variant '{model.name}' is already registered")
+    PACA_MODELS[model.name] = model
+    register_llm(model.client_name, lambda: _build_llm(model))
+    register_llm(model.summarizer_client_name, lambda: _build_llm(model, summarizer=True))
+
+
+def get_paca_model(variant: str) -> PacaModel:
+    try:
+        return PACA_MODELS[variant]
+    except KeyError:
+        raise KeyError(f"Unknown PACA variant '{variant}'. Choose from {sorted(PACA_MODELS)}") from None
+
+
+def paca_llm(variant: str):
+    """Shared chat model of a variant (built on first use)."""
+    return get_client(get_paca_model(variant).client_name)
+
+
+# ================================
+# Connection pool and concurrency limits
+# ================================
+HTTP_POOL = "paca.http_pool"
+ASYNC_HTTP_POOL = "paca.async_http_pool"
+DEFAULT_MAX_CONNECTIONS = 32
+
+_pool_limits = {"max_connections": DEFAULT_MAX_CONNECTIONS, "max_keepalive_connections": DEFAULT_MAX_CONNECTIONS}
+
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(**_pool_limits)
+
+
+def _http_pool():
+    from openai import DefaultHttpxClient
+    return DefaultHttpxClient(limits=_http_limits())
+
+
+def _async_http_pool():
+    from openai import DefaultAsyncHttpxClient
+    return DefaultAsyncHttpxClient(limits=_http_limits())
+
+
+register_client(HTTP_POOL, _http_pool)
+register_client(ASYNC_HTTP_POOL, _async_http_pool)
+
+
+def configure_connection_pool(max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                              max_keepalive_connections: Optional[int] = None):
+    """
+    Size the HTTP connection pool shared by the OpenAI PACA models. Call it before
+    agents are created: already built pools and OpenAI chat models are rebuilt on next use.
+    """
+    _pool_limits["max_connections"] = max_connections
+    _pool_limits["max_keepalive_connections"] = (
+        max_connections if max_keepalive_connections is None else max_keepalive_connections)
+    openai_models = [model for model in PACA_MODELS.values() if model.provider == "openai"]
+    reset_clients(HTTP_POOL, ASYNC_HTTP_POOL, *(model.client_name for model in openai_models),
+                  *(model.summarizer_client_name for model in openai_models))
+
+
+def set_max_concurrent_calls(limit: Optional[int], provider: Optional[str] = None):
+    """Cap in-flight LLM calls per provider/model (all providers when none is given; None lifts the cap)."""
+    for name in [provider] if provider else list(_CHAT_MODELS):
+        scheduler.set_max_concurrent(name, max(1, limit) if limit is not None else None)
+
+
+# ================================
+# Agents
+# ================================
+def _chat_prompt(system_prompt: str) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{human_input}")
+    ])
+
+
+def _remember(model: PacaModel, memory, human_input: str, response: str, is_initial_prompt: bool):
+    if not is_initial_prompt:
+        memory.add_user_message(human_input)
+    elif model.generate_greeting:
+        memory.add_ai_message(human_input)
+    memory.add_ai_message(response)
+
+
+def _new_paca_agent(variant, paca_version, system_prompt, history_turns, history_token_budget):
+    model = get_paca_model(variant)
+    memory = InMemoryChatMessageHistory()
+    # Chain is built once per agent, not on every call
+    llm = get_client(model.client_name)
+    chain = _chat_prompt(system_prompt) | llm
+    history_window = create_history_window(lambda: get_client(model.summarizer_client_name), history_turns,
+                                           history_token_budget)
+
+    def respond(chat_history, human_input):
+        inputs = {
+            "chat_history": chat_history,
+            "human_input": human_input,
+        }
+        return scheduler.call(lambda: chain.invoke(inputs), model.provider, model.model,
+                              estimate_tokens(inputs)).content
+
+    def paca_agent(human_input, is_initial_prompt=False):
+        messages = history_window.window(memory.messages) if history_window else list(memory.messages)
+        response = respond(messages, human_input)
+        _remember(model, memory, human_input, response, is_initial_prompt)
+        return response
+
+    def snapshot_agent():
+        """Stateless responder over a frozen copy of the current history (no memory writes).
+        Used by paca_construct_generator to send construct questions concurrently."""
+        chat_history = history_window.window(memory.messages) if history_window else list(memory.messages)
+        return lambda human_input: respond(chat_history, human_input)
+
+    paca_agent.snapshot_agent = snapshot_agent
+    # Exposed so a simulation checkpoint can save / restore the rolling summary
+    paca_agent.history_window = history_window
+    paca_agent.paca_model = model
+
+    return paca_agent, memory, paca_version
+
+
+# The memory persists across Streamlit reruns; page_id keeps pages / experiments apart
+@st.cache_resource
+def _cached_paca_agent(variant, paca_version, page_id, system_prompt, history_turns, history_token_budget):
+    return _new_paca_agent(variant, paca_version, system_prompt, history_turns, history_token_budget)
+
+
+def _system_prompt(model: PacaModel) -> str:
+    if len(model.prompts) > 1:
+        return st.selectbox("Select PACA system prompt", [PACA_PROMPTS[prompt] for prompt in model.prompts])
+    return PACA_PROMPTS[model.prompts[0]]
+
+
+def create_paca_agent(variant, paca_version, page_id="default", history_turns=None, history_token_budget=None):
+    """
+    Create a PACA agent of a registered variant with page-specific memory isolation.
+
+    Args:
+        variant: PACA_MODELS key
+        paca_version: Version of the PACA agent
+        page_id: Unique identifier for the page (e.g., "mdd_gpt_basic", "bd_gpt_basic")
+                 This ensures each page has its own memory to prevent cross-contamination
+        history_turns / history_token_budget: Bounded-history mode (see history_window.py).
+                 None for both sends the full conversation every turn
+    """
+    model = get_paca_model(variant)
+    system_prompt = _system_prompt(model)
+    if model.cache_agent:
+        return _cached_paca_agent(variant, paca_version, page_id, system_prompt, history_turns, history_token_budget)
+    return _new_paca_agent(variant, paca_version, system_prompt, history_turns, history_token_budget)
+
+
+def create_async_paca_agent(variant, paca_version, page_id="default", system_prompt=None,
+                            history_turns=None, history_token_budget=None):
+    """
+    Awaitable twin of create_paca_agent (uses chain.ainvoke).
+    Same memory semantics, so an asyncio event loop can drive many interviews at once.
+    Not cached: every call returns a fresh memory (page_id kept for signature parity).
+    """
+    model = get_paca_model(variant)
+    memory = InMemoryChatMessageHistory()
+    llm = get_client(model.client_name)
+    chain = _chat_prompt(system_prompt or PACA_PROMPTS[model.prompts[0]]) | llm
+    history_window = create_history_window(lambda: get_client(model.summarizer_client_name), history_turns,
+                                           history_token_budget)
+
+    async def paca_agent(human_input, is_initial_prompt=False):
+        messages = await history_window.awindow(memory.messages) if history_window else list(memory.messages)
+
+        inputs = {
+            "chat_history": messages,
+            "human_input": human_input,
+        }
+        response = await scheduler.acall(lambda: chain.ainvoke(inputs), model.provider, model.model,
+                                         estimate_tokens(inputs))
+
+        _remember(model, memory, human_input, response.content, is_initial_prompt)
+        return response.content
+
+    paca_agent.history_window = history_window
+    paca_agent.paca_model = model
+
+    return paca_agent, memory, paca_version
+
+
+# ================================
+# Simulation
+# ================================
+def _greeting(paca_agent) -> Tuple[str, bool]:
+    """(greeting, generate_greeting) of the agent's variant."""
+    model = getattr(paca_agent, "paca_model", None)
+    return (model.greeting, model.generate_greeting) if model is not None else (GREETING, False)
+
+
+def simulate_conversation(paca_agent, sp_agent, max_turns=300, termination_detector=None):
+    # Optional early stop once the interview has wrapped up (see termination.py)
+    if termination_detector is not None:
+        yield from termination_detector.watch(simulate_conversation(paca_agent, sp_agent, max_turns))
+        return
+
+    greeting, generate_greeting = _greeting(paca_agent)
+
+    # The greeting is hardcoded, not generated. Callers seed it into both memories,
+    # except for generate_greeting variants, whose agent answers it first
+    if generate_greeting:
+        paca_agent(greeting, is_initial_prompt=True)
+    yield ("PACA", greeting)
+
+    current_speaker = "SP"
+    current_message = greeting
+
+    for _ in range(max_turns):
+        if current_speaker == "SP":
+            response = sp_agent(current_message)
+            yield ("SP", response)
+            current_speaker = "PACA"
+        else:
+            response = paca_agent(current_message, is_initial_prompt=False)
+            yield ("PACA", response)
+            current_speaker = "SP"
+
+        current_message = response
+
+
+async def simulate_conversation_async(paca_agent, sp_agent, max_turns=300, termination_detector=None):
+    """Async generator twin of simulate_conversation for async agents."""
+    if termination_detector is not None:
+        async for turn in termination_detector.awatch(simulate_conversation_async(paca_agent, sp_agent, max_turns)):
+            yield turn
+        return
+
+    greeting, generate_greeting = _greeting(paca_agent)
+
+    if generate_greeting:
+        await paca_agent(greeting, is_initial_prompt=True)
+    yield ("PACA", greeting)
+
+    current_speaker = "SP"
+    current_message = greeting
+
+    for _ in range(max_turns):
+        if current_speaker == "SP":
+            response = await sp_agent(current_message)
+            yield ("SP", response)
+            current_speaker = "PACA"
+        else:
+            response = await paca_agent(current_message, is_initial_prompt=False)
+            yield ("PACA", response)
+            current_speaker = "SP"
+
+        current_message = response
+
+
+# ================================
+# Export
+# ================================
+def save_conversation_to_csv(conversation):
+    import pandas as pd  # deferred: only needed for the CSV export
+
+    df = pd.DataFrame(conversation, columns=["Speaker", "Message"])
+    paca_messages = df[df["Speaker"] == "PACA"]["Message"]
+    sp_messages = df[df["Speaker"] == "SP"]["Message"]
+
+    result_df = pd.DataFrame({
+        "PACA": paca_messages.reset_index(drop=True),
+        "SP": sp_messages.reset_index(drop=True)
+    })
+
+    csv_buffer = io.BytesIO()
+    result_df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+    csv_buffer.seek(0)
+
+    return csv_buffer.getvalue()
+
+
+def save_ai_conversation_to_firebase(firebase_ref, client_number, conversation, paca_version, sp_version):
+    conversation_data = [
+        {'speaker': speaker, 'message': message}
+        for speaker, message in conversation
+    ]
+
+    timestamp = int(time.time())
+
+    content = {
+        'paca_version': paca_version,
+        'sp_version': sp_version,
+        'timestamp': timestamp,
+        'data': conversation_data
+    }
+
+    conversation_id = f"ai_conversation_paca{paca_version}_sp{sp_version}_{timestamp}"
+    save_to_firebase(
+        firebase_ref, client_number, conversation_id, content)
+
+    return conversation_id
+
+
+# ================================
+# Built-in variants (one per Experiment_*.py page)
+# ================================
+for _model in (
+    PacaModel("gpt_basic", "openai", "gpt-4o-mini-2024-07-18", stream_to_stdout=True),
+    PacaModel("gpt_guided", "openai", "gpt-5.1-2025-11-13", stream_to_stdout=True),
+    PacaModel("claude_basic", "anthropic", "claude-3-haiku-20240307"),
+    PacaModel("claude_guided", "anthropic", "claude-opus-4-5-20251101"),
+    PacaModel("claude2", "anthropic", "claude-3-5-sonnet-20240620", prompts=("open_ended", "guided"),
+              generate_greeting=True, cache_agent=False),
+    PacaModel("llama", "ollama", "llama3.2:3b", prompts=("open_ended", "guided"), stream_to_stdout=True,
+              greeting=GREETING_EN, generate_greeting=True, cache_agent=False),
+):
+    register_paca_model(_model)
@@ -1,7 +1,8 @@
 import streamlit as st
 import json
 from datetime import datetime
-from SP_utils import get_firebase_ref, load_from_firebase
+from firebase_config import get_firebase_ref
+from firebase_utils import load_from_firebase
 from expert_validation_utils import sanitize_firebase_key
 
 # ================================
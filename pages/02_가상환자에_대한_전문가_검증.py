@@ -11,6 +11,7 @@ from SP_utils import (
 )
 from sp_construct_generator import create_sp_construct
 from langchain_core.messages import HumanMessage, AIMessage
+from llm_scheduler import INTERACTIVE, llm_priority
 import json
 
 # ================================
@@ -443,7 +444,8 @@ def show_validation_page():
             
             with st.chat_message("assistant"):
                 message_placeholder = st.empty()
-                full_response = agent(prompt)
+                with llm_priority(INTERACTIVE):
+                    full_response = agent(prompt)
                 message_placeholder.markdown(full_response)
             
             st.rerun()
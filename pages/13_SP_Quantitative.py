@@ -10,7 +10,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from firebase_config import get_firebase_ref
-from SP_utils import sanitize_key
+from firebase_catalog import load_catalog
 from datetime import datetime
 import io
 
@@ -112,7 +112,7 @@ def load_all_sp_validations(firebase_ref):
         return None, None, None
 
     try:
-        all_keys = firebase_ref.get()
+        all_keys = load_catalog(firebase_ref, 'sp_validation')
         if not all_keys:
             return all_data
 
@@ -10,12 +10,12 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from firebase_config import get_firebase_ref
-from SP_utils import sanitize_key
+from firebase_catalog import load_catalog
 from datetime import datetime
 import io
 import pingouin as pg
-from sklearn.metrics import cohen_kappa_score
-from itertools import combinations
+from agreement_stats import (DEFAULT_N_BOOT, krippendorff_alpha_bootstrap, krippendorff_alpha_ordinal,
+                             mean_pairwise_weighted_kappa, weighted_kappa_bootstrap)
 
 # ================================
 # Configuration
@@ -76,6 +76,9 @@ ELEMENT_KEYS = ['mood', 'affect', 'thought_process', 'thought_content',
 
 ELEMENT_KEY_MAP = dict(zip(ELEMENT_KEYS, PSYCHIATRIC_ELEMENTS))
 
+# Likert scale levels (1: Clearly incompatible ~ 5: Prototypical)
+LIKERT_LEVELS = (1, 2, 3, 4, 5)
+
 # Text questions (for text summary file)
 TEXT_QUESTIONS = {
     'plausible_aspects': 'What aspects of the dialogue made this plausible?',
@@ -108,7 +111,7 @@ def load_all_sp_qualitative(firebase_ref):
         return None, None, None
 
     try:
-        all_keys = firebase_ref.get()
+        all_keys = load_catalog(firebase_ref, 'sp_validation')
         if not all_keys:
             return all_data
 
@@ -244,69 +247,62 @@ def create_average_file_qualitative(all_data):
     
     return df
 
-def calculate_weighted_kappa(all_data):
+def build_reliability_matrix(all_data):
+    """Reliability matrix: rows = units (case-element pairs), columns = coders (experts), NaN = missing"""
+    experts = list(all_data.keys())
+    all_units = sorted({(case_key, elem_key)
+                        for expert_data in all_data.values()
+                        for case_key in expert_data.keys()
+                        for elem_key in ELEMENT_KEYS})
+    
+    matrix = np.full((len(all_units), len(experts)), np.nan)
+    for j, expert in enumerate(experts):
+        for i, (case_key, elem_key) in enumerate(all_units):
+            rating = all_data[expert].get(case_key, {}).get(elem_key, {}).get('rating')
+            if rating is not None:
+                matrix[i, j] = rating
+    return matrix
+
+
+def build_rating_tensor(all_data):
+    """Rating tensor: experts × cases × elements (ELEMENT_KEYS order), NaN = missing"""
+    experts = list(all_data.keys())
+    cases = sorted({case_key for expert_data in all_data.values() for case_key in expert_data.keys()})
+    
+    tensor = np.full((len(experts), len(cases), len(ELEMENT_KEYS)), np.nan)
+    for i, expert in enumerate(experts):
+        for j, case_key in enumerate(cases):
+            case_data = all_data[expert].get(case_key)
+            if case_data is None:
+                continue
+            for k, elem_key in enumerate(ELEMENT_KEYS):
+                rating = case_data.get(elem_key, {}).get('rating')
+                if rating is not None:
+                    tensor[i, j, k] = rating
+    return tensor
+
+
+def calculate_weighted_kappa(all_data, n_boot=DEFAULT_N_BOOT):
     """Calculate Weighted Kappa (Cohen's) for Likert scale data
     
     Uses quadratic weights appropriate for ordinal data
-    Computes pairwise kappa between all rater pairs and returns average
+    Computes pairwise kappa between all rater pairs (per element, over the cases
+    both rated) and returns the average, with a bootstrap CI over cases
     
     Args:
         all_data: dict of expert validation data
+        n_boot: bootstrap replicates for the CI (0 = no CI)
     
     Returns:
-        dict: mean kappa, std, and number of comparisons
+        dict: mean kappa, std, number of comparisons and 95% CI
     """
-    # Collect all pairwise comparisons
-    kappa_scores = []
-    
-    experts = list(all_data.keys())
-    
-    # For each pair of experts
-    for expert1, expert2 in combinations(experts, 2):
-        # Find common cases they both evaluated
-        cases1 = set(all_data[expert1].keys())
-        cases2 = set(all_data[expert2].keys())
-        common_cases = cases1 & cases2
-        
-        if not common_cases:
-            continue
-        
-        # Collect ratings for each element
-        for elem_key in ELEMENT_KEYS:
-            ratings1 = []
-            ratings2 = []
-            
-            for case_key in common_cases:
-                rating1 = all_data[expert1][case_key].get(elem_key, {}).get('rating')
-                rating2 = all_data[expert2][case_key].get(elem_key, {}).get('rating')
-                
-                if rating1 is not None and rating2 is not None:
-                    ratings1.append(rating1)
-                    ratings2.append(rating2)
-            
-            if len(ratings1) >= 2:  # Need at least 2 ratings
-                try:
-                    # Quadratic weights for ordinal data (penalizes large disagreements more)
-                    # Explicitly specify labels to handle cases where not all values are present
-                    kappa = cohen_kappa_score(
-                        ratings1, ratings2, 
-                        labels=[1, 2, 3, 4, 5],
-                        weights='quadratic'
-                    )
-                    if not np.isnan(kappa):
-                        kappa_scores.append(kappa)
-                except Exception as e:
-                    # Skip this comparison if error occurs
-                    continue
-    
-    if not kappa_scores:
+    ratings = build_rating_tensor(all_data)
+    result = mean_pairwise_weighted_kappa(ratings, LIKERT_LEVELS, weights='quadratic')
+    if result is None:
         return None
     
-    return {
-        'mean': np.mean(kappa_scores),
-        'std': np.std(kappa_scores),
-        'n': len(kappa_scores)
-    }
+    result['ci'] = weighted_kappa_bootstrap(ratings, LIKERT_LEVELS, weights='quadratic', n_boot=n_boot) if n_boot else None
+    return result
 
 
 def calculate_krippendorff_alpha_ordinal(all_data):
@@ -321,104 +317,12 @@ def calculate_krippendorff_alpha_ordinal(all_data):
     Returns:
         float: Krippendorff's Alpha coefficient
     """
-    # Build reliability matrix: rows = units (case-element pairs), columns = coders (experts)
-    experts = list(all_data.keys())
-    
-    # Collect all unique case-element pairs
-    all_units = set()
-    for expert_data in all_data.values():
-        for case_key in expert_data.keys():
-            for elem_key in ELEMENT_KEYS:
-                all_units.add((case_key, elem_key))
-    
-    all_units = sorted(list(all_units))
-    
-    # Build matrix
-    matrix = []
-    for unit in all_units:
-        case_key, elem_key = unit
-        row = []
-        for expert in experts:
-            if case_key in all_data[expert]:
-                rating = all_data[expert][case_key].get(elem_key, {}).get('rating')
-                row.append(rating if rating is not None else np.nan)
-            else:
-                row.append(np.nan)
-        matrix.append(row)
-    
-    matrix = np.array(matrix, dtype=float)
-    
-    # Remove units with less than 2 valid ratings
-    valid_counts = np.sum(~np.isnan(matrix), axis=1)
-    matrix = matrix[valid_counts >= 2]
-    
-    if len(matrix) < 2:
-        return None
-    
-    # Krippendorff's Alpha calculation for ordinal data
-    # Using simplified formula for ordinal metric
-    
-    values = [1, 2, 3, 4, 5]  # Likert scale
-    
-    # Build coincidence matrix
-    coincidence_matrix = np.zeros((5, 5))
-    
-    for row in matrix:
-        valid = row[~np.isnan(row)]
-        m_u = len(valid)  # number of coders for this unit
-        
-        if m_u < 2:
-            continue
-        
-        # Count pairs
-        for c in range(len(valid)):
-            for k in range(len(valid)):
-                if c != k:
-                    val_c = int(valid[c]) - 1  # 0-indexed
-                    val_k = int(valid[k]) - 1
-                    coincidence_matrix[val_c, val_k] += 1.0 / (m_u - 1)
-    
-    # Calculate observed disagreement with ordinal metric
-    n_total = np.sum(coincidence_matrix)
-    
-    if n_total == 0:
-        return None
-    
-    # Ordinal distance metric (squared distance for ordinal scale)
-    delta = np.zeros((5, 5))
-    for c in range(5):
-        for k in range(5):
-            # Sum of differences between c and k
-            delta[c, k] = sum((values[g] - values[g-1])**2 for g in range(min(c, k) + 1, max(c, k) + 1))
-    
-    # Normalize delta by maximum possible distance
-    max_delta = np.max(delta)
-    if max_delta > 0:
-        delta = delta / max_delta
-    
-    # Observed disagreement
-    D_o = 0
-    for c in range(5):
-        for k in range(5):
-            D_o += coincidence_matrix[c, k] * delta[c, k]
-    D_o = D_o / n_total
-    
-    # Expected disagreement
-    n_c = np.sum(coincidence_matrix, axis=1)  # marginals
-    
-    D_e = 0
-    for c in range(5):
-        for k in range(5):
-            D_e += n_c[c] * n_c[k] * delta[c, k]
-    
-    D_e = D_e / (n_total * (n_total - 1))
-    
-    if D_e == 0:
-        return None
-    
-    alpha = 1 - (D_o / D_e)
-    
-    return alpha
+    return krippendorff_alpha_ordinal(build_reliability_matrix(all_data), LIKERT_LEVELS)
+
+
+def calculate_krippendorff_alpha_ci(all_data, n_boot=DEFAULT_N_BOOT):
+    """Bootstrap 95% CI of Krippendorff's Alpha (units = case-element pairs resampled)"""
+    return krippendorff_alpha_bootstrap(build_reliability_matrix(all_data), LIKERT_LEVELS, n_boot=n_boot)
 
 
 def calculate_icc_accurate(all_data):
@@ -600,11 +504,13 @@ def calculate_qualitative_reliability(all_data):
         reliability_stats['inter_observer_weighted_kappa'] = weighted_kappa_result['mean']
         reliability_stats['inter_observer_weighted_kappa_std'] = weighted_kappa_result['std']
         reliability_stats['weighted_kappa_n'] = weighted_kappa_result['n']
+        reliability_stats['inter_observer_weighted_kappa_ci'] = weighted_kappa_result['ci']
     else:
         reliability_stats['inter_observer_weighted_kappa'] = None
     
     # Calculate Krippendorff's Alpha (ordinal) - robust for multiple raters
     reliability_stats['inter_observer_krippendorff'] = calculate_krippendorff_alpha_ordinal(all_data)
+    reliability_stats['inter_observer_krippendorff_ci'] = calculate_krippendorff_alpha_ci(all_data)
     
     # Calculate ICC with expert identity preserved (for comparison)
     icc_results = calculate_icc_accurate(all_data)
@@ -934,6 +840,9 @@ def main():
                         )
                         if reliability.get('inter_observer_weighted_kappa_std') is not None:
                             st.caption(f"SD: {reliability['inter_observer_weighted_kappa_std']:.4f} | n={reliability.get('weighted_kappa_n', 0)} comparisons")
+                        if reliability.get('inter_observer_weighted_kappa_ci'):
+                            ci = reliability['inter_observer_weighted_kappa_ci']
+                            st.caption(f"95% CI (bootstrap over cases): [{ci[0]:.4f}, {ci[1]:.4f}]")
                 else:
                     st.warning("⚠️ Weighted Kappa 계산 불가")
                 
@@ -944,6 +853,9 @@ def main():
                         f"{ka_value:.4f}",
                         help="Robust reliability for ordinal data with multiple raters - handles missing data well"
                     )
+                    if reliability.get('inter_observer_krippendorff_ci'):
+                        ci = reliability['inter_observer_krippendorff_ci']
+                        st.caption(f"95% CI (bootstrap over units): [{ci[0]:.4f}, {ci[1]:.4f}]")
                     if ka_value < 0.4:
                         st.caption("⚠️ Alpha < 0.4: Fair 이하 수준")
                 else:
@@ -9,7 +9,10 @@ All fonts unified to Helvetica
 import streamlit as st
 import pandas as pd
 import numpy as np
-from firebase_config import get_firebase_ref
+from analysis_dataset import (ci_method_sidebar, clear_analysis_cache, correlation_comparison_groups,
+                              get_analysis_dataset, load_catalog_snapshot, regression_ci,
+                              show_correlation_comparisons)
+import weight_sensitivity
 from expert_validation_utils import sanitize_firebase_key
 import matplotlib.pyplot as plt
 import matplotlib
@@ -140,54 +143,6 @@ def get_model_from_exp(exp_num):
     """Identify model from experiment number."""
     return MODEL_BY_EXP.get(exp_num, 'unknown')
 
-# ================================
-# Data Loading Functions
-# ================================
-def load_expert_scores(root_data):
-    """Load expert scores for all validators and experiments."""
-    expert_data = {}
-    for validator in VALIDATORS:
-        sanitized_name = sanitize_firebase_key(validator)
-        validator_scores = {}
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized_name}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            if 'expert_score' in data:
-                validator_scores[(client_num, exp_num)] = data['expert_score']
-            elif 'psyche_score' in data:
-                validator_scores[(client_num, exp_num)] = data['psyche_score']
-            else:
-                validator_scores[(client_num, exp_num)] = None
-        expert_data[validator] = validator_scores
-    return expert_data
-
-def load_psyche_scores(root_data):
-    """Load automated PSYCHE scores."""
-    psyche_data = {}
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        value = None
-        target_prefix = f"clients_{client_num}_psyche_"
-        target_suffix = f"_{exp_num}"
-        for key, data in (root_data or {}).items():
-            if not key.startswith(target_prefix):
-                continue
-            if not key.endswith(target_suffix):
-                continue
-            record = data or {}
-            if 'psyche_score' in record:
-                value = record['psyche_score']
-                break
-        psyche_data[(client_num, exp_num)] = value
-    return psyche_data
-
-def calculate_average_expert_scores(expert_data):
-    """Calculate average expert scores across validators."""
-    avg_scores = {}
-    for exp in EXPERIMENT_NUMBERS:
-        scores = [expert_data[v].get(exp) for v in VALIDATORS if expert_data[v].get(exp) is not None]
-        avg_scores[exp] = np.mean(scores) if scores else None
-    return avg_scores
-
 # ================================
 # Figure 1: PSYCHE-Expert Correlation
 # ================================
@@ -245,10 +200,10 @@ def create_correlation_plot_average(psyche_scores, avg_expert_scores, figsize=(8
         # 95% CI (t-distribution)
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI
-        ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+        ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
         ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
         
         # Correlation
@@ -358,10 +313,10 @@ def create_correlation_plot_average_with_errors(psyche_scores, avg_expert_scores
         # 95% CI (t-distribution)
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI
-        ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+        ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
         ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
         
         # Correlation
@@ -464,10 +419,10 @@ def create_correlation_plot_average_with_residuals(psyche_scores, avg_expert_sco
     # 95% CI (t-distribution)
     from scipy.stats import t as t_dist
     t_val = t_dist.ppf(0.975, n - 2)
-    ci = t_val * se_line
+    ci_lower, ci_upper = regression_ci(all_x, all_y, x_line, y_line, t_val * se_line)
     
     # Plot CI and line
-    ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+    ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
     ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
     
     # Highlight top 3 residuals with red circles and labels
@@ -570,9 +525,9 @@ def create_correlation_plot_by_validator(psyche_scores, expert_data):
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(validator_x_arr, validator_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(validator_x, validator_y)
@@ -651,9 +606,9 @@ def create_correlation_plot_by_disorder(psyche_scores, avg_expert_scores):
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -677,101 +632,6 @@ def create_correlation_plot_by_disorder(psyche_scores, avg_expert_scores):
     plt.tight_layout()
     return fig
 
-def calculate_category_scores(element_scores_psyche, element_scores_expert_dict):
-    """Calculate category-level scores (Subjective, Impulsivity, Behavior) for correlation analysis.
-    
-    Returns:
-    - psyche_category_scores: {(client_num, exp_num): {'Subjective': float, 'Impulsivity': float, 'Behavior': float}}
-    - expert_category_scores: {validator: {(client_num, exp_num): {'Subjective': float, 'Impulsivity': float, 'Behavior': float}}}
-    """
-    from evaluator import PSYCHE_RUBRIC
-    
-    # Category별 element 분류
-    impulsivity_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'impulsivity']
-    behavior_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'behavior']
-    subjective_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
-    
-    # Weights
-    weight_subjective = 1
-    weight_impulsivity = 5
-    weight_behavior = 2
-    
-    # PSYCHE category scores
-    psyche_category_scores = {}
-    for exp in EXPERIMENT_NUMBERS:
-        if exp not in element_scores_psyche:
-            continue
-        
-        psyche_elements = element_scores_psyche[exp]
-        categories = {
-            'Subjective': 0,
-            'Impulsivity': 0,
-            'Behavior': 0
-        }
-        
-        # Subjective
-        for elem in subjective_elements:
-            if elem in psyche_elements and 'score' in psyche_elements[elem]:
-                categories['Subjective'] += psyche_elements[elem]['score'] * weight_subjective
-        
-        # Impulsivity
-        for elem in impulsivity_elements:
-            if elem in psyche_elements and 'score' in psyche_elements[elem]:
-                categories['Impulsivity'] += psyche_elements[elem]['score'] * weight_impulsivity
-        
-        # Behavior
-        for elem in behavior_elements:
-            if elem in psyche_elements and 'score' in psyche_elements[elem]:
-                categories['Behavior'] += psyche_elements[elem]['score'] * weight_behavior
-        
-        psyche_category_scores[exp] = categories
-    
-    # Expert category scores (averaged across validators)
-    expert_category_scores = {validator: {} for validator in VALIDATORS}
-    
-    for validator in VALIDATORS:
-        for exp in EXPERIMENT_NUMBERS:
-            if exp not in element_scores_expert_dict[validator]:
-                continue
-            
-            expert_elements = element_scores_expert_dict[validator][exp]
-            categories = {
-                'Subjective': 0,
-                'Impulsivity': 0,
-                'Behavior': 0
-            }
-            
-            # Subjective
-            for elem in subjective_elements:
-                if elem in expert_elements:
-                    elem_data = expert_elements[elem]
-                    if isinstance(elem_data, dict) and 'weighted_score' in elem_data:
-                        categories['Subjective'] += elem_data['weighted_score']
-                    elif isinstance(elem_data, dict) and 'score' in elem_data:
-                        categories['Subjective'] += elem_data['score'] * weight_subjective
-            
-            # Impulsivity
-            for elem in impulsivity_elements:
-                if elem in expert_elements:
-                    elem_data = expert_elements[elem]
-                    if isinstance(elem_data, dict) and 'weighted_score' in elem_data:
-                        categories['Impulsivity'] += elem_data['weighted_score']
-                    elif isinstance(elem_data, dict) and 'score' in elem_data:
-                        categories['Impulsivity'] += elem_data['score'] * weight_impulsivity
-            
-            # Behavior
-            for elem in behavior_elements:
-                if elem in expert_elements:
-                    elem_data = expert_elements[elem]
-                    if isinstance(elem_data, dict) and 'weighted_score' in elem_data:
-                        categories['Behavior'] += elem_data['weighted_score']
-                    elif isinstance(elem_data, dict) and 'score' in elem_data:
-                        categories['Behavior'] += elem_data['score'] * weight_behavior
-            
-            expert_category_scores[validator][exp] = categories
-    
-    return psyche_category_scores, expert_category_scores
-
 def create_correlation_plot_by_category(psyche_category_scores, expert_category_scores):
     """Figure 1-4: Category-level correlation analysis (Subjective, Impulsivity, Behavior)."""
     fig, axes = plt.subplots(1, 3, figsize=(24, 8))
@@ -846,9 +706,9 @@ def create_correlation_plot_by_category(psyche_category_scores, expert_category_
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             # Correlation
@@ -942,10 +802,10 @@ def create_piqsca_correlation_plot(psyche_scores, figsize=(8, 8)):
         # 95% CI (t-distribution)
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI and line
-        ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+        ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
         ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
         
         # Correlation info
@@ -974,55 +834,6 @@ def create_piqsca_correlation_plot(psyche_scores, figsize=(8, 8)):
 # ================================
 # Figure 1-6: PSYCHE-PIQSCA Correlation (Firebase Data)
 # ================================
-def load_piqsca_from_firebase(root_data):
-    """로드 PIQSCA scores from Firebase by validator.
-    
-    Returns:
-    - piqsca_by_validator: {validator: {(client_num, exp_num): piqsca_score}}
-    - validators_found: list of validators who have PIQSCA data
-    """
-    piqsca_by_validator = {}
-    
-    # 모든 piqsca_ 키 수집
-    for key in (root_data or {}).keys():
-        if not key.startswith('piqsca_'):
-            continue
-        
-        # Parse key: piqsca_{validator_name}_{client_num}_{exp_num}
-        parts = key.split('_')
-        if len(parts) < 4:
-            continue
-        
-        # validator_name은 여러 단어일 수 있음 (e.g., piqsca_임경호_6201_1121)
-        # 마지막 2개가 client_num, exp_num
-        try:
-            exp_num = int(parts[-1])
-            client_num = int(parts[-2])
-            validator_name = '_'.join(parts[1:-2])  # piqsca 제외한 나머지
-        except ValueError:
-            continue
-        
-        # Load data
-        data = (root_data or {}).get(key, {})
-        if not data:
-            continue
-        
-        # Calculate PIQSCA score (sum of 3 ratings)
-        process = data.get('process_of_the_interview', 0)
-        techniques = data.get('techniques', 0)
-        information = data.get('information_for_diagnosis', 0)
-        piqsca_score = process + techniques + information
-        
-        # Store by validator
-        if validator_name not in piqsca_by_validator:
-            piqsca_by_validator[validator_name] = {}
-        
-        piqsca_by_validator[validator_name][(client_num, exp_num)] = piqsca_score
-    
-    validators_found = list(piqsca_by_validator.keys())
-    
-    return piqsca_by_validator, validators_found
-
 def create_piqsca_correlation_plot_firebase(psyche_scores, piqsca_by_validator, figsize=(6, 6)):
     """PSYCHE SCORE vs. PIQSCA correlation plots (Firebase data, by validator).
     
@@ -1093,10 +904,10 @@ def create_piqsca_correlation_plot_firebase(psyche_scores, piqsca_by_validator,
             # 95% CI (t-distribution)
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
             # Plot CI and line
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
             
             # Correlation info
@@ -1193,9 +1004,9 @@ def create_combined_correlation_figure(psyche_scores, avg_expert_scores, expert_
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(validator_x_arr, validator_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(validator_x, validator_y)
@@ -1273,9 +1084,9 @@ def create_combined_correlation_figure(psyche_scores, avg_expert_scores, expert_
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -1372,9 +1183,9 @@ def create_combined_correlation_figure(psyche_scores, avg_expert_scores, expert_
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -1467,9 +1278,9 @@ def create_combined_correlation_figure_v2(psyche_scores, avg_expert_scores, expe
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(validator_x_arr, validator_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(validator_x, validator_y)
@@ -1550,9 +1361,9 @@ def create_combined_correlation_figure_v2(psyche_scores, avg_expert_scores, expe
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -1651,9 +1462,9 @@ def create_combined_correlation_figure_v2(psyche_scores, avg_expert_scores, expe
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.15, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.15, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -1683,216 +1494,20 @@ def create_combined_correlation_figure_v2(psyche_scores, avg_expert_scores, expe
 # ================================
 # Figure 2: Weight-Correlation Analysis
 # ================================
-def load_element_scores(root_data):
-    """Load element-level scores for weight analysis.
-    
-    Returns:
-    - psyche_element_scores: {(client_num, exp_num): {element_name: {score: float}}}
-    - expert_element_scores: {validator_name: {(client_num, exp_num): {element_name: {score: float}}}}
-    """
-    from evaluator import PSYCHE_RUBRIC
-    
-    psyche_element_scores = {}
-    expert_element_scores = {validator: {} for validator in VALIDATORS}
-    
-    # Get valid element names from PSYCHE_RUBRIC
-    valid_elements = set(PSYCHE_RUBRIC.keys())
-    
-    # Debug: collect all matching keys
-    psyche_keys_found = []
-    psyche_data_structure_sample = None
-    
-    # Load PSYCHE element scores
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        target_prefix = f"clients_{client_num}_psyche_"
-        target_suffix = f"_{exp_num}"
-        
-        for key, data in (root_data or {}).items():
-            if not key.startswith(target_prefix):
-                continue
-            if not key.endswith(target_suffix):
-                continue
-            
-            psyche_keys_found.append(key)
-            record = data or {}
-            
-            # Save sample structure for debugging
-            if psyche_data_structure_sample is None:
-                psyche_data_structure_sample = {
-                    'key': key,
-                    'top_level_keys': list(record.keys())[:10],
-                    'has_elements': 'elements' in record
-                }
-            
-            # Try 'elements' layer first (standard structure)
-            element_data = {}
-            if 'elements' in record and isinstance(record['elements'], dict):
-                for field_name, field_value in record['elements'].items():
-                    if field_name in valid_elements:
-                        element_data[field_name] = field_value
-            else:
-                # Fallback: extract element scores directly from record
-                for field_name, field_value in record.items():
-                    if field_name in valid_elements and isinstance(field_value, dict):
-                        element_data[field_name] = field_value
-            
-            if element_data:
-                psyche_element_scores[(client_num, exp_num)] = element_data
-            break
-    
-    # Store debug info
-    psyche_element_scores['_debug_keys'] = psyche_keys_found
-    psyche_element_scores['_debug_structure'] = psyche_data_structure_sample
-    
-    # Load Expert element scores
-    for validator in VALIDATORS:
-        sanitized_name = sanitize_firebase_key(validator)
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized_name}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            if 'elements' in data:
-                # Filter to valid elements only
-                valid_elem_data = {k: v for k, v in data['elements'].items() if k in valid_elements}
-                if valid_elem_data:
-                    expert_element_scores[validator][(client_num, exp_num)] = valid_elem_data
-    
-    return psyche_element_scores, expert_element_scores
-
-def calculate_weighted_correlation_from_elements(element_scores_psyche, element_scores_expert_dict, 
-                                                  weight_impulsivity, weight_behavior, weight_subjective=1,
-                                                  expert_fixed_weights=None):
-    """
-    Element별 가중치를 변경하여 correlation 재계산
-    
-    Parameters:
-    - element_scores_psyche: {(client_num, exp_num): {element_name: {score: float}}}
-    - element_scores_expert_dict: {validator_name: {(client_num, exp_num): {element_name: {score: float}}}}
-    - weight_impulsivity: Impulsivity category weight (default: 5)
-    - weight_behavior: Behavior category weight (default: 2)
-    - weight_subjective: Subjective category weight (fixed: 1)
-    - expert_fixed_weights: (imp, beh, subj) tuple for fixed expert weights, or None for variable
-    """
-    from evaluator import PSYCHE_RUBRIC
-    
-    # Category별 element 분류
-    impulsivity_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'impulsivity']
-    behavior_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'behavior']
-    subjective_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
-    
-    weighted_psyche_scores = []
-    weighted_expert_scores = []
-    
-    for exp in EXPERIMENT_NUMBERS:
-        psyche_elements = element_scores_psyche.get(exp, {})
-        if not psyche_elements:
-            continue
-        
-        # Average expert scores across validators
-        expert_elements_list = []
-        for validator in VALIDATORS:
-            expert_exp_data = element_scores_expert_dict.get(validator, {}).get(exp, {})
-            if expert_exp_data:
-                expert_elements_list.append(expert_exp_data)
-        
-        if not expert_elements_list:
-            continue
-        
-        psyche_total = 0
-        expert_total = 0
-        
-        # Calculate weighted scores
-        for element, rubric_info in PSYCHE_RUBRIC.items():
-            if element not in psyche_elements:
-                continue
-            
-            # Check if all experts have this element
-            expert_scores_for_element = []
-            for expert_elem_dict in expert_elements_list:
-                if element in expert_elem_dict:
-                    elem_data = expert_elem_dict[element]
-                    score = elem_data.get('score', 0) if isinstance(elem_data, dict) else 0
-                    expert_scores_for_element.append(score)
-            
-            if not expert_scores_for_element:
-                continue
-            
-            # Average expert score for this element
-            avg_expert_score = np.mean(expert_scores_for_element)
-            
-            # Get PSYCHE score
-            psyche_elem = psyche_elements[element]
-            psyche_score = psyche_elem.get('score', 0) if isinstance(psyche_elem, dict) else 0
-            
-            # Apply weights for PSYCHE
-            if element in impulsivity_elements:
-                psyche_weight = weight_impulsivity
-            elif element in behavior_elements:
-                psyche_weight = weight_behavior
-            elif element in subjective_elements:
-                psyche_weight = weight_subjective
-            else:
-                psyche_weight = rubric_info.get('weight', 1)
-            
-            # Apply weights for Expert (fixed or variable)
-            if expert_fixed_weights:
-                if element in impulsivity_elements:
-                    expert_weight = expert_fixed_weights[0]
-                elif element in behavior_elements:
-                    expert_weight = expert_fixed_weights[1]
-                elif element in subjective_elements:
-                    expert_weight = expert_fixed_weights[2]
-                else:
-                    expert_weight = rubric_info.get('weight', 1)
-            else:
-                # Use same variable weights as PSYCHE
-                expert_weight = psyche_weight
-            
-            psyche_total += psyche_score * psyche_weight
-            expert_total += avg_expert_score * expert_weight
-        
-        weighted_psyche_scores.append(psyche_total)
-        weighted_expert_scores.append(expert_total)
-    
-    # Calculate correlation
-    if len(weighted_psyche_scores) >= 2:
-        correlation, _ = stats.pearsonr(weighted_psyche_scores, weighted_expert_scores)
-        return correlation
-    return None
-
-@st.cache_data(show_spinner="Weight correlation 계산 중... (캐시됨, 최초 1회만 실행)")
-def calculate_weight_correlations(_element_scores_psyche, _element_scores_expert_dict):
-    """Calculate weight correlation matrices (cached for performance).
+def calculate_weight_correlations(element_scores_psyche, element_scores_expert_dict):
+    """Calculate weight correlation matrices (vectorized over the whole grid, see weight_sensitivity.py).
     
     Returns:
     - correlation_equal: Equal weights heatmap data
     - correlation_fixed: Fixed expert weights heatmap data
     - weight_range: Weight range used
     """
-    # 0.1 간격으로 1부터 10까지 (총 91개 포인트)
-    weight_range = np.arange(1, 10.1, 0.1)
-    n_weights = len(weight_range)
-    
     # Heatmap 1: Equal weights (PSYCHE와 Expert 모두 가중치 변경)
-    correlation_equal = np.zeros((n_weights, n_weights))
-    for i, w_imp in enumerate(weight_range):
-        for j, w_beh in enumerate(weight_range):
-            corr = calculate_weighted_correlation_from_elements(
-                _element_scores_psyche, _element_scores_expert_dict, w_imp, w_beh
-            )
-            correlation_equal[n_weights-1-i, j] = corr if corr is not None else 0  # y축 반전
-    
-    # Heatmap 2: Fixed expert weights at (5, 2, 1)
-    # Expert는 (5,2,1) 고정, PSYCHE만 가중치 변경
-    correlation_fixed = np.zeros((n_weights, n_weights))
-    for i, w_imp in enumerate(weight_range):
-        for j, w_beh in enumerate(weight_range):
-            corr = calculate_weighted_correlation_from_elements(
-                _element_scores_psyche, _element_scores_expert_dict, w_imp, w_beh,
-                expert_fixed_weights=(5, 2, 1)  # Fixed expert weights
-            )
-            correlation_fixed[n_weights-1-i, j] = corr if corr is not None else 0
-    
-    return correlation_equal, correlation_fixed, weight_range
+    # Heatmap 2: Expert는 (5,2,1) 고정, PSYCHE만 가중치 변경
+    return weight_sensitivity.calculate_weight_correlations(
+        element_scores_psyche, element_scores_expert_dict, EXPERIMENT_NUMBERS, VALIDATORS,
+        expert_fixed_weights=(5, 2, 1)
+    )
 
 def create_weight_correlation_heatmaps(element_scores_psyche, element_scores_expert_dict):
     """Figure 2: Weight-correlation analysis heatmaps."""
@@ -2035,10 +1650,10 @@ def create_combined_figure_1x4(psyche_scores, avg_expert_scores, piqsca_scores,
         
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI and line
-        ax_a.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+        ax_a.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
         ax_a.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
         
         correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -2109,10 +1724,10 @@ def create_combined_figure_1x4(psyche_scores, avg_expert_scores, piqsca_scores,
         
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI and line
-        ax_b.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db', zorder=0)
+        ax_b.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db', zorder=0)
         ax_b.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2, zorder=1)
         
         correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -2601,6 +2216,7 @@ def main():
     plt.close('all')
     
     st.title("📊 Publication Figure Generator")
+    ci_method_sidebar()
     st.markdown("---")
     
     st.info("""
@@ -2614,18 +2230,21 @@ def main():
     """)
     
     # Load data
+    if st.button("🔄 Firebase 데이터 새로고침"):
+        clear_analysis_cache()
     with st.spinner("데이터 로딩 중..."):
-        firebase_ref = get_firebase_ref()
-        root_snapshot = firebase_ref.get() or {}
-        expert_data = load_expert_scores(root_snapshot)
-        psyche_scores = load_psyche_scores(root_snapshot)
-        avg_expert_scores = calculate_average_expert_scores(expert_data)
+        # 다른 Figure 페이지와 공유되는 캐시 (데이터가 바뀌었을 때만 다시 파싱)
+        dataset = get_analysis_dataset(EXPERIMENT_NUMBERS, VALIDATORS)
+        sp_root = load_catalog_snapshot(('sp_validation',))
+        expert_data = dataset.expert_scores_by_validator()
+        psyche_scores = dataset.psyche_scores()
+        avg_expert_scores = dataset.average_expert_scores()
         
         # Element-level scores for weight analysis
-        element_scores_psyche, element_scores_expert = load_element_scores(root_snapshot)
+        element_scores_psyche, element_scores_expert = dataset.element_scores()
         
         # SP validation data
-        sp_conformity_data = load_sp_validation_data(root_snapshot)
+        sp_conformity_data = load_sp_validation_data(sp_root)
     
     st.success("✅ 데이터 로딩 완료")
     
@@ -2638,15 +2257,13 @@ def main():
         psyche_elem_count = len([k for k in element_scores_psyche.keys() if isinstance(k, tuple)])
         st.write(f"Element-level PSYCHE scores: {psyche_elem_count} experiments")
         
-        if '_debug_keys' in element_scores_psyche:
-            debug_keys = element_scores_psyche['_debug_keys']
-            st.write(f"PSYCHE keys found: {len(debug_keys)} total")
-            if debug_keys:
-                st.write(f"Sample keys: {debug_keys[:3]}")
+        st.write(f"PSYCHE keys found: {len(dataset.psyche_keys)} total (data version {dataset.version})")
+        if dataset.psyche_keys:
+            st.write(f"Sample keys: {list(dataset.psyche_keys[:3])}")
         
-        if '_debug_structure' in element_scores_psyche:
+        if dataset.psyche_structure_sample:
             st.write("**PSYCHE data structure sample:**")
-            st.json(element_scores_psyche['_debug_structure'])
+            st.json(dataset.psyche_structure_sample)
         
         st.write(f"Element-level Expert scores: {len(element_scores_expert)} validators")
         if element_scores_expert:
@@ -2696,7 +2313,7 @@ def main():
         
         # Load PIQSCA data from Firebase
         with st.spinner("Loading PIQSCA data from Firebase..."):
-            piqsca_by_validator, validators_found = load_piqsca_from_firebase(root_snapshot)
+            piqsca_by_validator, validators_found = dataset.piqsca_by_validator()
         
         if piqsca_by_validator:
             st.success(f"✅ Found PIQSCA data for {len(validators_found)} validator(s): {', '.join(validators_found)}")
@@ -2867,9 +2484,7 @@ def main():
         st.caption("(a) Validator-specific (2×3), (b) Disease-specific (1×3), (c) Category-specific (1×3)")
         
         if element_scores_psyche and element_scores_expert:
-            psyche_category_scores, expert_category_scores = calculate_category_scores(
-                element_scores_psyche, element_scores_expert
-            )
+            psyche_category_scores, expert_category_scores = dataset.category_scores()
             
             fig_combined = create_combined_correlation_figure(
                 psyche_scores, avg_expert_scores, expert_data,
@@ -2888,9 +2503,7 @@ def main():
         st.info("🔧 Version 2 - 출력 테스트용 복제 버전")
         
         if element_scores_psyche and element_scores_expert:
-            psyche_category_scores, expert_category_scores = calculate_category_scores(
-                element_scores_psyche, element_scores_expert
-            )
+            psyche_category_scores, expert_category_scores = dataset.category_scores()
             
             fig_combined_v2 = create_combined_correlation_figure_v2(
                 psyche_scores, avg_expert_scores, expert_data,
@@ -2925,9 +2538,7 @@ def main():
         
         if element_scores_psyche and element_scores_expert:
             # Calculate category scores
-            psyche_category_scores, expert_category_scores = calculate_category_scores(
-                element_scores_psyche, element_scores_expert
-            )
+            psyche_category_scores, expert_category_scores = dataset.category_scores()
             
             fig1_4 = create_correlation_plot_by_category(psyche_category_scores, expert_category_scores)
             st.pyplot(fig1_4)
@@ -2953,7 +2564,7 @@ def main():
         
         # Load PIQSCA data from Firebase for combined figure
         with st.spinner("Loading PIQSCA data for combined figure..."):
-            piqsca_by_validator, validators_found = load_piqsca_from_firebase(root_snapshot)
+            piqsca_by_validator, validators_found = dataset.piqsca_by_validator()
         
         # Use single validator's PIQSCA data (configured at top of file)
         piqsca_single = {}
@@ -3007,7 +2618,7 @@ def main():
     
     # Load SP qualitative data
     with st.spinner("SP Qualitative 데이터 로딩 중..."):
-        sp_qualitative_data = load_sp_qualitative_data(root_snapshot)
+        sp_qualitative_data = load_sp_qualitative_data(sp_root)
     
     if sp_qualitative_data:
         st.success(f"✅ {len(sp_qualitative_data)} cases의 정성 평가 데이터 로드 완료")
@@ -3034,6 +2645,15 @@ def main():
     
     st.markdown("---")
     
+    # ================================
+    # Correlation comparisons (bootstrap / permutation)
+    # ================================
+    st.markdown("## 🎲 Correlation Comparisons (Bootstrap / Permutation)")
+    show_correlation_comparisons(psyche_scores, avg_expert_scores,
+                                 correlation_comparison_groups(EXPERIMENT_NUMBERS, MODEL_BY_EXP, DISORDER_MAP))
+    
+    st.markdown("---")
+    
     # ================================
     # Figure 2: Weight-Correlation Analysis
     # ================================
@@ -3041,8 +2661,8 @@ def main():
     st.caption("가중치 변화에 따른 correlation 변화 분석 (생성에 시간이 걸립니다)")
     
     if element_scores_psyche and element_scores_expert:
-        # Check if there's actual data (exclude _debug_keys)
-        psyche_count = len([k for k in element_scores_psyche.keys() if k != '_debug_keys'])
+        # Check if there's actual data
+        psyche_count = len(element_scores_psyche)
         expert_count = sum(len(v) for v in element_scores_expert.values())
         
         st.info(f"PSYCHE element data: {psyche_count} experiments, Expert element data: {expert_count} total entries")
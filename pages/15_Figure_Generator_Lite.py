@@ -9,8 +9,7 @@ Publication-quality figures for PSYCHE framework paper
 import streamlit as st
 import pandas as pd
 import numpy as np
-from firebase_config import get_firebase_ref
-from expert_validation_utils import sanitize_firebase_key
+from analysis_dataset import clear_analysis_cache, get_analysis_dataset
 import matplotlib.pyplot as plt
 import matplotlib
 from matplotlib import rcParams
@@ -119,230 +118,6 @@ def get_model_from_exp(exp_num):
     """Identify model from experiment number."""
     return MODEL_BY_EXP.get(exp_num, 'unknown')
 
-# ================================
-# Data Loading Functions
-# ================================
-def load_expert_scores(root_data):
-    """Load expert scores for all validators and experiments."""
-    expert_data = {}
-    for validator in VALIDATORS:
-        sanitized_name = sanitize_firebase_key(validator)
-        validator_scores = {}
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized_name}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            if 'expert_score' in data:
-                validator_scores[(client_num, exp_num)] = data['expert_score']
-            elif 'psyche_score' in data:
-                validator_scores[(client_num, exp_num)] = data['psyche_score']
-            else:
-                validator_scores[(client_num, exp_num)] = None
-        expert_data[validator] = validator_scores
-    return expert_data
-
-def load_psyche_scores(root_data):
-    """Load automated PSYCHE scores."""
-    psyche_data = {}
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        value = None
-        target_prefix = f"clients_{client_num}_psyche_"
-        target_suffix = f"_{exp_num}"
-        for key, data in (root_data or {}).items():
-            if not key.startswith(target_prefix):
-                continue
-            if not key.endswith(target_suffix):
-                continue
-            record = data or {}
-            if 'psyche_score' in record:
-                value = record['psyche_score']
-                break
-        psyche_data[(client_num, exp_num)] = value
-    return psyche_data
-
-def calculate_average_expert_scores(expert_data):
-    """Calculate average expert scores across validators."""
-    avg_scores = {}
-    for exp in EXPERIMENT_NUMBERS:
-        scores = [expert_data[v].get(exp) for v in VALIDATORS if expert_data[v].get(exp) is not None]
-        avg_scores[exp] = np.mean(scores) if scores else None
-    return avg_scores
-
-def load_element_scores(root_data):
-    """Load element-level scores for category analysis.
-    
-    Returns:
-    - psyche_element_scores: {(client_num, exp_num): {element_name: {score: float}}}
-    - expert_element_scores: {validator_name: {(client_num, exp_num): {element_name: {score: float}}}}
-    """
-    from evaluator import PSYCHE_RUBRIC
-    
-    psyche_element_scores = {}
-    expert_element_scores = {validator: {} for validator in VALIDATORS}
-    
-    # Get valid element names from PSYCHE_RUBRIC
-    valid_elements = set(PSYCHE_RUBRIC.keys())
-    
-    # Debug info
-    psyche_keys_found = []
-    psyche_data_structure_sample = None
-    
-    # Load PSYCHE element scores
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        target_prefix = f"clients_{client_num}_psyche_"
-        target_suffix = f"_{exp_num}"
-        
-        for key, data in (root_data or {}).items():
-            if not key.startswith(target_prefix):
-                continue
-            if not key.endswith(target_suffix):
-                continue
-            
-            psyche_keys_found.append(key)
-            record = data or {}
-            
-            # Save sample structure for debugging
-            if psyche_data_structure_sample is None:
-                psyche_data_structure_sample = {
-                    'key': key,
-                    'top_level_keys': list(record.keys())[:10],
-                    'has_elements': 'elements' in record
-                }
-            
-            # Try 'elements' layer first (standard structure)
-            element_data = {}
-            if 'elements' in record and isinstance(record['elements'], dict):
-                for field_name, field_value in record['elements'].items():
-                    if field_name in valid_elements:
-                        element_data[field_name] = field_value
-            else:
-                # Fallback: extract element scores directly from record
-                for field_name, field_value in record.items():
-                    if field_name in valid_elements and isinstance(field_value, dict):
-                        element_data[field_name] = field_value
-            
-            if element_data:
-                psyche_element_scores[(client_num, exp_num)] = element_data
-            break
-    
-    # Store debug info
-    psyche_element_scores['_debug_keys'] = psyche_keys_found
-    psyche_element_scores['_debug_structure'] = psyche_data_structure_sample
-    
-    # Load Expert element scores
-    for validator in VALIDATORS:
-        sanitized_name = sanitize_firebase_key(validator)
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized_name}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            elements = data.get('elements', {})
-            if elements:
-                valid_elem_data = {k: v for k, v in elements.items() if k in valid_elements}
-                if valid_elem_data:
-                    expert_element_scores[validator][(client_num, exp_num)] = valid_elem_data
-    
-    return psyche_element_scores, expert_element_scores
-
-def calculate_category_scores(element_scores_psyche, element_scores_expert_dict):
-    """Calculate category-level scores (Subjective, Impulsivity, Behavior) for correlation analysis.
-    
-    Returns:
-    - psyche_category_scores: {(client_num, exp_num): {'Subjective': float, 'Impulsivity': float, 'Behavior': float}}
-    - expert_category_scores: {validator: {(client_num, exp_num): {'Subjective': float, 'Impulsivity': float, 'Behavior': float}}}
-    """
-    from evaluator import PSYCHE_RUBRIC
-    
-    # Category별 element 분류
-    impulsivity_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'impulsivity']
-    behavior_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'behavior']
-    subjective_elements = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
-    
-    # Weights
-    weight_subjective = 1
-    weight_impulsivity = 5
-    weight_behavior = 2
-    
-    # PSYCHE category scores
-    psyche_category_scores = {}
-    for exp in EXPERIMENT_NUMBERS:
-        if exp not in element_scores_psyche:
-            continue
-        
-        elements = element_scores_psyche[exp]
-        
-        # Subjective
-        subj_scores = []
-        for elem in subjective_elements:
-            if elem in elements:
-                score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                subj_scores.append(score)
-        subj_total = sum(subj_scores) * weight_subjective if subj_scores else 0
-        
-        # Impulsivity
-        imp_scores = []
-        for elem in impulsivity_elements:
-            if elem in elements:
-                score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                imp_scores.append(score)
-        imp_total = sum(imp_scores) * weight_impulsivity if imp_scores else 0
-        
-        # Behavior
-        beh_scores = []
-        for elem in behavior_elements:
-            if elem in elements:
-                score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                beh_scores.append(score)
-        beh_total = sum(beh_scores) * weight_behavior if beh_scores else 0
-        
-        psyche_category_scores[exp] = {
-            'Subjective': subj_total,
-            'Impulsivity': imp_total,
-            'Behavior': beh_total
-        }
-    
-    # Expert category scores
-    expert_category_scores = {validator: {} for validator in VALIDATORS}
-    
-    for validator in VALIDATORS:
-        validator_elements = element_scores_expert_dict.get(validator, {})
-        
-        for exp in EXPERIMENT_NUMBERS:
-            if exp not in validator_elements:
-                continue
-            
-            elements = validator_elements[exp]
-            
-            # Subjective
-            subj_scores = []
-            for elem in subjective_elements:
-                if elem in elements:
-                    score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                    subj_scores.append(score)
-            subj_total = sum(subj_scores) * weight_subjective if subj_scores else 0
-            
-            # Impulsivity
-            imp_scores = []
-            for elem in impulsivity_elements:
-                if elem in elements:
-                    score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                    imp_scores.append(score)
-            imp_total = sum(imp_scores) * weight_impulsivity if imp_scores else 0
-            
-            # Behavior
-            beh_scores = []
-            for elem in behavior_elements:
-                if elem in elements:
-                    score = elements[elem].get('score', 0) if isinstance(elements[elem], dict) else 0
-                    beh_scores.append(score)
-            beh_total = sum(beh_scores) * weight_behavior if beh_scores else 0
-            
-            expert_category_scores[validator][exp] = {
-                'Subjective': subj_total,
-                'Impulsivity': imp_total,
-                'Behavior': beh_total
-            }
-    
-    return psyche_category_scores, expert_category_scores
-
 # ================================
 # Combined Correlation Figure
 # ================================
@@ -958,15 +733,17 @@ def main():
     """)
     
     # Load data
+    if st.button("🔄 Firebase 데이터 새로고침"):
+        clear_analysis_cache()
     with st.spinner("데이터 로딩 중..."):
-        firebase_ref = get_firebase_ref()
-        root_snapshot = firebase_ref.get() or {}
-        expert_data = load_expert_scores(root_snapshot)
-        psyche_scores = load_psyche_scores(root_snapshot)
-        avg_expert_scores = calculate_average_expert_scores(expert_data)
+        # 다른 Figure 페이지와 공유되는 캐시 (데이터가 바뀌었을 때만 다시 파싱)
+        dataset = get_analysis_dataset(EXPERIMENT_NUMBERS, VALIDATORS)
+        expert_data = dataset.expert_scores_by_validator()
+        psyche_scores = dataset.psyche_scores()
+        avg_expert_scores = dataset.average_expert_scores()
         
         # Element-level scores for category analysis
-        element_scores_psyche, element_scores_expert = load_element_scores(root_snapshot)
+        element_scores_psyche, element_scores_expert = dataset.element_scores()
     
     st.success("✅ 데이터 로딩 완료")
     
@@ -978,15 +755,13 @@ def main():
         psyche_elem_count = len([k for k in element_scores_psyche.keys() if isinstance(k, tuple)])
         st.write(f"Element-level PSYCHE scores: {psyche_elem_count} experiments")
         
-        if '_debug_keys' in element_scores_psyche:
-            debug_keys = element_scores_psyche['_debug_keys']
-            st.write(f"PSYCHE keys found: {len(debug_keys)} total")
-            if debug_keys:
-                st.write(f"Sample keys: {debug_keys[:3]}")
+        st.write(f"PSYCHE keys found: {len(dataset.psyche_keys)} total (data version {dataset.version})")
+        if dataset.psyche_keys:
+            st.write(f"Sample keys: {list(dataset.psyche_keys[:3])}")
         
-        if '_debug_structure' in element_scores_psyche:
+        if dataset.psyche_structure_sample:
             st.write("**PSYCHE data structure sample:**")
-            st.json(element_scores_psyche['_debug_structure'])
+            st.json(dataset.psyche_structure_sample)
         
         st.write(f"Element-level Expert scores: {len(element_scores_expert)} validators")
         if element_scores_expert:
@@ -1031,9 +806,7 @@ def main():
         
         if element_scores_psyche and element_scores_expert:
             with st.spinner("Combined Figure 생성 중..."):
-                psyche_category_scores, expert_category_scores = calculate_category_scores(
-                    element_scores_psyche, element_scores_expert
-                )
+                psyche_category_scores, expert_category_scores = dataset.category_scores(use_expert_weighted_score=False)
                 
                 fig_combined = create_combined_correlation_figure(
                     psyche_scores, avg_expert_scores, expert_data,
@@ -1058,9 +831,7 @@ def main():
         
         if element_scores_psyche and element_scores_expert:
             with st.spinner("Combined Figure V2 생성 중..."):
-                psyche_category_scores, expert_category_scores = calculate_category_scores(
-                    element_scores_psyche, element_scores_expert
-                )
+                psyche_category_scores, expert_category_scores = dataset.category_scores(use_expert_weighted_score=False)
                 
                 fig_combined_v2 = create_combined_correlation_figure_v2(
                     psyche_scores, avg_expert_scores, expert_data,
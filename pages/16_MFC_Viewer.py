@@ -6,7 +6,7 @@ Profile, History, Behavior 데이터 확인 페이지
 import streamlit as st
 import json
 from firebase_config import get_firebase_ref
-from SP_utils import sanitize_key
+from firebase_catalog import list_root_keys, load_keys
 
 # ================================
 # Configuration
@@ -46,18 +46,14 @@ def load_mfc_data(firebase_ref, client_number, version="6_0"):
     """
     mfc_data = {}
     
-    # Get all data
-    all_data = firebase_ref.get()
-    
-    if not all_data:
-        return {'profile': None, 'history': None, 'behavior': None}
-    
     # Build keys with underscores (Firebase storage format)
     profile_key = f"clients_{client_number}_profile_version{version}"
     history_key = f"clients_{client_number}_history_version{version}"
     behavior_key = f"clients_{client_number}_beh_dir_version{version}"
     
-    # Load from all_data
+    # Read only the three MFC children
+    all_data = load_keys(firebase_ref, [profile_key, history_key, behavior_key])
+    
     mfc_data['profile'] = all_data.get(profile_key)
     mfc_data['history'] = all_data.get(history_key)
     mfc_data['behavior'] = all_data.get(behavior_key)
@@ -72,17 +68,17 @@ def get_available_clients(firebase_ref):
     """
     available = []
     
-    # Get all data from Firebase
-    all_data = firebase_ref.get()
+    # Key names only (shallow listing)
+    root_keys = list_root_keys(firebase_ref)
     
-    if not all_data:
+    if not root_keys:
         return []
     
     # Current research cohort: 6201-6207
     target_clients = list(range(6201, 6208))
     
     # Scan for profile keys
-    for key in all_data.keys():
+    for key in root_keys:
         # Look for pattern: clients_6201_profile_version6_0
         if "_profile_version6_0" in key:
             # Extract client number
@@ -27,8 +27,10 @@ from scipy import stats
 from scipy.stats import t as t_dist
 import seaborn as sns
 
-from firebase_config import get_firebase_ref
-from expert_validation_utils import sanitize_firebase_key
+from analysis_dataset import (ci_method_sidebar, clear_analysis_cache, correlation_comparison_groups,
+                              get_analysis_dataset, load_catalog_snapshot, regression_ci,
+                              show_correlation_comparisons)
+import weight_sensitivity
 
 # ================================
 # Page / Style configuration
@@ -98,6 +100,7 @@ LABEL_MAP = {
 WEIGHT_MARKER_SIZE = 30
 
 
+
 def get_model_from_exp(exp_num):
     return MODEL_BY_EXP.get(exp_num, 'unknown')
 
@@ -105,231 +108,10 @@ def get_model_from_exp(exp_num):
 # ================================
 # Data loading
 # ================================
-def load_expert_scores(root_data):
-    expert_data = {}
-    for validator in VALIDATORS:
-        sanitized = sanitize_firebase_key(validator)
-        scores = {}
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            if 'expert_score' in data:
-                scores[(client_num, exp_num)] = data['expert_score']
-            elif 'psyche_score' in data:
-                scores[(client_num, exp_num)] = data['psyche_score']
-            else:
-                scores[(client_num, exp_num)] = None
-        expert_data[validator] = scores
-    return expert_data
-
-
-def load_psyche_scores(root_data):
-    psyche_data = {}
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        value = None
-        prefix = f"clients_{client_num}_psyche_"
-        suffix = f"_{exp_num}"
-        for key, data in (root_data or {}).items():
-            if key.startswith(prefix) and key.endswith(suffix):
-                record = data or {}
-                if 'psyche_score' in record:
-                    value = record['psyche_score']
-                    break
-        psyche_data[(client_num, exp_num)] = value
-    return psyche_data
-
-
-def calculate_average_expert_scores(expert_data):
-    avg = {}
-    for exp in EXPERIMENT_NUMBERS:
-        vals = [expert_data[v].get(exp) for v in VALIDATORS if expert_data[v].get(exp) is not None]
-        avg[exp] = np.mean(vals) if vals else None
-    return avg
-
-
-def load_piqsca_from_firebase(root_data):
-    piqsca_by_validator = {}
-    for key in (root_data or {}).keys():
-        if not key.startswith('piqsca_'):
-            continue
-        parts = key.split('_')
-        if len(parts) < 4:
-            continue
-        try:
-            exp_num = int(parts[-1])
-            client_num = int(parts[-2])
-            validator_name = '_'.join(parts[1:-2])
-        except ValueError:
-            continue
-        data = (root_data or {}).get(key, {})
-        if not data:
-            continue
-        piqsca = (data.get('process_of_the_interview', 0)
-                  + data.get('techniques', 0)
-                  + data.get('information_for_diagnosis', 0))
-        piqsca_by_validator.setdefault(validator_name, {})[(client_num, exp_num)] = piqsca
-    return piqsca_by_validator, list(piqsca_by_validator.keys())
-
-
-def load_element_scores(root_data):
-    from evaluator import PSYCHE_RUBRIC
-    valid_elements = set(PSYCHE_RUBRIC.keys())
-    psyche_element_scores = {}
-    expert_element_scores = {v: {} for v in VALIDATORS}
-
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        prefix = f"clients_{client_num}_psyche_"
-        suffix = f"_{exp_num}"
-        for key, data in (root_data or {}).items():
-            if not (key.startswith(prefix) and key.endswith(suffix)):
-                continue
-            record = data or {}
-            element_data = {}
-            if 'elements' in record and isinstance(record['elements'], dict):
-                for fn, fv in record['elements'].items():
-                    if fn in valid_elements:
-                        element_data[fn] = fv
-            else:
-                for fn, fv in record.items():
-                    if fn in valid_elements and isinstance(fv, dict):
-                        element_data[fn] = fv
-            if element_data:
-                psyche_element_scores[(client_num, exp_num)] = element_data
-            break
-
-    for validator in VALIDATORS:
-        sanitized = sanitize_firebase_key(validator)
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-            if 'elements' in data:
-                valid = {k: v for k, v in data['elements'].items() if k in valid_elements}
-                if valid:
-                    expert_element_scores[validator][(client_num, exp_num)] = valid
-    return psyche_element_scores, expert_element_scores
-
-
-def calculate_weighted_correlation_from_elements(psyche_el, expert_el_dict,
-                                                 w_imp, w_beh, w_subj=1,
-                                                 expert_fixed_weights=None):
-    from evaluator import PSYCHE_RUBRIC
-    imp_el = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'impulsivity']
-    beh_el = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'behavior']
-    subj_el = [k for k, v in PSYCHE_RUBRIC.items()
-               if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
-
-    ps_scores, ex_scores = [], []
-    for exp in EXPERIMENT_NUMBERS:
-        psyche_elements = psyche_el.get(exp, {})
-        if not psyche_elements:
-            continue
-        expert_list = [expert_el_dict.get(v, {}).get(exp, {}) for v in VALIDATORS
-                       if expert_el_dict.get(v, {}).get(exp, {})]
-        if not expert_list:
-            continue
-        ps_total, ex_total = 0, 0
-        for element, info in PSYCHE_RUBRIC.items():
-            if element not in psyche_elements:
-                continue
-            e_scores = []
-            for ed in expert_list:
-                if element in ed:
-                    d = ed[element]
-                    e_scores.append(d.get('score', 0) if isinstance(d, dict) else 0)
-            if not e_scores:
-                continue
-            avg_e = np.mean(e_scores)
-            pe = psyche_elements[element]
-            ps = pe.get('score', 0) if isinstance(pe, dict) else 0
-            if element in imp_el:
-                pw = w_imp
-            elif element in beh_el:
-                pw = w_beh
-            elif element in subj_el:
-                pw = w_subj
-            else:
-                pw = info.get('weight', 1)
-            if expert_fixed_weights:
-                if element in imp_el:
-                    ew = expert_fixed_weights[0]
-                elif element in beh_el:
-                    ew = expert_fixed_weights[1]
-                elif element in subj_el:
-                    ew = expert_fixed_weights[2]
-                else:
-                    ew = info.get('weight', 1)
-            else:
-                ew = pw
-            ps_total += ps * pw
-            ex_total += avg_e * ew
-        ps_scores.append(ps_total)
-        ex_scores.append(ex_total)
-    if len(ps_scores) >= 2:
-        r, _ = stats.pearsonr(ps_scores, ex_scores)
-        return r
-    return None
-
-
-@st.cache_data(show_spinner="Weight correlation 계산 중... (최초 1회)")
-def calculate_weight_correlations(_psyche_el, _expert_el):
-    weight_range = np.arange(1, 10.1, 0.1)
-    n = len(weight_range)
-    corr_equal = np.zeros((n, n))
-    corr_fixed = np.zeros((n, n))
-    for i, w_imp in enumerate(weight_range):
-        for j, w_beh in enumerate(weight_range):
-            c = calculate_weighted_correlation_from_elements(_psyche_el, _expert_el, w_imp, w_beh)
-            corr_equal[n - 1 - i, j] = c if c is not None else 0
-            cf = calculate_weighted_correlation_from_elements(
-                _psyche_el, _expert_el, w_imp, w_beh, expert_fixed_weights=(5, 2, 1))
-            corr_fixed[n - 1 - i, j] = cf if cf is not None else 0
-    return corr_equal, corr_fixed, weight_range
-
-
-def calculate_category_scores(psyche_el, expert_el_dict):
-    from evaluator import PSYCHE_RUBRIC
-    imp_el = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'impulsivity']
-    beh_el = [k for k, v in PSYCHE_RUBRIC.items() if v.get('type') == 'behavior']
-    subj_el = [k for k, v in PSYCHE_RUBRIC.items()
-               if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
-    w_subj, w_imp, w_beh = 1, 5, 2
-
-    psyche_cat = {}
-    for exp in EXPERIMENT_NUMBERS:
-        if exp not in psyche_el:
-            continue
-        el = psyche_el[exp]
-        cats = {'Subjective': 0, 'Impulsivity': 0, 'Behavior': 0}
-        for e in subj_el:
-            if e in el and 'score' in el[e]:
-                cats['Subjective'] += el[e]['score'] * w_subj
-        for e in imp_el:
-            if e in el and 'score' in el[e]:
-                cats['Impulsivity'] += el[e]['score'] * w_imp
-        for e in beh_el:
-            if e in el and 'score' in el[e]:
-                cats['Behavior'] += el[e]['score'] * w_beh
-        psyche_cat[exp] = cats
-
-    expert_cat = {v: {} for v in VALIDATORS}
-    for validator in VALIDATORS:
-        for exp in EXPERIMENT_NUMBERS:
-            if exp not in expert_el_dict[validator]:
-                continue
-            el = expert_el_dict[validator][exp]
-            cats = {'Subjective': 0, 'Impulsivity': 0, 'Behavior': 0}
-            for grp, key, w in [(subj_el, 'Subjective', w_subj),
-                                (imp_el, 'Impulsivity', w_imp),
-                                (beh_el, 'Behavior', w_beh)]:
-                for e in grp:
-                    if e in el:
-                        d = el[e]
-                        if isinstance(d, dict) and 'weighted_score' in d:
-                            cats[key] += d['weighted_score']
-                        elif isinstance(d, dict) and 'score' in d:
-                            cats[key] += d['score'] * w
-            expert_cat[validator][exp] = cats
-    return psyche_cat, expert_cat
+def calculate_weight_correlations(psyche_el, expert_el):
+    # Whole 91×91 grid in array operations (see weight_sensitivity.py)
+    return weight_sensitivity.calculate_weight_correlations(
+        psyche_el, expert_el, EXPERIMENT_NUMBERS, VALIDATORS, expert_fixed_weights=(5, 2, 1))
 
 
 def load_sp_validation_data(root_data):
@@ -478,10 +260,10 @@ def create_correlation_plot_average(psyche_scores, avg_expert_scores, figsize=(8
         # 95% CI (t-distribution)
         from scipy.stats import t as t_dist
         t_val = t_dist.ppf(0.975, n - 2)
-        ci = t_val * se_line
+        ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
         
         # Plot CI
-        ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+        ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
         ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
         
         # Correlation
@@ -561,9 +343,9 @@ def create_correlation_plot_by_validator(psyche_scores, expert_data):
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(validator_x_arr, validator_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(validator_x, validator_y)
@@ -642,9 +424,9 @@ def create_correlation_plot_by_disorder(psyche_scores, avg_expert_scores):
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             correlation, p_value = stats.pearsonr(all_x, all_y)
@@ -742,9 +524,9 @@ def create_correlation_plot_by_category(psyche_category_scores, expert_category_
             
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             # Correlation
@@ -921,10 +703,10 @@ def create_piqsca_correlation_plot_firebase(psyche_scores, piqsca_by_validator,
             # 95% CI (t-distribution)
             from scipy.stats import t as t_dist
             t_val = t_dist.ppf(0.975, n - 2)
-            ci = t_val * se_line
+            ci_lower, ci_upper = regression_ci(all_x_arr, all_y_arr, x_line, y_line, t_val * se_line)
             
             # Plot CI
-            ax.fill_between(x_line, y_line - ci, y_line + ci, alpha=0.2, color='#3498db')
+            ax.fill_between(x_line, ci_lower, ci_upper, alpha=0.2, color='#3498db')
             ax.plot(x_line, y_line, '#3498db', linestyle='-', linewidth=2)
             
             # Correlation info
@@ -1148,6 +930,7 @@ def download_row(fig, base_filename, key_prefix):
 def main():
     plt.close('all')
     st.title("📄 Paper Figures (PSYCHE 2nd revision)")
+    ci_method_sidebar()
     st.caption("논문에 들어가는 Figure만 개별 plot으로 생성합니다. "
                "합치기(배치/라벨)는 Keynote에서 직접 하세요. 모두 벡터(PDF/SVG)로 다운로드.")
     st.info(
@@ -1160,15 +943,19 @@ def main():
     )
     st.markdown("---")
 
+    if st.button("🔄 Firebase 데이터 새로고침"):
+        clear_analysis_cache()
     with st.spinner("Firebase 데이터 로딩 중..."):
-        root = get_firebase_ref().get() or {}
-        expert_data = load_expert_scores(root)
-        psyche_scores = load_psyche_scores(root)
-        avg_expert_scores = calculate_average_expert_scores(expert_data)
-        element_psyche, element_expert = load_element_scores(root)
-        conformity_data = load_sp_validation_data(root)
-        qualitative_data = load_sp_qualitative_data(root)
-        piqsca_by_validator, piqsca_found = load_piqsca_from_firebase(root)
+        # 다른 Figure 페이지와 공유되는 캐시 (데이터가 바뀌었을 때만 다시 파싱)
+        dataset = get_analysis_dataset(EXPERIMENT_NUMBERS, VALIDATORS)
+        sp_root = load_catalog_snapshot(('sp_validation',))
+        expert_data = dataset.expert_scores_by_validator()
+        psyche_scores = dataset.psyche_scores()
+        avg_expert_scores = dataset.average_expert_scores()
+        element_psyche, element_expert = dataset.element_scores()
+        conformity_data = load_sp_validation_data(sp_root)
+        qualitative_data = load_sp_qualitative_data(sp_root)
+        piqsca_by_validator, piqsca_found = dataset.piqsca_by_validator()
     st.success("✅ 데이터 로딩 완료")
 
     # ---------- Figure 5 ----------
@@ -1248,13 +1035,19 @@ def main():
 
     st.subheader("(c) Category-Level")
     if element_psyche and element_expert:
-        psyche_cat, expert_cat = calculate_category_scores(element_psyche, element_expert)
+        psyche_cat, expert_cat = dataset.category_scores()
         fig8c = create_correlation_plot_by_category(psyche_cat, expert_cat)
         st.pyplot(fig8c)
         download_row(fig8c, "figure_combined_correlation_c_category", "fig8c")
         plt.close(fig8c)
     else:
         st.info("Element-level 데이터가 필요합니다.")
+    st.markdown("---")
+
+    # ---------- Correlation comparisons ----------
+    st.header("Correlation comparisons (bootstrap / permutation)")
+    show_correlation_comparisons(psyche_scores, avg_expert_scores,
+                                 correlation_comparison_groups(EXPERIMENT_NUMBERS, MODEL_BY_EXP, DISORDER_MAP))
 
 
 if __name__ == "__main__":
@@ -9,7 +9,7 @@ import streamlit as st
 from datetime import datetime
 from Home import check_participant
 from firebase_config import get_firebase_ref
-from SP_utils import sanitize_key
+from firebase_catalog import find_keys, load_keys
 import json
 
 # 검증자 명단 (6명)
@@ -35,8 +35,11 @@ def main():
         st.error("Firebase 초기화 실패")
         st.stop()
     
-    # Get all data from Firebase
-    all_data = firebase_ref.get()
+    # Load only 6301-related keys and progress keys (shallow listing + targeted reads)
+    all_data = load_keys(firebase_ref, find_keys(
+        firebase_ref,
+        key_filter=lambda key: '6301' in key or 'sp_validation_progress_' in key or 'sp_progress_' in key
+    ))
     
     if not all_data:
         st.warning("Firebase에 데이터가 없습니다.")
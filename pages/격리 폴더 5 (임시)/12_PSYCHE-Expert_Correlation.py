@@ -9,8 +9,7 @@ Expert Score vs PSYCHE Score 비교 및 Correlation 분석
 import streamlit as st
 import pandas as pd
 import numpy as np
-from firebase_config import get_firebase_ref
-from expert_validation_utils import sanitize_firebase_key
+from analysis_dataset import get_analysis_dataset
 import matplotlib.pyplot as plt
 import matplotlib
 from scipy import stats
@@ -139,74 +138,6 @@ def _possible_model_tags(base_model):
     return mapping.get(base_model, [base_model])
 
 
-def load_expert_scores(root_data):
-    """Load expert scores for all validators and experiments from root snapshot."""
-    expert_data = {}
-
-    for validator in VALIDATORS:
-        sanitized_name = sanitize_firebase_key(validator)
-        validator_scores = {}
-
-        for client_num, exp_num in EXPERIMENT_NUMBERS:
-            key = f"expert_{sanitized_name}_{client_num}_{exp_num}"
-            data = (root_data or {}).get(key, {}) or {}
-
-            if 'expert_score' in data:
-                validator_scores[(client_num, exp_num)] = data['expert_score']
-            elif 'psyche_score' in data:  # backward compatibility
-                validator_scores[(client_num, exp_num)] = data['psyche_score']
-            else:
-                validator_scores[(client_num, exp_num)] = None
-
-        expert_data[validator] = validator_scores
-
-    return expert_data
-
-
-def load_psyche_scores(root_data):
-    """Load automated PSYCHE scores from root snapshot.
-
-    Model tags are ignored; exp_num is unique, so we match by client and exp suffix.
-    """
-    psyche_data = {}
-
-    for client_num, exp_num in EXPERIMENT_NUMBERS:
-        value = None
-        target_prefix = f"clients_{client_num}_psyche_"
-        target_suffix = f"_{exp_num}"
-
-        for key, data in (root_data or {}).items():
-            if not key.startswith(target_prefix):
-                continue
-            if not key.endswith(target_suffix):
-                continue
-            record = data or {}
-            if 'psyche_score' in record:
-                value = record['psyche_score']
-                break
-
-        psyche_data[(client_num, exp_num)] = value
-
-    return psyche_data
-
-def calculate_average_expert_scores(expert_data):
-    """Calculate average expert scores across validators"""
-    avg_scores = {}
-    
-    for exp in EXPERIMENT_NUMBERS:
-        scores = []
-        for validator in VALIDATORS:
-            score = expert_data[validator].get(exp)
-            if score is not None:
-                scores.append(score)
-        
-        if scores:
-            avg_scores[exp] = np.mean(scores)
-        else:
-            avg_scores[exp] = None
-    
-    return avg_scores
-
 # ================================
 # Visualization Functions
 # ================================
@@ -306,11 +237,10 @@ def main():
     
     # Load data
     with st.spinner("데이터 로딩 중..."):
-        firebase_ref = get_firebase_ref()
-        root_snapshot = firebase_ref.get() or {}
-        expert_data = load_expert_scores(root_snapshot)
-        psyche_scores = load_psyche_scores(root_snapshot)
-        avg_expert_scores = calculate_average_expert_scores(expert_data)
+        dataset = get_analysis_dataset(EXPERIMENT_NUMBERS, VALIDATORS)
+        expert_data = dataset.expert_scores_by_validator()
+        psyche_scores = dataset.psyche_scores()
+        avg_expert_scores = dataset.average_expert_scores()
     
     st.success("✅ 데이터 로딩 완료")
     
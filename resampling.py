@@ -0,0 +1,213 @@
+"""
+Bootstrap / Permutation Resampling for Correlation Statistics
+PSYCHE–Expert correlation의 bootstrap CI 및 모델 간 r 차이 permutation test
+
+Every resample of a chunk is drawn as one index array ((size, n) for bootstrap
+draws, row-wise permutations for permutation tests) and all correlations / line
+fits of the chunk are computed at once. Resamples are split into fixed-size chunks,
+each with its own SeedSequence child, so large resample counts can be spread over
+a process pool and the result is the same for any number of workers.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agreement_stats import percentile_ci
+from weight_sensitivity import pearson_r_last_axis
+
+CI_METHODS = ("t", "bootstrap")
+DEFAULT_RESAMPLES = 10000
+DEFAULT_CI = 0.95
+
+# Resamples per task; fixed so results do not depend on the worker count
+CHUNK_SIZE = 2000
+# Below this many resamples everything runs in-process (pool start-up costs more)
+PARALLEL_MIN_RESAMPLES = 50000
+
+
+def paired_arrays(x, y) -> Tuple[np.ndarray, np.ndarray]:
+    """Float arrays with pairs containing None / NaN removed."""
+    x = np.array([np.nan if v is None else v for v in x], dtype=float)
+    y = np.array([np.nan if v is None else v for v in y], dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    return x[keep], y[keep]
+
+
+def linear_fit_rows(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares slope and intercept along the last axis (NaN where x is constant)."""
+    x_mean = x.mean(axis=-1, keepdims=True)
+    y_mean = y.mean(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = ((x - x_mean) * (y - y_mean)).sum(axis=-1) / ((x - x_mean) ** 2).sum(axis=-1)
+    return slope, y_mean[..., 0] - slope * x_mean[..., 0]
+
+
+# ================================
+# Chunk workers (top-level so they can be sent to worker processes)
+# ================================
+def _bootstrap_r_chunk(x, y, size, seed):
+    idx = np.random.default_rng(seed).integers(0, len(x), size=(size, len(x)))
+    return pearson_r_last_axis(x[idx], y[idx])
+
+
+def _bootstrap_fit_chunk(x, y, size, seed):
+    idx = np.random.default_rng(seed).integers(0, len(x), size=(size, len(x)))
+    return np.column_stack(linear_fit_rows(x[idx], y[idx]))
+
+
+def _bootstrap_r_difference_chunk(x1, y1, x2, y2, size, seed):
+    rng = np.random.default_rng(seed)
+    idx1 = rng.integers(0, len(x1), size=(size, len(x1)))
+    idx2 = rng.integers(0, len(x2), size=(size, len(x2)))
+    return pearson_r_last_axis(x1[idx1], y1[idx1]) - pearson_r_last_axis(x2[idx2], y2[idx2])
+
+
+def _permutation_r_difference_chunk(x, y, n_first, size, seed):
+    # Each row reassigns the pooled (x, y) pairs to the two groups
+    idx = np.random.default_rng(seed).permuted(np.tile(np.arange(len(x)), (size, 1)), axis=1)
+    first, second = idx[:, :n_first], idx[:, n_first:]
+    return pearson_r_last_axis(x[first], y[first]) - pearson_r_last_axis(x[second], y[second])
+
+
+def run_resamples(chunk_fn: Callable, args: tuple, n_resamples: int, seed: Optional[int] = 0,
+                  workers: Optional[int] = None) -> np.ndarray:
+    """
+    Run chunk_fn(*args, size, seed) over CHUNK_SIZE chunks and concatenate the results.
+
+    workers=None uses a process pool (one worker per CPU) only for n_resamples >=
+    PARALLEL_MIN_RESAMPLES; workers<=1 always runs in-process.
+    """
+    sizes = [CHUNK_SIZE] * (n_resamples // CHUNK_SIZE)
+    if n_resamples % CHUNK_SIZE:
+        sizes.append(n_resamples % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if n_resamples >= PARALLEL_MIN_RESAMPLES else 1
+    if workers <= 1 or len(sizes) <= 1:
+        return np.concatenate([chunk_fn(*args, size, s) for size, s in zip(sizes, seeds)])
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as executor:
+        futures = [executor.submit(chunk_fn, *args, size, s) for size, s in zip(sizes, seeds)]
+        return np.concatenate([future.result() for future in futures])
+
+
+# ================================
+# Public API
+# ================================
+def bootstrap_r_ci(x, y, n_resamples: int = DEFAULT_RESAMPLES, ci: float = DEFAULT_CI,
+                   seed: Optional[int] = 0, workers: Optional[int] = None) -> Optional[Tuple[float, float]]:
+    """Percentile bootstrap CI of Pearson r (pairs resampled with replacement)."""
+    x, y = paired_arrays(x, y)
+    if len(x) < 3:
+        return None
+    return percentile_ci(run_resamples(_bootstrap_r_chunk, (x, y), n_resamples, seed, workers), ci)
+
+
+def bootstrap_regression_band(x, y, x_line, n_resamples: int = DEFAULT_RESAMPLES, ci: float = DEFAULT_CI,
+                              seed: Optional[int] = 0, workers: Optional[int] = None
+                              ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Pointwise percentile band of the bootstrapped regression line over x_line."""
+    x, y = paired_arrays(x, y)
+    if len(x) < 3:
+        return None
+    fits = run_resamples(_bootstrap_fit_chunk, (x, y), n_resamples, seed, workers)
+    fits = fits[~np.isnan(fits).any(axis=1)]
+    if len(fits) == 0:
+        return None
+    lines = fits[:, :1] * np.asarray(x_line, dtype=float)[None, :] + fits[:, 1:]
+    tail = (1 - ci) / 2 * 100
+    lower, upper = np.percentile(lines, [tail, 100 - tail], axis=0)
+    return lower, upper
+
+
+def confidence_band(x, y, x_line, y_line, t_halfwidth, method: str = "t",
+                    **bootstrap_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Regression-line CI band for the correlation plots: the t-distribution band
+    (y_line ± t_halfwidth) or, with method="bootstrap", the bootstrap band
+    (falls back to the t band when there are too few points to resample).
+    """
+    if method == "bootstrap":
+        band = bootstrap_regression_band(x, y, x_line, **bootstrap_kwargs)
+        if band is not None:
+            return band
+    return y_line - t_halfwidth, y_line + t_halfwidth
+
+
+def compare_correlations(x1, y1, x2, y2, n_resamples: int = DEFAULT_RESAMPLES, ci: float = DEFAULT_CI,
+                         seed: Optional[int] = 0, workers: Optional[int] = None) -> Optional[Dict[str, object]]:
+    """
+    Difference in Pearson r between two independent groups.
+
+    Returns r / bootstrap CI per group, r1 - r2 with its bootstrap CI, and the
+    two-sided permutation p-value (group labels of the pooled pairs shuffled).
+    None when a group has fewer than 3 pairs or r is undefined (constant x or y).
+    """
+    x1, y1 = paired_arrays(x1, y1)
+    x2, y2 = paired_arrays(x2, y2)
+    if len(x1) < 3 or len(x2) < 3:
+        return None
+
+    r1 = float(pearson_r_last_axis(x1, y1))
+    r2 = float(pearson_r_last_axis(x2, y2))
+    observed = r1 - r2
+    if not np.isfinite(observed):
+        return None
+
+    differences = run_resamples(_bootstrap_r_difference_chunk, (x1, y1, x2, y2), n_resamples, seed, workers)
+    permuted = run_resamples(_permutation_r_difference_chunk,
+                             (np.concatenate([x1, x2]), np.concatenate([y1, y2]), len(x1)),
+                             n_resamples, None if seed is None else seed + 1, workers)
+    permuted = permuted[~np.isnan(permuted)]
+    p_value = (np.sum(np.abs(permuted) >= abs(observed) - 1e-12) + 1) / (len(permuted) + 1)
+
+    return {
+        'n1': len(x1), 'r1': r1, 'r1_ci': bootstrap_r_ci(x1, y1, n_resamples, ci, seed, workers),
+        'n2': len(x2), 'r2': r2, 'r2_ci': bootstrap_r_ci(x2, y2, n_resamples, ci, seed, workers),
+        'difference': observed, 'difference_ci': percentile_ci(differences, ci),
+        'p_permutation': float(p_value),
+    }
+
+
+def correlation_comparison_table(psyche_scores: Dict, expert_scores: Dict, groups: Dict[str, Sequence],
+                                 comparisons: Sequence[Tuple[str, str]], n_resamples: int = DEFAULT_RESAMPLES,
+                                 ci: float = DEFAULT_CI, seed: Optional[int] = 0,
+                                 workers: Optional[int] = None) -> List[Dict[str, object]]:
+    """
+    One row per (group_a, group_b) comparison of PSYCHE–expert correlations.
+
+    Args:
+        psyche_scores / expert_scores: {(client_num, exp_num): score or None}
+        groups: {group name: [(client_num, exp_num), ...]}
+        comparisons: pairs of group names
+    """
+    def _pairs(name):
+        exps = groups.get(name, [])
+        return [psyche_scores.get(exp) for exp in exps], [expert_scores.get(exp) for exp in exps]
+
+    def _fmt_ci(interval):
+        return f"[{interval[0]:.3f}, {interval[1]:.3f}]" if interval else "-"
+
+    rows = []
+    for group_a, group_b in comparisons:
+        result = compare_correlations(*_pairs(group_a), *_pairs(group_b), n_resamples=n_resamples, ci=ci,
+                                      seed=seed, workers=workers)
+        if result is None:
+            continue
+        rows.append({
+            'Comparison': f"{group_a} vs {group_b}",
+            'r (A)': round(result['r1'], 4),
+            'CI (A)': _fmt_ci(result['r1_ci']),
+            'n (A)': result['n1'],
+            'r (B)': round(result['r2'], 4),
+            'CI (B)': _fmt_ci(result['r2_ci']),
+            'n (B)': result['n2'],
+            'Δr': round(result['difference'], 4),
+            'CI (Δr)': _fmt_ci(result['difference_ci']),
+            'p (permutation)': round(result['p_permutation'], 4),
+        })
+    return rows
@@ -0,0 +1,334 @@
+"""
+Headless AI-to-AI Experiment Runner
+
+Runs SP ↔ PACA conversations without the Streamlit UI, many at once through a
+bounded worker pool. Each run does what the Experiment_*.py pages do:
+simulate the conversation, generate the PACA/SP constructs, and save
+conversation_log_*, construct_paca_* and construct_sp_* to Firebase. Turns are saved
+as they are generated (conversation_log.py), so --resume can continue unfinished runs.
+With --checkpoint the full simulation state is saved as well (simulation_checkpoint.py),
+and --resume continues exactly where the run stopped instead of replaying the turns.
+
+Usage:
+    python run_experiments.py --run 6201:gpt_basic:3111 --run 6202:claude_guided:1241
+    python run_experiments.py --matrix sweep.csv --workers 8 --max-turns 300
+    python run_experiments.py --matrix sweep.csv --checkpoint local --resume
+
+The matrix CSV has the columns client_number, variant, exp_number; a variant is a
+paca_engine.PACA_MODELS entry. All PACA calls go through the engine, so
+--max-concurrent-calls and --max-connections apply to the whole worker pool; every LLM
+call is rate limited and retried by llm_scheduler.py (--rate-limit).
+"""
+
+import argparse
+import csv
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from conversation_log import (DEFAULT_FLUSH_EVERY, LOG_STATUS_COMPLETE, ConversationLogWriter,
+                              load_unfinished_conversation, restore_memories, resume_conversation)
+from SP_utils import (create_conversational_agent, load_from_firebase, get_diag_from_given_information,
+                      load_prompt_and_get_version, save_many_to_firebase)
+from firebase_config import get_firebase_ref
+from llm_cache import CACHE_MODES, configure_llm_cache
+from llm_scheduler import configure_rate_limits, parse_rate_limits, scheduler
+from paca_construct_generator import CONSTRUCT_MODES, create_paca_construct
+from paca_engine import (DEFAULT_MAX_CONNECTIONS, PACA_MODELS, configure_connection_pool, create_paca_agent,
+                         set_max_concurrent_calls, simulate_conversation)
+from simulation_checkpoint import (DEFAULT_CHECKPOINT_DIR, FirebaseCheckpointStore, LocalCheckpointStore,
+                                   capture_checkpoint, checkpoint_turns, resume_from_checkpoint)
+from sp_construct_generator import create_sp_construct
+from termination import default_termination_detector
+
+# PRESET (same as Experiment_*.py)
+profile_version = 6.0
+beh_dir_version = 6.0
+con_agent_version = 6.0
+paca_version = 3.0
+
+CHECKPOINT_LOCATIONS = ("local", "firebase")
+
+
+def parse_run_spec(spec: str) -> Tuple[str, str, str]:
+    """Parse 'client_number:variant:exp_number' into a run tuple."""
+    parts = spec.split(":")
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"Expected CLIENT:VARIANT:EXP, got '{spec}'")
+    client_number, variant, exp_number = (p.strip() for p in parts)
+    if variant not in PACA_MODELS:
+        raise argparse.ArgumentTypeError(f"Unknown PACA variant '{variant}'. Choose from {sorted(PACA_MODELS)}")
+    if not client_number.isdigit() or not exp_number.isdigit():
+        raise argparse.ArgumentTypeError(f"Client and experiment numbers must be digits: '{spec}'")
+    return client_number, variant, exp_number
+
+
+def load_matrix(path: str) -> List[Tuple[str, str, str]]:
+    """Load runs from a CSV with columns client_number, variant, exp_number."""
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [
+            parse_run_spec(f"{row['client_number']}:{row['variant']}:{row['exp_number']}")
+            for row in reader
+        ]
+
+
+def check_experiment_number_exists(firebase_ref, client_number, exp_number):
+    """Same check as the Experiment_*.py pages (PACA construct and conversation log)."""
+    keys_to_check = [
+        f"construct_paca_{client_number}_{exp_number}",
+        f"conversation_log_{client_number}_{exp_number}"
+    ]
+    return any(load_from_firebase(firebase_ref, client_number, key) is not None for key in keys_to_check)
+
+
+def create_sp_agent(client_number, history_turns=None, history_token_budget=None):
+    """Create the SP agent exactly as the Experiment pages do (BD uses its own prompt)."""
+    given_information = load_from_firebase(get_firebase_ref(), client_number, "given_information")
+    if not given_information:
+        raise ValueError(f"given_information not found for client {client_number}")
+
+    diag = get_diag_from_given_information(given_information)
+    if diag == "BD":
+        system_prompt, actual_version = load_prompt_and_get_version("con-agent", con_agent_version, diag)
+    else:
+        system_prompt, actual_version = load_prompt_and_get_version("con-agent", con_agent_version)
+    if not system_prompt:
+        raise ValueError("Failed to load SP system prompt")
+
+    sp_agent, sp_memory = create_conversational_agent(
+        f"{profile_version:.1f}".replace(".", "_"),
+        f"{beh_dir_version:.1f}".replace(".", "_"),
+        client_number,
+        system_prompt,
+        history_turns=history_turns,
+        history_token_budget=history_token_budget,
+    )
+    return sp_agent, sp_memory, actual_version
+
+
+def run_experiment(client_number: str, variant: str, exp_number: str, max_turns: int = 300,
+                   overwrite: bool = False, history_turns: Optional[int] = None,
+                   history_token_budget: Optional[int] = None, early_stop: bool = True,
+                   construct_mode: str = "sequential", resume: bool = False,
+                   flush_every: int = DEFAULT_FLUSH_EVERY, checkpoint_store=None,
+                   checkpoint_every: int = 1) -> Dict[str, Any]:
+    """
+    Run one SP ↔ PACA conversation, build both constructs and save them.
+    Turns are saved to conversation_log_* as they are generated; with resume=True an
+    unfinished run of the same experiment number continues from its saved turns.
+    With a checkpoint_store (simulation_checkpoint.py) the simulation state is saved every
+    checkpoint_every turns and a resumed run restores it exactly; the checkpoint is
+    deleted once the run is saved.
+    """
+    firebase_ref = get_firebase_ref()
+    if firebase_ref is None:
+        raise RuntimeError("Firebase reference not available")
+
+    saved_turns = resumed_turns = checkpoint = None
+    if resume and not overwrite:
+        saved_turns = load_unfinished_conversation(firebase_ref, client_number, exp_number)
+        if checkpoint_store is not None:
+            checkpoint = checkpoint_store.load(client_number, exp_number)
+            # A checkpoint left behind by a run that was saved after all is ignored
+            if checkpoint is not None and saved_turns is None and \
+                    check_experiment_number_exists(firebase_ref, client_number, exp_number):
+                checkpoint = None
+        resumed_turns = checkpoint_turns(checkpoint) if checkpoint is not None else saved_turns
+    if not overwrite and resumed_turns is None and check_experiment_number_exists(firebase_ref, client_number, exp_number):
+        return {"status": "skipped", "reason": "experiment number already used"}
+
+    sp_agent, sp_memory, actual_con_agent_version = create_sp_agent(client_number, history_turns, history_token_budget)
+    # Unique page_id so cached PACA agents (st.cache_resource) never share memory across runs
+    paca_agent, paca_memory, actual_paca_version = create_paca_agent(
+        variant, paca_version, page_id=f"batch_{variant}_client{client_number}_{exp_number}",
+        history_turns=history_turns, history_token_budget=history_token_budget)
+
+    termination_detector = default_termination_detector() if early_stop else None
+    if checkpoint is not None:
+        turns = resume_from_checkpoint(checkpoint, paca_agent, paca_memory, sp_agent, sp_memory,
+                                       max_turns=max_turns, termination_detector=termination_detector)
+    elif resumed_turns:
+        restore_memories(resumed_turns, paca_memory, sp_memory)
+        turns = resume_conversation(paca_agent, sp_agent, resumed_turns, max_turns=max_turns,
+                                    termination_detector=termination_detector)
+    else:
+        # Seed both memories with the hardcoded greeting (as the Experiment pages do)
+        greeting = PACA_MODELS[variant].greeting
+        paca_memory.add_ai_message(greeting)
+        sp_memory.add_user_message(greeting)
+        turns = simulate_conversation(
+            paca_agent, sp_agent, max_turns=max_turns, termination_detector=termination_detector)
+
+    conversation = list(resumed_turns or [])
+    log_writer = ConversationLogWriter(firebase_ref, client_number, exp_number, flush_every=flush_every,
+                                       start_index=len(saved_turns or []))
+    if overwrite:
+        log_writer.clear()
+        if checkpoint_store is not None:
+            checkpoint_store.delete(client_number, exp_number)
+    # The stored log and the checkpoint are written at different intervals; align the log with the resume point
+    log_writer.truncate(len(conversation))
+    log_writer.extend(conversation[log_writer.total_turns:])
+
+    for speaker, message in turns:
+        conversation.append((speaker, message))
+        log_writer.append(speaker, message)
+        if checkpoint_store is not None and len(conversation) % max(1, checkpoint_every) == 0:
+            checkpoint_store.save(capture_checkpoint(client_number, exp_number, conversation, paca_agent,
+                                                     paca_memory, sp_agent, sp_memory, variant=variant))
+
+    paca_construct = create_paca_construct(paca_agent, mode=construct_mode)
+    given_form_path = f"data/prompts/paca_system_prompt/given_form_version{paca_version}.json"
+    sp_construct = create_sp_construct(
+        client_number,
+        f"{profile_version:.1f}",
+        f"{beh_dir_version:.1f}",
+        given_form_path,
+    )
+
+    # The turns are already stored; the run metadata is merged into the same log
+    conversation_metadata = {
+        'paca_version': actual_paca_version,
+        'sp_version': actual_con_agent_version,
+        'timestamp': int(time.time()),
+        'total_turns': len(conversation),
+        'status': LOG_STATUS_COMPLETE,
+    }
+    if termination_detector is not None:
+        conversation_metadata.update(termination_detector.log_fields())
+    to_save = []
+    if paca_construct:
+        to_save.append((f"construct_paca_{client_number}_{exp_number}", paca_construct))
+    if sp_construct:
+        to_save.append((f"construct_sp_{client_number}_{exp_number}", sp_construct))
+    # One multi-path update (remaining turns + metadata + constructs), so a run is never half-finished
+    merge_items = [(log_writer.data_type, {**log_writer.pending_updates(), **conversation_metadata})]
+    if not save_many_to_firebase(firebase_ref, client_number, to_save, merge_items=merge_items):
+        raise RuntimeError("Failed to save conversation and constructs to Firebase")
+    log_writer.mark_flushed()
+    if checkpoint_store is not None:
+        checkpoint_store.delete(client_number, exp_number)
+
+    result = {"status": "done", "total_turns": len(conversation),
+              "stop_reason": conversation_metadata.get('stop_reason', 'max_turns')}
+    if resumed_turns:
+        result["resumed_from"] = len(resumed_turns)
+        if checkpoint is not None:
+            result["resumed_from_checkpoint"] = True
+    return result
+
+
+def run_batch(runs: List[Tuple[str, str, str]], workers: int = 4, max_turns: int = 300,
+              overwrite: bool = False, history_turns: Optional[int] = None,
+              history_token_budget: Optional[int] = None,
+              early_stop: bool = True,
+              construct_mode: str = "sequential", resume: bool = False,
+              flush_every: int = DEFAULT_FLUSH_EVERY, checkpoint_store=None,
+              checkpoint_every: int = 1) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """Run all experiments through a bounded thread pool (LLM calls are I/O bound)."""
+    counts = Counter((client_number, exp_number) for client_number, _, exp_number in runs)
+    duplicates = [pair for pair, n in counts.items() if n > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate (client_number, exp_number) pairs in matrix: {sorted(duplicates)}")
+
+    results = {}
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(run_experiment, client_number, variant, exp_number, max_turns, overwrite,
+                            history_turns, history_token_budget, early_stop,
+                            construct_mode, resume, flush_every, checkpoint_store,
+                            checkpoint_every): (client_number, variant, exp_number)
+            for client_number, variant, exp_number in runs
+        }
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                results[run] = future.result()
+            except Exception as e:
+                results[run] = {"status": "failed", "reason": str(e), "traceback": traceback.format_exc()}
+            print(f"[{len(results)}/{len(runs)}] client={run[0]} variant={run[1]} exp={run[2]} -> {results[run]['status']}"
+                  f" ({time.time() - started:.0f}s)", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SP ↔ PACA experiments headlessly in parallel.")
+    parser.add_argument("--run", action="append", type=parse_run_spec, default=[],
+                        metavar="CLIENT:VARIANT:EXP", help=f"One run; variant is one of {sorted(PACA_MODELS)}")
+    parser.add_argument("--matrix", help="CSV with columns client_number, variant, exp_number")
+    parser.add_argument("--workers", type=int, default=4, help="Number of conversations run at once")
+    parser.add_argument("--max-concurrent-calls", type=int,
+                        help="Cap on in-flight LLM calls per provider/model (default: no cap)")
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help="Size of the HTTP connection pool shared by the OpenAI PACA models")
+    parser.add_argument("--rate-limit", action="append", default=[], type=parse_rate_limits,
+                        metavar="PROVIDER[:MODEL]=RPM/TPM",
+                        help="LLM quota, e.g. openai=5000/2000000 (repeatable; default: PSYCHE_LLM_RATE_LIMITS)")
+    parser.add_argument("--max-turns", type=int, default=300, help="max_turns passed to simulate_conversation")
+    parser.add_argument("--overwrite", action="store_true", help="Re-run experiment numbers that already exist")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue unfinished runs (conversation log saved, run never completed) from their saved turns")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                        help="Save the conversation log every N turns")
+    parser.add_argument("--checkpoint", choices=CHECKPOINT_LOCATIONS,
+                        help="Save the full simulation state (memories, recall-failure/RNG state) locally or in "
+                             "Firebase, so --resume continues a run exactly")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR,
+                        help="Directory of local checkpoints (--checkpoint local)")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="Save a checkpoint every N turns")
+    parser.add_argument("--llm-cache", choices=CACHE_MODES,
+                        help="LLM response cache mode (default: PSYCHE_LLM_CACHE_MODE or passthrough)")
+    parser.add_argument("--history-turns", type=int,
+                        help="Bounded-history mode: turns sent verbatim to the LLMs (older turns are summarized)")
+    parser.add_argument("--history-token-budget", type=int,
+                        help="Bounded-history mode: token budget for summary + verbatim turns")
+    parser.add_argument("--no-early-stop", action="store_true",
+                        help="Always run max_turns (disable interview-completion detection)")
+    parser.add_argument("--construct-mode", choices=CONSTRUCT_MODES, default="sequential",
+                        help="PACA construct extraction: sequential questions, concurrent questions against a "
+                             "frozen snapshot, or one structured JSON answer")
+    args = parser.parse_args()
+
+    if args.llm_cache:
+        configure_llm_cache(args.llm_cache)
+    configure_connection_pool(args.max_connections)
+    for limits in args.rate_limit:
+        configure_rate_limits(limits)
+    if args.max_concurrent_calls:
+        set_max_concurrent_calls(args.max_concurrent_calls)
+
+    runs = list(args.run)
+    if args.matrix:
+        runs.extend(load_matrix(args.matrix))
+    if not runs:
+        parser.error("No runs given. Use --run and/or --matrix.")
+
+    checkpoint_store = None
+    if args.checkpoint == "local":
+        checkpoint_store = LocalCheckpointStore(args.checkpoint_dir)
+    elif args.checkpoint == "firebase":
+        checkpoint_store = FirebaseCheckpointStore(get_firebase_ref())
+
+    results = run_batch(runs, workers=args.workers, max_turns=args.max_turns, overwrite=args.overwrite,
+                        history_turns=args.history_turns, history_token_budget=args.history_token_budget,
+                        early_stop=not args.no_early_stop, construct_mode=args.construct_mode,
+                        resume=args.resume, flush_every=args.flush_every,
+                        checkpoint_store=checkpoint_store, checkpoint_every=args.checkpoint_every)
+
+    failed = {run: r for run, r in results.items() if r["status"] == "failed"}
+    for run, r in failed.items():
+        print(f"\nFAILED client={run[0]} variant={run[1]} exp={run[2]}\n{r['traceback']}")
+    for key, counts in sorted(scheduler.stats().items()):
+        if counts.get("retries") or counts.get("rate_limited") or counts.get("failed") or counts.get("circuit_opened"):
+            print(f"LLM {key}: " + ", ".join(f"{name}={value}" for name, value in counts.items()))
+    print(f"\nDone: {sum(r['status'] == 'done' for r in results.values())}, "
+          f"skipped: {sum(r['status'] == 'skipped' for r in results.values())}, failed: {len(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+"""
+Simulation Checkpoints
+진행 중인 SP ↔ PACA 시뮬레이션의 전체 상태 저장 및 정확한 재개
+
+simulate_conversation keeps its state in a generator and in closures over both
+InMemoryChatMessageHistory objects. A checkpoint is a plain JSON-serializable dict
+of everything needed to rebuild that state:
+
+- the turns so far (greeting included) and whose turn is next
+- both memories, message by message
+- the SP recall-failure state (current_prob, is_mode_on) and its RNG state
+- the rolling-summary state of both history windows (bounded-history mode)
+
+It is stored either as a local JSON file or in Firebase next to the conversation log.
+The Firebase store sends only the turns / memory messages added since its previous save
+plus the fixed-size state, so a checkpoint per turn stays O(1) per turn:
+
+    store = LocalCheckpointStore("data/checkpoints")   # or FirebaseCheckpointStore(firebase_ref)
+    store.save(capture_checkpoint(client_number, exp_number, turns, paca_agent, paca_memory,
+                                  sp_agent, sp_memory))
+    ...
+    checkpoint = store.load(client_number, exp_number)
+    for speaker, message in resume_from_checkpoint(checkpoint, paca_agent, paca_memory,
+                                                   sp_agent, sp_memory, max_turns=300):
+        ...
+
+Agents are recreated as usual (create_conversational_agent / create_paca_agent) and
+the checkpoint is restored into them, so the continued run makes the same decisions
+the uninterrupted run would have made.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from conversation_log import Turn, resume_conversation
+from firebase_utils import firebase_data_key, load_from_firebase, save_many_to_firebase
+
+CHECKPOINT_FORMAT_VERSION = 1
+DEFAULT_CHECKPOINT_DIR = "data/checkpoints"
+
+# Checkpoint fields that only grow during a run (written incrementally by FirebaseCheckpointStore)
+APPEND_ONLY_FIELDS = ('turns', 'paca_memory', 'sp_memory')
+
+
+def checkpoint_type(client_number, exp_number) -> str:
+    """data_type of an experiment's checkpoint (see firebase_utils.save_to_firebase)."""
+    return f"simulation_checkpoint_{client_number}_{exp_number}"
+
+
+# ================================
+# (De)serialization helpers
+# ================================
+def serialize_messages(memory) -> List[Dict[str, str]]:
+    return [{'type': message.type, 'content': message.content} for message in memory.messages]
+
+
+def restore_messages(memory, messages: Sequence[Dict[str, str]]):
+    memory.clear()
+    for message in messages or []:
+        if message.get('type') == 'human':
+            memory.add_user_message(message.get('content', ''))
+        else:
+            memory.add_ai_message(message.get('content', ''))
+
+
+def serialize_rng_state(state) -> Dict[str, Any]:
+    """random.Random.getstate() -> JSON (the tuple of 625 ints becomes a list)."""
+    version, internal, gauss_next = state
+    return {'version': version, 'internal': list(internal), 'gauss_next': gauss_next}
+
+
+def deserialize_rng_state(data: Optional[Dict[str, Any]]):
+    if not data:
+        return None
+    return data['version'], tuple(int(v) for v in data['internal']), data.get('gauss_next')
+
+
+def _window_state(agent) -> Optional[Dict[str, Any]]:
+    window = getattr(agent, 'history_window', None)
+    if window is None:
+        return None
+    return {'summary': window.summary, 'folded': window.folded}
+
+
+def _restore_window(agent, state: Optional[Dict[str, Any]]):
+    window = getattr(agent, 'history_window', None)
+    if window is None:
+        return
+    window.reset()
+    if state:
+        window.summary = state.get('summary', '')
+        window.folded = int(state.get('folded', 0))
+
+
+# ================================
+# Capture / restore
+# ================================
+def capture_checkpoint(client_number, exp_number, turns: Sequence[Turn], paca_agent, paca_memory,
+                       sp_agent, sp_memory, variant: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Snapshot of a running simulation after `turns` (greeting included).
+    Take it between turns, i.e. after a turn has been yielded and before the next one is requested.
+    """
+    recall_state = sp_agent.recall_failure.get_state()
+    return {
+        'format_version': CHECKPOINT_FORMAT_VERSION,
+        'client_number': str(client_number),
+        'exp_number': str(exp_number),
+        'variant': variant,
+        'timestamp': int(time.time()),
+        'turns': [{'speaker': speaker, 'message': message} for speaker, message in turns],
+        'next_speaker': "PACA" if turns and turns[-1][0] == "SP" else "SP",
+        'paca_memory': serialize_messages(paca_memory),
+        'sp_memory': serialize_messages(sp_memory),
+        'sp_recall_failure': {
+            'current_prob': recall_state['current_prob'],
+            'is_mode_on': recall_state['is_mode_on'],
+        },
+        'rng_state': serialize_rng_state(recall_state['rng_state']),
+        'paca_history_window': _window_state(paca_agent),
+        'sp_history_window': _window_state(sp_agent),
+    }
+
+
+def checkpoint_turns(checkpoint: Dict[str, Any]) -> List[Turn]:
+    return [(entry.get('speaker'), entry.get('message')) for entry in checkpoint.get('turns') or []]
+
+
+def restore_checkpoint(checkpoint: Dict[str, Any], paca_agent, paca_memory, sp_agent, sp_memory):
+    """Load a checkpoint's memories, recall-failure / RNG state and history windows into fresh agents."""
+    version = checkpoint.get('format_version')
+    if version != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format version: {version}")
+
+    restore_messages(paca_memory, checkpoint.get('paca_memory'))
+    restore_messages(sp_memory, checkpoint.get('sp_memory'))
+    recall_state = checkpoint['sp_recall_failure']
+    sp_agent.recall_failure.set_state({
+        'current_prob': recall_state['current_prob'],
+        'is_mode_on': bool(recall_state.get('is_mode_on', False)),
+        'rng_state': deserialize_rng_state(checkpoint.get('rng_state')),
+    })
+    _restore_window(paca_agent, checkpoint.get('paca_history_window'))
+    _restore_window(sp_agent, checkpoint.get('sp_history_window'))
+
+
+def resume_from_checkpoint(checkpoint: Dict[str, Any], paca_agent, paca_memory, sp_agent, sp_memory,
+                           max_turns: int = 300, termination_detector=None):
+    """Restore the checkpoint into the agents and yield the turns after it (as resume_conversation)."""
+    restore_checkpoint(checkpoint, paca_agent, paca_memory, sp_agent, sp_memory)
+    yield from resume_conversation(paca_agent, sp_agent, checkpoint_turns(checkpoint), max_turns=max_turns,
+                                   termination_detector=termination_detector)
+
+
+# ================================
+# Storage
+# ================================
+class LocalCheckpointStore:
+    """Checkpoints as JSON files (<directory>/<client>_<exp>.json), replaced atomically."""
+
+    def __init__(self, directory: str = DEFAULT_CHECKPOINT_DIR):
+        self.directory = directory
+
+    def path(self, client_number, exp_number) -> str:
+        return os.path.join(self.directory, f"{client_number}_{exp_number}.json")
+
+    def save(self, checkpoint: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(checkpoint['client_number'], checkpoint['exp_number'])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, client_number, exp_number) -> Optional[Dict[str, Any]]:
+        path = self.path(client_number, exp_number)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def delete(self, client_number, exp_number):
+        path = self.path(client_number, exp_number)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class FirebaseCheckpointStore:
+    """
+    Checkpoints under clients_<c>_simulation_checkpoint_<c>_<exp>.
+
+    The first save of a run in this process set()s the whole checkpoint; later saves
+    are one update() with the entries appended to APPEND_ONLY_FIELDS since the previous
+    save (as <field>/<index> paths) and the remaining, fixed-size fields. If a list no
+    longer extends what was saved (e.g. memories were replaced), the whole checkpoint
+    is written again.
+    """
+
+    def __init__(self, firebase_ref):
+        self.firebase_ref = firebase_ref
+        self._saved: Dict[tuple, Dict[str, List[Any]]] = {}  # (client, exp) -> last saved APPEND_ONLY_FIELDS
+
+    def _delta(self, checkpoint: Dict[str, Any], saved: Optional[Dict[str, List[Any]]]) -> Optional[Dict[str, Any]]:
+        """{child path: value} relative to the checkpoint key, or None when a full write is needed."""
+        if saved is None:
+            return None
+        updates = {field: value for field, value in checkpoint.items() if field not in APPEND_ONLY_FIELDS}
+        for field in APPEND_ONLY_FIELDS:
+            entries, previous = checkpoint.get(field) or [], saved[field]
+            if len(entries) < len(previous) or entries[:len(previous)] != previous:
+                return None
+            updates.update({f"{field}/{i}": entries[i] for i in range(len(previous), len(entries))})
+        return updates
+
+    def save(self, checkpoint: Dict[str, Any]):
+        client_number, exp_number = checkpoint['client_number'], checkpoint['exp_number']
+        data_type = checkpoint_type(client_number, exp_number)
+        delta = self._delta(checkpoint, self._saved.get((client_number, exp_number)))
+        if delta is None:
+            saved = save_many_to_firebase(self.firebase_ref, client_number, [(data_type, checkpoint)])
+        else:
+            saved = save_many_to_firebase(self.firebase_ref, client_number, [], merge_items=[(data_type, delta)])
+        if saved:
+            self._saved[(client_number, exp_number)] = {field: list(checkpoint.get(field) or [])
+                                                        for field in APPEND_ONLY_FIELDS}
+        else:
+            # Unknown remote state: the next save writes the whole checkpoint
+            self._saved.pop((client_number, exp_number), None)
+
+    def load(self, client_number, exp_number) -> Optional[Dict[str, Any]]:
+        return load_from_firebase(self.firebase_ref, client_number, checkpoint_type(client_number, exp_number))
+
+    def delete(self, client_number, exp_number):
+        self._saved.pop((str(client_number), str(exp_number)), None)
+        if self.firebase_ref is not None:
+            self.firebase_ref.child(firebase_data_key(client_number, checkpoint_type(client_number, exp_number))).delete()
@@ -1,7 +1,7 @@
 import re
 import json
 from typing import Dict, Any, List
-from SP_utils import load_from_firebase
+from firebase_utils import load_from_firebase
 
 
 def load_form(form_path: str) -> Dict[str, Any]:
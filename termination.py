@@ -0,0 +1,190 @@
+"""
+Interview Termination Detection
+
+Ends a simulate_conversation generator once the interview has wrapped up, instead
+of running until max_turns while the agents exchange goodbyes.
+
+Checks are small callables taking the conversation so far ([(speaker, message), ...])
+and returning a detail string when the interview is over (None otherwise):
+- ClosingPhraseCheck: consecutive closing/farewell messages (PACA ends, SP says goodbye)
+- RepetitionCheck: both agents keep repeating (near-)identical turns
+- ClassifierCheck: a cheap LLM verdict on the last few turns, checked every few turns
+
+TerminationDetector runs the checks after every yielded turn and records why the
+conversation stopped, so it can be saved with conversation_log_*.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.prompts import PromptTemplate
+
+from llm_scheduler import scheduled_invoke
+
+Turn = Tuple[str, str]
+
+# Stop reasons saved in conversation_log_* ('manual' = stopped from the UI / by the caller)
+STOP_REASONS = ("closing_phrase", "repetition", "classifier", "max_turns", "manual")
+
+CLOSING_PHRASES = (
+    "면담을 마치", "면담은 여기까지", "면담을 마무리", "오늘은 여기까지", "진료를 마치",
+    "수고하셨습니다", "다음 진료", "다음에 뵙", "다음 주에 뵙", "안녕히 가세요", "안녕히 계세요",
+    "조심히 들어가", "goodbye", "good bye", "take care", "see you next", "end our session",
+    "that concludes", "conclude our interview",
+)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+class ClosingPhraseCheck:
+    """Stop after `min_matches` consecutive messages containing a closing phrase."""
+
+    name = "closing_phrase"
+
+    def __init__(self, phrases: Sequence[str] = CLOSING_PHRASES, min_matches: int = 2):
+        self.phrases = tuple(_normalize(p) for p in phrases)
+        self.min_matches = min_matches
+
+    def _matched_phrase(self, message: str) -> Optional[str]:
+        text = _normalize(message)
+        return next((p for p in self.phrases if p in text), None)
+
+    def __call__(self, conversation: Sequence[Turn]) -> Optional[str]:
+        matched = []
+        for _, message in reversed(conversation[-self.min_matches:]):
+            phrase = self._matched_phrase(message)
+            if phrase is None:
+                return None
+            matched.append(phrase)
+        if len(matched) < self.min_matches:
+            return None
+        return f"closing phrases in last {self.min_matches} messages: {', '.join(reversed(matched))}"
+
+
+class RepetitionCheck:
+    """Stop when the last `min_repeats` messages each near-duplicate that speaker's previous message."""
+
+    name = "repetition"
+
+    def __init__(self, min_repeats: int = 4, similarity: float = 0.9):
+        self.min_repeats = min_repeats
+        self.similarity = similarity
+
+    def __call__(self, conversation: Sequence[Turn]) -> Optional[str]:
+        if len(conversation) < self.min_repeats + 2:
+            return None
+        for i in range(len(conversation) - self.min_repeats, len(conversation)):
+            current, previous = _normalize(conversation[i][1]), _normalize(conversation[i - 2][1])
+            if SequenceMatcher(None, current, previous).ratio() < self.similarity:
+                return None
+        return f"last {self.min_repeats} messages repeat the speaker's previous turn"
+
+
+classifier_prompt = """Below are the last turns of a psychiatric interview between a psychiatrist (PACA) and a patient (SP).
+Has the psychiatrist finished the interview, so that the remaining turns are only closing remarks or small talk?
+Answer with exactly one word: YES or NO.
+
+{conversation}
+
+Answer:"""
+
+
+class ClassifierCheck:
+    """Ask a cheap LLM every `check_every` turns whether the interview is over."""
+
+    name = "classifier"
+
+    def __init__(self, llm, check_every: int = 10, context_turns: int = 6, min_turns: int = 20):
+        self.llm = llm
+        self.chain = PromptTemplate.from_template(classifier_prompt) | llm
+        self.check_every = check_every
+        self.context_turns = context_turns
+        self.min_turns = min_turns
+
+    def __call__(self, conversation: Sequence[Turn]) -> Optional[str]:
+        if len(conversation) < self.min_turns or len(conversation) % self.check_every:
+            return None
+        recent = "\n".join(f"{speaker}: {message}" for speaker, message in conversation[-self.context_turns:])
+        verdict = str(scheduled_invoke(self.chain, {"conversation": recent}, llm=self.llm).content).strip().upper()
+        if verdict.startswith("YES"):
+            return f"classifier judged the interview finished after {len(conversation)} messages"
+        return None
+
+
+class TerminationDetector:
+    """
+    Runs termination checks after every turn and remembers why the conversation stopped.
+
+    Usage:
+        detector = default_termination_detector()
+        for speaker, message in simulate_conversation(paca_agent, sp_agent, termination_detector=detector):
+            ...
+        conversation_content.update(detector.log_fields())
+    """
+
+    def __init__(self, *checks: Callable[[Sequence[Turn]], Optional[str]]):
+        self.checks = list(checks)
+        self.reset()
+
+    def reset(self):
+        self.conversation: List[Turn] = []
+        self.stop_reason: Optional[str] = None
+        self.stop_detail: Optional[str] = None
+
+    def check(self, conversation: Sequence[Turn]) -> bool:
+        for check in self.checks:
+            detail = check(conversation)
+            if detail:
+                self.stop_reason = getattr(check, "name", type(check).__name__)
+                self.stop_detail = detail
+                return True
+        return False
+
+    def watch(self, turns, history: Sequence[Turn] = ()):
+        """
+        Pass turns through until a check fires; closing `turns` stops further LLM calls.
+        history: earlier turns of a resumed conversation (checked together with the new ones)
+        """
+        self.reset()
+        self.conversation.extend(history)
+        try:
+            for turn in turns:
+                self.conversation.append(turn)
+                yield turn
+                if self.check(self.conversation):
+                    return
+            self.stop_reason = "max_turns"
+        finally:
+            turns.close()
+
+    async def awatch(self, turns, history: Sequence[Turn] = ()):
+        """Async twin of watch for simulate_conversation_async."""
+        self.reset()
+        self.conversation.extend(history)
+        try:
+            async for turn in turns:
+                self.conversation.append(turn)
+                yield turn
+                if self.check(self.conversation):
+                    return
+            self.stop_reason = "max_turns"
+        finally:
+            await turns.aclose()
+
+    def log_fields(self) -> dict:
+        """Fields merged into conversation_log_* (no recorded reason means it was stopped manually)."""
+        return {
+            'stop_reason': self.stop_reason or "manual",
+            'stop_detail': self.stop_detail or "",
+        }
+
+
+def default_termination_detector(classifier_llm=None) -> TerminationDetector:
+    """Closing phrases + repetition; the LLM classifier is added only when an llm is given."""
+    checks = [ClosingPhraseCheck(), RepetitionCheck()]
+    if classifier_llm is not None:
+        checks.append(ClassifierCheck(classifier_llm))
+    return TerminationDetector(*checks)
@@ -0,0 +1,132 @@
+"""
+Test: vectorized agreement statistics match the former loop implementations
+agreement_stats vs. the SP Qualitative page's coincidence-matrix loop (Krippendorff's alpha)
+and pairwise sklearn cohen_kappa_score (weighted kappa), on random Likert ratings with gaps
+"""
+
+import warnings
+from itertools import combinations
+
+import numpy as np
+from sklearn.metrics import cohen_kappa_score
+
+from agreement_stats import (krippendorff_alpha_bootstrap, krippendorff_alpha_ordinal,
+                             mean_pairwise_weighted_kappa, weighted_kappa_bootstrap)
+
+LEVELS = [1, 2, 3, 4, 5]
+
+
+def random_ratings(seed, n_coders=4, n_cases=12, n_items=9, missing=0.25):
+    """(coders, cases, items) Likert ratings, NaN where missing; some coders skip whole cases."""
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(1, 6, size=(1, n_cases, n_items))
+    noise = rng.integers(-1, 2, size=(n_coders, n_cases, n_items))
+    ratings = np.clip(truth + noise, 1, 5).astype(float)
+    ratings[rng.random(ratings.shape) < missing] = np.nan
+    ratings[rng.random((n_coders, n_cases)) < 0.15] = np.nan
+    return ratings
+
+
+def reference_alpha(matrix):
+    """The page's former per-unit loop (5-point Likert)."""
+    matrix = np.asarray(matrix, dtype=float)
+    matrix = matrix[np.sum(~np.isnan(matrix), axis=1) >= 2]
+    if len(matrix) < 2:
+        return None
+
+    coincidence_matrix = np.zeros((5, 5))
+    for row in matrix:
+        valid = row[~np.isnan(row)]
+        m_u = len(valid)
+        for c in range(m_u):
+            for k in range(m_u):
+                if c != k:
+                    coincidence_matrix[int(valid[c]) - 1, int(valid[k]) - 1] += 1.0 / (m_u - 1)
+
+    n_total = np.sum(coincidence_matrix)
+    if n_total == 0:
+        return None
+    delta = np.zeros((5, 5))
+    for c in range(5):
+        for k in range(5):
+            delta[c, k] = sum((LEVELS[g] - LEVELS[g - 1]) ** 2 for g in range(min(c, k) + 1, max(c, k) + 1))
+    delta = delta / np.max(delta)
+
+    d_o = sum(coincidence_matrix[c, k] * delta[c, k] for c in range(5) for k in range(5)) / n_total
+    n_c = np.sum(coincidence_matrix, axis=1)
+    d_e = sum(n_c[c] * n_c[k] * delta[c, k] for c in range(5) for k in range(5)) / (n_total * (n_total - 1))
+    if d_e == 0:
+        return None
+    return 1 - d_o / d_e
+
+
+def reference_kappa(ratings):
+    """The page's former pairwise cohen_kappa_score loop over coder pairs × items."""
+    kappa_scores = []
+    for first, second in combinations(range(ratings.shape[0]), 2):
+        for item in range(ratings.shape[2]):
+            a, b = ratings[first, :, item], ratings[second, :, item]
+            both = ~np.isnan(a) & ~np.isnan(b)
+            if both.sum() < 2:
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                kappa = cohen_kappa_score(a[both], b[both], labels=LEVELS, weights='quadratic')
+            if not np.isnan(kappa):
+                kappa_scores.append(kappa)
+    if not kappa_scores:
+        return None
+    return {'mean': np.mean(kappa_scores), 'std': np.std(kappa_scores), 'n': len(kappa_scores)}
+
+
+def units_by_coders(ratings):
+    """(coders, cases, items) -> (cases*items, coders) reliability matrix."""
+    return ratings.transpose(1, 2, 0).reshape(-1, ratings.shape[0])
+
+
+def test_alpha_matches_reference():
+    for seed in range(20):
+        matrix = units_by_coders(random_ratings(seed, n_coders=2 + seed % 4))
+        expected = reference_alpha(matrix)
+        actual = krippendorff_alpha_ordinal(matrix)
+        assert expected is not None and actual is not None
+        assert abs(actual - expected) < 1e-12, (seed, actual, expected)
+
+
+def test_kappa_matches_cohen_kappa_score():
+    for seed in range(20):
+        ratings = random_ratings(seed, n_coders=2 + seed % 4)
+        expected = reference_kappa(ratings)
+        actual = mean_pairwise_weighted_kappa(ratings)
+        assert actual['n'] == expected['n'], seed
+        assert abs(actual['mean'] - expected['mean']) < 1e-12, (seed, actual, expected)
+        assert abs(actual['std'] - expected['std']) < 1e-12, (seed, actual, expected)
+
+
+def test_undefined_cases_return_none():
+    single_unit = np.array([[1.0, 2.0, np.nan]])
+    assert krippendorff_alpha_ordinal(single_unit) is None
+    assert reference_alpha(single_unit) is None
+
+    all_same = np.full((6, 3), 3.0)  # no expected disagreement
+    assert krippendorff_alpha_ordinal(all_same) is None
+    assert reference_alpha(all_same) is None
+
+    one_coder = random_ratings(0, n_coders=1)
+    assert mean_pairwise_weighted_kappa(one_coder) is None
+    assert weighted_kappa_bootstrap(one_coder) is None
+
+
+def test_bootstrap_ci_is_deterministic_for_a_seed():
+    ratings = random_ratings(7)
+    matrix = units_by_coders(ratings)
+
+    alpha_ci = krippendorff_alpha_bootstrap(matrix, n_boot=500, seed=42)
+    assert alpha_ci == krippendorff_alpha_bootstrap(matrix, n_boot=500, seed=42)
+    assert alpha_ci != krippendorff_alpha_bootstrap(matrix, n_boot=500, seed=43)
+    assert alpha_ci[0] <= krippendorff_alpha_ordinal(matrix) <= alpha_ci[1]
+
+    kappa_ci = weighted_kappa_bootstrap(ratings, n_boot=500, seed=42)
+    assert kappa_ci == weighted_kappa_bootstrap(ratings, n_boot=500, seed=42)
+    assert kappa_ci != weighted_kappa_bootstrap(ratings, n_boot=500, seed=43)
+    assert kappa_ci[0] <= mean_pairwise_weighted_kappa(ratings)['mean'] <= kappa_ci[1]
@@ -0,0 +1,149 @@
+"""
+Test: batch re-evaluation scores match the evaluation page
+batch_evaluator (vectorized, all experiments at once) vs. evaluator.evaluate_construct /
+evaluate_constructs (one field / one experiment at a time)
+
+G-Eval is replaced by a deterministic function of (field, SP text, PACA text), so only the
+rubric lookup, the impulsivity / behavior / binary rules and the weighting are compared.
+"""
+
+import os
+import random
+
+os.environ['OPENAI_API_KEY'] = 'dummy-key-for-testing'
+
+import batch_evaluator
+import evaluator
+from evaluator import PSYCHE_RUBRIC, evaluate_construct, evaluate_constructs
+
+SPELLINGS = [str, str.upper, str.title, lambda v: v + ".", lambda v: f"  {v}! "]
+BINARY_VALUES = ["yes", "No", "(+)", "(-)", "presence", "absence", "true", "False", "+", "-", "N/A", "unclear"]
+LENGTHS = ["12", "24", "-3", "6 months", ""]
+
+
+def fake_g_eval(field_name, sp_text, paca_text):
+    return (len(field_name) + len(str(sp_text)) * 3 + len(str(paca_text)) * 7) % 5 / 4
+
+
+def fake_g_eval_many(items, max_concurrency=None, use_cache=True):
+    return [fake_g_eval(*item) for item in items]
+
+
+def fake_g_eval_concurrent(pairs, max_concurrency=None, use_cache=True):
+    return {field_name: fake_g_eval(field_name, *pair) for field_name, pair in pairs.items()}
+
+
+def random_value(rng, field_name):
+    rubric_entry = PSYCHE_RUBRIC[field_name]
+    if rubric_entry.get("values"):
+        choices = list(rubric_entry["values"]) + ["unknown", "N/A"]
+        values = rng.sample(choices, rng.choice([1, 1, 1, 2, 3]))
+        return ", ".join(rng.choice(SPELLINGS)(value) for value in values)
+    if rubric_entry.get("type") == "binary":
+        return rng.choice(BINARY_VALUES)
+    return rng.choice(["", "None", "Work stress", "Low mood", "가족 갈등", "Lives with husband and two children"])
+
+
+def random_construct(rng):
+    """A construct in the generators' layout with random field values."""
+    def value(field_name):
+        return random_value(rng, field_name)
+
+    return {
+        "Chief complaint": {"description": value("Chief complaint")},
+        "Present illness": {
+            f"symptom_{n}": {"name": value("Symptom name"), "alleviating factor": value("Alleviating factor"),
+                             "exacerbating factor": value("Exacerbating factor"), "length": rng.choice(LENGTHS)}
+            for n in range(1, rng.randint(1, 3) + 1)
+        } | {"triggering_factor": value("Triggering factor"), "stressor": value("Stressor")},
+        "Family history": {"diagnosis_1": value("Diagnosis"), "substance_use_1": value("Substance use")},
+        "Marriage_Relationship History": {"current family structure": value("Current family structure")},
+        "Impulsivity": {field_name: value(field_name) for field_name in
+                        ["Suicidal ideation", "Self mutilating behavior risk", "Homicide risk",
+                         "Suicidal plan", "Suicidal attempt"] if rng.random() > 0.1},
+        "Mental Status Examination": {field_name: value(field_name) for field_name in
+                                      ["Mood", "Verbal productivity", "Insight", "Affect", "Perception",
+                                       "Thought process", "Thought content", "Spontaneity", "Social judgement",
+                                       "Reliability"] if rng.random() > 0.1},
+    }
+
+
+def experiment_constructs(exports, seed=0, n_random=25):
+    """Bundled export constructs paired with each other, plus random SP / PACA pairs."""
+    bundled = [value for key, value in exports.items() if "_profile_" in key or "_construct_" in key]
+    constructs = {("bundled", f"{i}_{j}"): (sp, paca)
+                  for i, sp in enumerate(bundled) for j, paca in enumerate(bundled)}
+
+    rng = random.Random(seed)
+    for n in range(n_random):
+        constructs[("random", str(n))] = (random_construct(rng), random_construct(rng))
+    return constructs
+
+
+def batch_scores(constructs):
+    original = batch_evaluator.g_eval_many
+    batch_evaluator.g_eval_many = fake_g_eval_many
+    try:
+        scored = batch_evaluator.score_field_frame(batch_evaluator.build_field_frame(constructs))
+    finally:
+        batch_evaluator.g_eval_many = original
+    return scored, batch_evaluator.evaluation_records(scored)
+
+
+def test_batch_scores_match_evaluate_construct_per_row(bundled_exports):
+    constructs = experiment_constructs(bundled_exports)
+    scored, _ = batch_scores(constructs)
+    assert len(scored) == len(constructs) * len(PSYCHE_RUBRIC)
+
+    for row in scored.itertuples(index=False):
+        g_eval_score = fake_g_eval(row.field, row.sp_value, row.paca_value) if row.type == "g-eval" else None
+        score, _, weight = evaluate_construct(row.field, row.sp_value, row.paca_value, g_eval_score=g_eval_score)
+        assert abs(row.score - score) < 1e-12, (row.field, row.sp_value, row.paca_value, row.score, score)
+        assert row.weight == weight
+
+
+def test_records_match_evaluate_constructs(bundled_exports):
+    constructs = experiment_constructs(bundled_exports, seed=1, n_random=10)
+    _, records = batch_scores(constructs)
+
+    original = evaluator.g_eval_concurrent
+    evaluator.g_eval_concurrent = fake_g_eval_concurrent
+    try:
+        for exp, (sp_construct, paca_construct) in constructs.items():
+            _, _, weighted_score, detailed = evaluate_constructs(sp_construct, paca_construct)
+            record = records[exp]
+            assert set(record) - {'psyche_score'} == set(detailed), exp
+            assert abs(record['psyche_score'] - weighted_score) < 1e-9, exp
+            for field_name, result in detailed.items():
+                assert abs(record[field_name]['score'] - result['score']) < 1e-12, (exp, field_name)
+                assert record[field_name]['weight'] == result['weight']
+    finally:
+        evaluator.g_eval_concurrent = original
+
+
+def test_zero_weight_fields_are_left_out(bundled_exports):
+    constructs = experiment_constructs(bundled_exports, seed=2, n_random=5)
+    dropped = ["Mood", "Chief complaint", "Suicidal plan"]
+    saved = {field_name: dict(PSYCHE_RUBRIC[field_name]) for field_name in dropped}
+    original = evaluator.g_eval_concurrent
+    evaluator.g_eval_concurrent = fake_g_eval_concurrent
+    try:
+        for field_name in dropped:
+            PSYCHE_RUBRIC[field_name]['weight'] = 0
+        scored, records = batch_scores(constructs)
+        assert not scored['field'].isin(dropped).any()
+
+        for exp, (sp_construct, paca_construct) in constructs.items():
+            _, _, weighted_score, detailed = evaluate_constructs(sp_construct, paca_construct)
+            assert set(records[exp]) - {'psyche_score'} == set(detailed)
+            assert abs(records[exp]['psyche_score'] - weighted_score) < 1e-9
+
+        # Stored results that still carry the dropped fields report no phantom changes
+        stale_fields = {field_name: {'score': 1.0} for field_name in dropped}
+        stored = {f"result_{exp[0]}_{exp[1]}": {**records[exp], **stale_fields} for exp in records}
+        result_keys = {exp: [f"result_{exp[0]}_{exp[1]}"] for exp in records}
+        assert batch_evaluator.diff_scores(records, result_keys, stored).empty
+    finally:
+        evaluator.g_eval_concurrent = original
+        for field_name, rubric_entry in saved.items():
+            PSYCHE_RUBRIC[field_name].update(rubric_entry)
@@ -0,0 +1,140 @@
+"""
+Test: ConstructIndex lookups are identical to the former per-field scans
+get_value_from_construct (index-based) vs. the original flatten-and-search implementation,
+for every rubric field on the constructs in the bundled Firebase export JSONs
+"""
+
+import os
+
+os.environ['OPENAI_API_KEY'] = 'dummy-key-for-testing'
+
+from evaluator import PSYCHE_RUBRIC, ConstructIndex, flatten_construct, get_value_from_construct
+
+EXTRA_FIELDS = ["triggering factor", "Triggering_Factor", "stressor", "Present illness", "mood", "presence",
+                "Developmental_Social history", "school history", "name", "not a field"]
+
+
+# ORIGINAL implementation (before ConstructIndex)
+def get_family_history_field_value_ORIGINAL(construct, field_type):
+    family_history = construct.get('Family history', {})
+    if not family_history:
+        return None
+    values = []
+    key_prefix = 'diagnosis_' if field_type.lower() == 'diagnosis' else 'substance_use_'
+    for key in sorted(family_history.keys()):
+        if key.startswith(key_prefix):
+            value = family_history[key]
+            if value and str(value).strip() and str(value).lower() not in ['none', 'n/a', 'null']:
+                values.append(str(value))
+    legacy_key = 'diagnosis' if field_type.lower() == 'diagnosis' else 'substance use'
+    if legacy_key in family_history:
+        val = family_history[legacy_key]
+        if val and str(val).strip() and str(val).lower() not in ['none', 'n/a', 'null']:
+            if str(val) not in values:
+                values.append(str(val))
+    if not values:
+        return None
+    return '\n'.join(f"- {val}" for val in values)
+
+
+def get_symptom_field_value_ORIGINAL(construct, field_name):
+    present_illness = construct.get('Present illness', {})
+    if not present_illness:
+        return None
+    symptom_values = []
+    field_map = {'symptom name': 'name', 'alleviating factor': 'alleviating factor',
+                 'exacerbating factor': 'exacerbating factor', 'length': 'length'}
+    for key in sorted(present_illness.keys()):
+        if key.startswith('symptom_'):
+            symptom_data = present_illness[key]
+            if isinstance(symptom_data, dict):
+                actual_key = field_map.get(field_name.lower())
+                if actual_key and actual_key in symptom_data:
+                    value = symptom_data[actual_key]
+                    if value:
+                        symptom_values.append(str(value))
+    if not symptom_values:
+        return None
+    if field_name.lower() == 'length':
+        try:
+            lengths = [int(v) for v in symptom_values if v.replace('-', '').isdigit()]
+            if lengths:
+                return str(max(lengths))
+        except Exception:
+            pass
+        return None
+    return '\n'.join(f"- {val}" for val in symptom_values)
+
+
+def get_value_from_construct_ORIGINAL(construct, field_name):
+    if construct is None:
+        return None
+    if field_name.lower() in ['symptom name', 'alleviating factor', 'exacerbating factor', 'length']:
+        return get_symptom_field_value_ORIGINAL(construct, field_name)
+    if field_name.lower() == 'diagnosis':
+        return get_family_history_field_value_ORIGINAL(construct, 'diagnosis')
+    if field_name.lower() == 'substance use':
+        return get_family_history_field_value_ORIGINAL(construct, 'substance use')
+
+    field_lower = field_name.lower()
+    for key, val in construct.items():
+        if key.lower() == field_lower:
+            return val
+    flat = flatten_construct(construct)
+    for key, val in flat.items():
+        if key.lower() == field_lower:
+            return val
+    field_normalized = field_lower.replace(' ', '_')
+    for key, val in flat.items():
+        last_part = key.split('.')[-1].lower()
+        if last_part == field_lower or last_part.replace(' ', '_') == field_normalized:
+            return val
+    return None
+
+
+def dict_nodes(value):
+    """Every dict in a JSON document (each nested section also looked up as a construct)."""
+    if isinstance(value, dict):
+        yield value
+        for child in value.values():
+            yield from dict_nodes(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from dict_nodes(child)
+
+
+def bundled_constructs(exports):
+    return [node for export in exports.values() for node in dict_nodes(export)]
+
+
+SYNTHETIC_CONSTRUCT = {
+    "chief Complaint": {"description": "Empty and exhausted"},
+    "Present illness": {
+        "symptom_2": {"name": "Anxiety", "alleviating factor": "", "length": "24"},
+        "symptom_1": {"name": "Low mood", "exacerbating factor": "Work stress", "length": "-3"},
+        "symptom_10": "not a dict",
+        "triggering_factor": "Overdose",
+        "Triggering factor": "shadowed",
+    },
+    "Family history": {"diagnosis_2": "MDD", "diagnosis_1": "N/A", "diagnosis": "MDD",
+                       "substance use": "Alcohol", "substance_use_1": "none"},
+    "Mental Status Examination": {"Mood": "depressed", "Affect": ["restricted", "blunt"], "Insight": None},
+}
+
+
+def test_bundled_constructs_are_loaded(bundled_exports):
+    assert len(bundled_constructs(bundled_exports)) >= 60
+
+
+def test_index_matches_original_lookup(bundled_exports):
+    fields = list(PSYCHE_RUBRIC) + EXTRA_FIELDS
+    for construct in bundled_constructs(bundled_exports) + [SYNTHETIC_CONSTRUCT]:
+        index = ConstructIndex(construct)
+        for field_name in fields:
+            expected = get_value_from_construct_ORIGINAL(construct, field_name)
+            assert get_value_from_construct(construct, field_name) == expected, field_name
+            assert get_value_from_construct(index, field_name) == expected, field_name
+
+
+def test_missing_construct():
+    assert get_value_from_construct(None, "Mood") is None
@@ -0,0 +1,287 @@
+"""
+Test: LLM scheduler rate limiting, retries, circuit breaker and priority lanes
+llm_scheduler.LLMScheduler driven by a fake clock / sleep and a fake provider that fails
+with 429 (optionally with Retry-After), 503 or 400, so every wait and delay is exact
+"""
+
+import asyncio
+import random
+
+from llm_scheduler import (INTERACTIVE, CircuitBreaker, LLMScheduler, LLMUnavailableError, RateLimit,
+                           RetryPolicy, TokenBucket, llm_priority)
+
+
+class FakeClock:
+    """Monotonic time that only moves when the scheduler sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+        await asyncio.sleep(0)  # let the other tasks run
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.response = Response({} if retry_after is None else {"retry-after": str(retry_after)})
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class FakeProvider:
+    """Fails with the queued errors in order, then answers "ok"; records the clock at each request."""
+
+    def __init__(self, clock, errors=()):
+        self.clock = clock
+        self.errors = list(errors)
+        self.requests = []
+
+    def __call__(self):
+        self.requests.append(self.clock())
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def acall(self):
+        return self()
+
+
+def make_scheduler(clock, seed=0, **kwargs):
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=8.0))
+    return LLMScheduler(clock=clock, sleep=clock.sleep, async_sleep=clock.async_sleep, rng=random.Random(seed),
+                        **kwargs)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(60, now=0.0)  # 1 per second, up to 60
+    assert bucket.wait_time(60, 0.0) == 0.0
+    bucket.consume(60, 0.0)
+    assert bucket.wait_time(1, 0.0) == 1.0
+    assert bucket.wait_time(1, 0.5) == 0.5
+    assert bucket.wait_time(1, 1.0) == 0.0
+    assert bucket.wait_time(500, 1.0) == 59.0  # a request larger than the bucket waits for a full bucket
+    bucket.consume(-100, 1.0)
+    assert bucket.level == 60  # given-back quota is capped at the capacity
+    bucket.consume(90, 1.0)
+    assert bucket.level == -30 and bucket.wait_time(10, 1.0) == 40.0  # debt is paid off first
+
+
+def test_request_bucket_paces_admission():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate_limits={"openai": RateLimit(requests_per_minute=60)})
+    provider = FakeProvider(clock)
+
+    async def run():
+        return [await scheduler.acall(provider.acall, "openai", "gpt") for _ in range(62)]
+
+    assert asyncio.run(run()) == ["ok"] * 62
+    # The first 60 requests use up the bucket, then one is admitted per second
+    assert provider.requests[:60] == [1000.0] * 60
+    assert provider.requests[60:] == [1001.0, 1002.0]
+    assert clock.sleeps == [1.0, 1.0]
+
+
+def test_token_bucket_reconciles_reported_usage():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate_limits={"openai": RateLimit(tokens_per_minute=6000)})
+
+    class Usage:
+        usage_metadata = {"total_tokens": 5000}
+
+    scheduler.call(Usage, "openai", "gpt", tokens=100)
+    # 100 prompt + 300 assumed output tokens reserved, corrected to the 5000 reported
+    assert scheduler._lanes[("openai", "gpt")].tokens.level == 1000
+
+
+def test_jittered_backoff():
+    policy = RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=8.0)
+    for attempt in range(6):
+        cap = min(8.0, 2.0 ** attempt)
+        delays = [policy.delay(attempt, rng=random.Random(seed)) for seed in range(50)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert len(set(delays)) == 50  # jittered, not a fixed schedule
+        assert delays[0] == random.Random(0).uniform(0, cap)
+    assert policy.delay(0, retry_after=5.0, rng=random.Random(0)) == 5.0  # Retry-After is the lower bound
+
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, seed=7)
+    provider = FakeProvider(clock, [ServiceUnavailable(), ServiceUnavailable(), ServiceUnavailable()])
+    assert scheduler.call(provider, "openai", "gpt") == "ok"
+    rng = random.Random(7)
+    assert clock.sleeps == [rng.uniform(0, 1.0), rng.uniform(0, 2.0), rng.uniform(0, 4.0)]
+    assert scheduler.stats()["openai:gpt"] == {"calls": 4, "retries": 3, "rate_limited": 0, "failed": 0}
+
+
+def test_retry_after_pauses_the_lane():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, retry=RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.01))
+    provider = FakeProvider(clock, [RateLimitError(retry_after=7), RateLimitError(retry_after=3)])
+
+    # While the caller backs off, any other caller of the lane would wait out the same pause
+    lane_waits = []
+
+    def sleep(seconds):
+        lane_waits.append((scheduler._lanes[("openai", "gpt")].wait_time(300, clock.now),
+                           scheduler._lane("openai", "other-model").wait_time(300, clock.now)))
+        clock.sleep(seconds)
+
+    scheduler.sleep = sleep
+    assert scheduler.call(provider, "openai", "gpt") == "ok"
+    assert clock.sleeps == [7.0, 3.0]
+    assert lane_waits == [(7.0, 0.0), (3.0, 0.0)]
+    assert provider.requests == [1000.0, 1007.0, 1010.0]
+
+    lane = scheduler._lanes[("openai", "gpt")]
+    assert lane.paused_until == 1010.0
+    assert lane.stats == {"calls": 3, "retries": 2, "rate_limited": 2, "failed": 0}
+    # Rate limits pause the lane but never count against the provider's circuit
+    assert scheduler._breakers["openai"].failures == 0
+
+    # retry-after-ms takes precedence; the async path sleeps with async_sleep
+    clock.sleeps.clear()
+    error = RateLimitError(retry_after=9)
+    error.response.headers["retry-after-ms"] = "2500"
+    provider = FakeProvider(clock, [error])
+    assert asyncio.run(scheduler.acall(provider.acall, "openai", "gpt")) == "ok"
+    assert clock.sleeps == [2.5] and provider.requests == [1010.0, 1012.5]
+
+
+def test_retries_exhausted_raise_llm_unavailable():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    provider = FakeProvider(clock, [RateLimitError(retry_after=2) for _ in range(10)])
+    try:
+        scheduler.call(provider, "openai", "gpt")
+        raise AssertionError("no LLMUnavailableError")
+    except LLMUnavailableError as e:
+        assert isinstance(e.__cause__, RateLimitError)
+        assert "after 4 attempts" in str(e)
+    assert len(provider.requests) == 4 and len(clock.sleeps) == 3  # no sleep after the last attempt
+    assert scheduler.stats()["openai:gpt"] == {"calls": 4, "retries": 3, "rate_limited": 4, "failed": 1}
+    assert not scheduler._lanes[("openai", "gpt")].in_flight
+
+    async def run():
+        return await scheduler.acall(FakeProvider(clock, [ServiceUnavailable()] * 10).acall, "openai", "gpt")
+
+    try:
+        asyncio.run(run())
+        raise AssertionError("no LLMUnavailableError")
+    except LLMUnavailableError as e:
+        assert isinstance(e.__cause__, ServiceUnavailable)
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    provider = FakeProvider(clock, [BadRequest()])
+    try:
+        scheduler.call(provider, "openai", "gpt")
+        raise AssertionError("no BadRequest")
+    except BadRequest:
+        pass
+    assert len(provider.requests) == 1 and clock.sleeps == []
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10.0, max_cooldown=25.0)
+    breaker.record_failure(0.0)
+    assert breaker.wait_time(0.0) == 0.0
+    breaker.record_failure(1.0)
+    assert breaker.wait_time(1.0) == 10.0 and breaker.wait_time(11.0) == 0.0
+    breaker.on_admit()
+    assert breaker.wait_time(11.0) is None  # one probe at a time
+    breaker.record_failure(12.0)
+    assert breaker.cooldown == 20.0 and breaker.wait_time(12.0) == 20.0  # failed probe doubles the cooldown
+    breaker.on_admit()
+    breaker.record_failure(32.0)
+    assert breaker.cooldown == 25.0  # capped
+    breaker.on_admit()
+    breaker.record_success()
+    assert breaker.wait_time(57.0) == 0.0 and breaker.cooldown == 10.0 and breaker.opened == 1
+
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, failure_threshold=3, cooldown=30.0,
+                               retry=RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=0.5))
+    down = FakeProvider(clock, [ServiceUnavailable()] * 3)
+    try:
+        scheduler.call(down, "anthropic", "claude")
+        raise AssertionError("no LLMUnavailableError")
+    except LLMUnavailableError:
+        pass
+    breaker = scheduler._breakers["anthropic"]
+    opened_at = clock.now
+    assert breaker.opened_at == opened_at and scheduler.stats()["anthropic"]["circuit_opened"] == 1
+
+    # Every model of the provider waits for the cooldown, then one probe closes the circuit
+    probe = FakeProvider(clock)
+    assert asyncio.run(scheduler.acall(probe.acall, "anthropic", "other-model")) == "ok"
+    assert probe.requests == [opened_at + 30.0]
+    assert breaker.opened_at is None and breaker.failures == 0
+
+
+def test_admission_timeout():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate_limits={"openai": RateLimit(requests_per_minute=1)}, max_wait=5.0)
+    scheduler.call(FakeProvider(clock), "openai", "gpt")
+    try:
+        asyncio.run(scheduler.acall(FakeProvider(clock).acall, "openai", "gpt"))
+        raise AssertionError("no LLMUnavailableError")
+    except LLMUnavailableError as e:
+        assert "no capacity within 5s" in str(e)
+    assert clock.sleeps == [1.0] * 5
+    assert not scheduler._lanes[("openai", "gpt")].waiting
+
+
+def test_interactive_calls_are_admitted_before_batch():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate_limits={"ollama": RateLimit(max_concurrent=1)})
+    order = []
+
+    async def request(tag, lane, gate=None):
+        async def fn():
+            if gate is not None:
+                await gate.wait()
+            order.append(tag)
+            return tag
+
+        with llm_priority(lane):
+            return await scheduler.acall(fn, "ollama", "llama")
+
+    async def run():
+        gate = asyncio.Event()
+        busy = asyncio.ensure_future(request("busy", "batch", gate))
+        await asyncio.sleep(0)
+        waiting = []
+        for tag, lane in [("b0", "batch"), ("b1", "batch"), ("i0", INTERACTIVE), ("b2", "batch"),
+                          ("i1", INTERACTIVE)]:
+            waiting.append(asyncio.ensure_future(request(tag, lane)))
+            await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(busy, *waiting)
+
+    asyncio.run(run())
+    # Interactive calls jump the queue; within a lane calls keep their arrival order
+    assert order == ["busy", "i0", "i1", "b0", "b1", "b2"]
@@ -0,0 +1,152 @@
+"""
+Test: local Realtime Database stand-in follows RTDB semantics
+local_rtdb.LocalReference vs. the firebase_admin.db.Reference contract, seeded from the
+bundled client-simulation-default-rtdb-*-export.json dumps (JSON and SQLite backends)
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import local_rtdb
+from local_rtdb import LocalDatabase, LocalReference, get_local_ref, to_returned, to_stored
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKENDS = ("rtdb.json", "rtdb.sqlite")
+
+
+def seeded_refs():
+    """(root reference, database file) per backend, each seeded from the bundled exports."""
+    directory = tempfile.mkdtemp()
+    try:
+        for backend in BACKENDS:
+            path = os.path.join(directory, backend)
+            ref = get_local_ref(path, seed_dir=REPO_DIR)
+            yield ref, path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_seeding_from_bundled_exports(bundled_exports):
+    exports = bundled_exports
+    assert "clients_6101_conversation_log_6101_101" in exports
+    for ref, path in seeded_refs():
+        assert ref.get(shallow=True) == {key: True for key in exports}
+        for key, value in exports.items():
+            assert ref.child(key).get() == value, key
+
+        # Exported arrays come back as lists, leaf values unchanged
+        log = ref.child("clients_6101_conversation_log_6101_101").get()
+        assert isinstance(log["data"], list) and log["data"] == exports["clients_6101_conversation_log_6101_101"]["data"]
+        assert ref.child("clients_6101_conversation_log_6101_101/data/0/speaker").get() == log["data"][0]["speaker"]
+
+        # A non-empty database is not seeded again; a new instance reads the same file
+        ref.child("clients_6101_profile_version6_0").delete()
+        local_rtdb._databases.pop(os.path.abspath(path))
+        reopened = get_local_ref(path, seed_dir=REPO_DIR)
+        assert "clients_6101_profile_version6_0" not in reopened.get(shallow=True)
+        assert LocalReference(LocalDatabase(path)).get() == reopened.get()
+
+
+def test_array_coercion():
+    # RTDB returns an object as an array when all keys are indices and more than half are set
+    assert to_returned(to_stored([1, None, 3])) == [1, None, 3]
+    assert to_returned(to_stored({"0": "a", "1": "b", "3": "d"})) == ["a", "b", None, "d"]
+    assert to_returned(to_stored({"1": "a", "2": "b", "3": "c"})) == [None, "a", "b", "c"]
+    assert to_returned(to_stored({"0": "a", "3": "d"})) == {"0": "a", "3": "d"}
+    assert to_returned(to_stored({"1": "a"})) == {"1": "a"}
+    assert to_returned(to_stored({"5": "a"})) == {"5": "a"}
+    assert to_returned(to_stored({"0": "a", "01": "b"})) == {"0": "a", "01": "b"}
+    # None and empty containers are never stored
+    assert to_stored([None, None]) is None
+    assert to_stored({"a": {}, "b": [], "c": None}) is None
+
+    for ref, _ in seeded_refs():
+        ref.child("test/list").set(["a", "b", "c"])
+        ref.child("test/list/1").delete()
+        assert ref.child("test/list").get() == ["a", None, "c"]
+        ref.child("test/list/0").delete()
+        assert ref.child("test/list").get() == {"2": "c"}
+
+
+def test_multi_path_update():
+    for ref, _ in seeded_refs():
+        key = "clients_6101_conversation_log_6101_101"
+        before = ref.child(key).get()
+        n = len(before["data"])
+        ref.update({
+            f"{key}/data/{n}": {"speaker": "SP", "message": "new"},
+            f"{key}/status": "complete",
+            "test_a": {"x": 1, "y": 2},
+        })
+        after = ref.child(key).get()
+        assert after["data"][:n] == before["data"] and after["data"][n] == {"speaker": "SP", "message": "new"}
+        assert after["status"] == "complete" and after["paca_version"] == before["paca_version"]
+
+        # A path in update() replaces that node; siblings are kept; None deletes
+        ref.child("test_a").update({"y": {"z": 3}, "w": 4})
+        assert ref.child("test_a").get() == {"x": 1, "y": {"z": 3}, "w": 4}
+        ref.update({"test_a/y": {"q": 5}, "test_a/x": None})
+        assert ref.child("test_a").get() == {"y": {"q": 5}, "w": 4}
+
+        # Invalid keys and arguments are rejected like firebase_admin does, without partial writes
+        for bad in ({"b.c": 1}, {"$x": 1}, {"a#": 1}, {"[a]": 1}):
+            try:
+                ref.update({"test_a/ok": 1, "test_b": bad})
+                raise AssertionError(f"accepted {bad}")
+            except ValueError:
+                pass
+        assert ref.child("test_a/ok").get() is None and ref.child("test_b").get() is None
+        for bad_update in ({}, None, "x"):
+            try:
+                ref.update(bad_update)
+                raise AssertionError(f"accepted {bad_update!r}")
+            except ValueError:
+                pass
+        try:
+            ref.child("test_a").set(None)
+            raise AssertionError("set(None) accepted")
+        except ValueError:
+            pass
+
+
+def test_delete_prunes_empty_parents():
+    for ref, _ in seeded_refs():
+        ref.child("test_prune/a/b/c").set(1)
+        ref.child("test_prune/x").set(2)
+        ref.child("test_prune/a/b/c").delete()
+        assert ref.child("test_prune").get() == {"x": 2}
+        ref.child("test_prune/x").delete()
+        assert ref.child("test_prune").get() is None
+        assert "test_prune" not in ref.get(shallow=True)
+
+        ref.child("test_empty").set({"a": {}, "b": None})
+        assert ref.child("test_empty").get() is None
+        assert "test_empty" not in ref.get(shallow=True)
+
+
+def test_push_keys():
+    for ref, _ in seeded_refs():
+        pushes = ref.child("test_push")
+        keys = []
+        for i in range(3):
+            keys.append(pushes.push({"n": i}).key)
+            time.sleep(0.002)
+        assert all(len(key) == 20 for key in keys) and len(set(keys)) == 3
+        assert keys == sorted(keys)  # chronological
+        assert pushes.get() == {key: {"n": i} for i, key in enumerate(keys)}
+        assert pushes.child(keys[0]).path == f"/test_push/{keys[0]}"
+
+
+def test_shallow_get(bundled_exports):
+    exports = bundled_exports
+    for ref, _ in seeded_refs():
+        assert ref.get(shallow=True) == {key: True for key in exports}
+
+        key = "clients_6101_conversation_log_6101_101"
+        shallow = ref.child(key).get(shallow=True)
+        assert shallow == {name: True if isinstance(value, (dict, list)) else value
+                           for name, value in exports[key].items()}
+        assert ref.child(f"{key}/paca_version").get(shallow=True) == exports[key]["paca_version"]
+        assert ref.child("missing").get(shallow=True) is None
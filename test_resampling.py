@@ -0,0 +1,149 @@
+"""
+Test: batched bootstrap / permutation resampling matches a per-resample loop
+resampling (index arrays per chunk, all correlations / fits of a chunk at once) vs. np.corrcoef /
+np.polyfit on one resample at a time drawn from the same chunk seeds, plus worker-count
+independence and undefined correlations
+"""
+
+import warnings
+
+import numpy as np
+
+import resampling
+from agreement_stats import percentile_ci
+from resampling import (CHUNK_SIZE, bootstrap_r_ci, bootstrap_regression_band, compare_correlations,
+                        correlation_comparison_table)
+
+N_RESAMPLES = 2 * CHUNK_SIZE + 500  # two full chunks and a partial one
+
+
+def random_pairs(seed, n=25, r=0.6, missing=0.1):
+    """Correlated scores with None / NaN gaps, as the figure pages pass them."""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    y = r * x + np.sqrt(1 - r ** 2) * rng.normal(size=n)
+    x_list = [None if rng.random() < missing else float(v) for v in x]
+    y_list = [np.nan if rng.random() < missing else float(v) for v in y]
+    return x_list, y_list
+
+
+def chunk_rngs(n_resamples, seed):
+    """(size, Generator) per chunk, seeded like run_resamples."""
+    sizes = [CHUNK_SIZE] * (n_resamples // CHUNK_SIZE)
+    if n_resamples % CHUNK_SIZE:
+        sizes.append(n_resamples % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(size, np.random.default_rng(s)) for size, s in zip(sizes, seeds)]
+
+
+def loop_r(x, y):
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter("ignore")
+        return np.corrcoef(x, y)[0, 1]
+
+
+def loop_bootstrap_r(x, y, n_resamples, seed):
+    values = []
+    for size, rng in chunk_rngs(n_resamples, seed):
+        for row in rng.integers(0, len(x), size=(size, len(x))):
+            values.append(loop_r(x[row], y[row]))
+    return np.array(values)
+
+
+def loop_bootstrap_lines(x, y, x_line, n_resamples, seed):
+    lines = []
+    for size, rng in chunk_rngs(n_resamples, seed):
+        for row in rng.integers(0, len(x), size=(size, len(x))):
+            slope, intercept = np.polyfit(x[row], y[row], 1)
+            lines.append(slope * x_line + intercept)
+    return np.array(lines)
+
+
+def loop_r_differences(x1, y1, x2, y2, n_resamples, seed):
+    values = []
+    for size, rng in chunk_rngs(n_resamples, seed):
+        idx1 = rng.integers(0, len(x1), size=(size, len(x1)))
+        idx2 = rng.integers(0, len(x2), size=(size, len(x2)))
+        for row1, row2 in zip(idx1, idx2):
+            values.append(loop_r(x1[row1], y1[row1]) - loop_r(x2[row2], y2[row2]))
+    return np.array(values)
+
+
+def loop_permuted_differences(x, y, n_first, n_resamples, seed):
+    values = []
+    for size, rng in chunk_rngs(n_resamples, seed):
+        for row in rng.permuted(np.tile(np.arange(len(x)), (size, 1)), axis=1):
+            first, second = row[:n_first], row[n_first:]
+            values.append(loop_r(x[first], y[first]) - loop_r(x[second], y[second]))
+    return np.array(values)
+
+
+def test_bootstrap_r_ci_matches_loop():
+    for seed in range(3):
+        x, y = resampling.paired_arrays(*random_pairs(seed))
+        expected = percentile_ci(loop_bootstrap_r(x, y, N_RESAMPLES, seed), 0.9)
+        np.testing.assert_allclose(bootstrap_r_ci(x, y, N_RESAMPLES, ci=0.9, seed=seed), expected, rtol=1e-10)
+
+
+def test_regression_band_matches_loop():
+    x, y = resampling.paired_arrays(*random_pairs(4))
+    x_line = np.linspace(x.min(), x.max(), 7)
+    lines = loop_bootstrap_lines(x, y, x_line, N_RESAMPLES, 4)
+    expected = np.percentile(lines, [2.5, 97.5], axis=0)
+    lower, upper = bootstrap_regression_band(x, y, x_line, N_RESAMPLES, seed=4)
+    np.testing.assert_allclose(lower, expected[0], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(upper, expected[1], rtol=1e-9, atol=1e-12)
+
+
+def test_compare_correlations_matches_loop():
+    x1, y1 = random_pairs(5, n=20, r=0.8)
+    x2, y2 = random_pairs(6, n=14, r=0.1)
+    result = compare_correlations(x1, y1, x2, y2, n_resamples=N_RESAMPLES, seed=3)
+
+    x1, y1 = resampling.paired_arrays(x1, y1)
+    x2, y2 = resampling.paired_arrays(x2, y2)
+    r1, r2 = loop_r(x1, y1), loop_r(x2, y2)
+    assert result['n1'] == len(x1) and result['n2'] == len(x2)
+    assert np.isclose(result['r1'], r1) and np.isclose(result['r2'], r2)
+    assert np.isclose(result['difference'], r1 - r2)
+    np.testing.assert_allclose(result['difference_ci'],
+                               percentile_ci(loop_r_differences(x1, y1, x2, y2, N_RESAMPLES, 3)), rtol=1e-10)
+
+    permuted = loop_permuted_differences(np.concatenate([x1, x2]), np.concatenate([y1, y2]), len(x1),
+                                         N_RESAMPLES, 4)
+    permuted = permuted[~np.isnan(permuted)]
+    expected_p = (np.sum(np.abs(permuted) >= abs(r1 - r2) - 1e-12) + 1) / (len(permuted) + 1)
+    assert np.isclose(result['p_permutation'], expected_p)
+
+
+def test_results_do_not_depend_on_worker_count():
+    x1, y1 = random_pairs(7, n=30)
+    x2, y2 = random_pairs(8, n=30, r=0.2)
+    n_resamples = 4 * CHUNK_SIZE + 10
+    in_process = compare_correlations(x1, y1, x2, y2, n_resamples=n_resamples, seed=11, workers=1)
+    for workers in (None, 2, 3):
+        assert compare_correlations(x1, y1, x2, y2, n_resamples=n_resamples, seed=11, workers=workers) == in_process
+
+    x, y = resampling.paired_arrays(x1, y1)
+    x_line = np.linspace(-2, 2, 5)
+    lower, upper = bootstrap_regression_band(x, y, x_line, n_resamples, seed=2, workers=1)
+    parallel_lower, parallel_upper = bootstrap_regression_band(x, y, x_line, n_resamples, seed=2, workers=3)
+    assert np.array_equal(lower, parallel_lower) and np.array_equal(upper, parallel_upper)
+
+    # A different seed gives different resamples
+    assert compare_correlations(x1, y1, x2, y2, n_resamples=n_resamples, seed=12, workers=1) != in_process
+
+
+def test_undefined_correlation_returns_none():
+    x = [1, 2, 3, 4]
+    assert compare_correlations([1, 2, 3, 4], [5, 5, 5, 5], x, [2, 1, 4, 3], n_resamples=500) is None
+    assert compare_correlations(x, [2, 1, 4, 3], [7, 7, 7, 7], x, n_resamples=500) is None
+    assert compare_correlations([1, 2], [1, 2], x, x, n_resamples=500) is None
+    assert compare_correlations([1, 2, None, 4], [1, 2, 3, np.nan], x, x, n_resamples=500) is None
+    assert bootstrap_r_ci([1, 2], [2, 1]) is None
+
+    # The comparison table leaves such a pair out instead of reporting a significant Δr
+    psyche = {(1, n): float(n) for n in range(8)}
+    expert = {(1, n): (3.0 if n < 4 else float(n % 3)) for n in range(8)}
+    groups = {"A": [(1, n) for n in range(4)], "B": [(1, n) for n in range(4, 8)]}
+    assert correlation_comparison_table(psyche, expert, groups, [("A", "B")], n_resamples=500) == []
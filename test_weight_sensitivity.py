@@ -0,0 +1,158 @@
+"""
+Test: vectorized weight-sensitivity grid matches the per-cell loop
+weight_sensitivity.weight_grid_correlations vs. the loop the Figure pages used before
+
+Synthetic element scores include experiments with missing elements, validators that
+only cover part of the experiments / elements, and experiments without any validator.
+"""
+
+import random
+
+import numpy as np
+from scipy import stats
+
+from weight_sensitivity import pack_element_scores, weight_grid_correlations
+
+RUBRIC = {
+    "Suicidal ideation": {"type": "impulsivity", "weight": 5},
+    "Homicide risk": {"type": "impulsivity", "weight": 5},
+    "Mood": {"type": "behavior", "weight": 2},
+    "Affect": {"type": "behavior", "weight": 2},
+    "Spontaneity": {"type": "behavior", "weight": 2},
+    "Chief complaint": {"type": "g-eval", "weight": 1},
+    "Suicidal plan": {"type": "binary", "weight": 1},
+    "Family history": {"type": "g-eval", "weight": 2},
+    "Length": {"type": "ordinal", "weight": 3},
+}
+VALIDATORS = ["validator_a", "validator_b", "validator_c"]
+WEIGHT_RANGE = np.arange(1, 10.1, 0.5)
+
+
+def make_element_scores(seed=0, n_experiments=12):
+    rng = random.Random(seed)
+    elements = list(RUBRIC)
+    experiments = [("6101", str(100 + i)) for i in range(n_experiments)]
+
+    psyche_el = {}
+    for i, exp in enumerate(experiments):
+        if i == 0:
+            continue  # no PSYCHE result
+        # experiment 1 misses several elements; the rest miss one now and then
+        present = elements[::2] if i == 1 else [e for e in elements if rng.random() > 0.1]
+        psyche_el[exp] = {e: {"score": rng.choice([0, 0.5, 1, 2, 3])} for e in present}
+        if i == 2:
+            psyche_el[exp]["Not in rubric"] = {"score": 9}
+            psyche_el[exp][elements[-1]] = "not a dict"
+
+    expert_el_dict = {}
+    for v, validator in enumerate(VALIDATORS):
+        # partial coverage: each validator skips some experiments and some elements
+        covered = [exp for k, exp in enumerate(experiments) if (k + v) % 3 != 0]
+        expert_el_dict[validator] = {
+            exp: {e: {"score": rng.choice([0, 1, 2, 3])} for e in elements if rng.random() > 0.2}
+            for exp in covered
+        }
+    expert_el_dict["validator_b"][experiments[3]] = {}
+    return psyche_el, expert_el_dict, experiments
+
+
+def loop_correlation(psyche_el, expert_el_dict, experiments, w_imp, w_beh, w_subj=1, expert_fixed_weights=None):
+    """The Figure pages' former per-cell implementation."""
+    imp_el = [k for k, v in RUBRIC.items() if v.get('type') == 'impulsivity']
+    beh_el = [k for k, v in RUBRIC.items() if v.get('type') == 'behavior']
+    subj_el = [k for k, v in RUBRIC.items() if v.get('type') in ['g-eval', 'binary'] and v.get('weight') == 1]
+
+    ps_scores, ex_scores = [], []
+    for exp in experiments:
+        psyche_elements = psyche_el.get(exp, {})
+        if not psyche_elements:
+            continue
+        expert_list = [expert_el_dict.get(v, {}).get(exp, {}) for v in VALIDATORS
+                       if expert_el_dict.get(v, {}).get(exp, {})]
+        if not expert_list:
+            continue
+        ps_total, ex_total = 0, 0
+        for element, info in RUBRIC.items():
+            if element not in psyche_elements:
+                continue
+            e_scores = []
+            for ed in expert_list:
+                if element in ed:
+                    d = ed[element]
+                    e_scores.append(d.get('score', 0) if isinstance(d, dict) else 0)
+            if not e_scores:
+                continue
+            avg_e = np.mean(e_scores)
+            pe = psyche_elements[element]
+            ps = pe.get('score', 0) if isinstance(pe, dict) else 0
+            if element in imp_el:
+                pw = w_imp
+            elif element in beh_el:
+                pw = w_beh
+            elif element in subj_el:
+                pw = w_subj
+            else:
+                pw = info.get('weight', 1)
+            if expert_fixed_weights:
+                if element in imp_el:
+                    ew = expert_fixed_weights[0]
+                elif element in beh_el:
+                    ew = expert_fixed_weights[1]
+                elif element in subj_el:
+                    ew = expert_fixed_weights[2]
+                else:
+                    ew = info.get('weight', 1)
+            else:
+                ew = pw
+            ps_total += ps * pw
+            ex_total += avg_e * ew
+        ps_scores.append(ps_total)
+        ex_scores.append(ex_total)
+    if len(ps_scores) >= 2:
+        r, _ = stats.pearsonr(ps_scores, ex_scores)
+        return r
+    return None
+
+
+def loop_grid(psyche_el, expert_el_dict, experiments, expert_fixed_weights=None):
+    n = len(WEIGHT_RANGE)
+    grid = np.zeros((n, n))
+    for i, w_imp in enumerate(WEIGHT_RANGE):
+        for j, w_beh in enumerate(WEIGHT_RANGE):
+            r = loop_correlation(psyche_el, expert_el_dict, experiments, w_imp, w_beh,
+                                 expert_fixed_weights=expert_fixed_weights)
+            grid[i, j] = r if r is not None else 0
+    return grid
+
+
+def test_packing_excludes_missing_elements_and_uncovered_experiments():
+    psyche_el, expert_el_dict, experiments = make_element_scores()
+    packed = pack_element_scores(psyche_el, expert_el_dict, experiments, VALIDATORS, RUBRIC)
+
+    expected = [exp for exp in experiments if psyche_el.get(exp)
+                and any(expert_el_dict[v].get(exp) for v in VALIDATORS)]
+    assert packed.experiments == expected
+    assert experiments[1] in packed.experiments
+    row = packed.experiments.index(experiments[1])
+    assert not packed.included[row, 1::2].any()
+
+
+def test_grid_matches_per_cell_loop():
+    psyche_el, expert_el_dict, experiments = make_element_scores()
+    packed = pack_element_scores(psyche_el, expert_el_dict, experiments, VALIDATORS, RUBRIC)
+
+    np.testing.assert_allclose(weight_grid_correlations(packed, WEIGHT_RANGE),
+                               loop_grid(psyche_el, expert_el_dict, experiments), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(weight_grid_correlations(packed, WEIGHT_RANGE, expert_fixed_weights=(5, 2, 1)),
+                               loop_grid(psyche_el, expert_el_dict, experiments, expert_fixed_weights=(5, 2, 1)),
+                               rtol=0, atol=1e-12)
+
+
+def test_fewer_than_two_experiments_gives_zero_grid():
+    psyche_el, expert_el_dict, experiments = make_element_scores(seed=1)
+    only_one = [exp for exp in experiments if psyche_el.get(exp)
+                and any(expert_el_dict[v].get(exp) for v in VALIDATORS)][:1]
+    packed = pack_element_scores(psyche_el, expert_el_dict, only_one, VALIDATORS, RUBRIC)
+
+    assert not weight_grid_correlations(packed, WEIGHT_RANGE).any()
+    assert not loop_grid(psyche_el, expert_el_dict, only_one).any()
@@ -0,0 +1,215 @@
+"""
+Vectorized Weight-Sensitivity Analysis
+
+The Figure pages sweep the Impulsivity / Behavior category weights over a grid and
+correlate weighted PSYCHE totals with weighted (validator-averaged) expert totals.
+Instead of re-walking the element dicts for every grid cell, the element scores are
+packed once into experiment × element arrays (expert scores averaged over validators
+while packing); each weighted total is linear in the two swept weights, so every
+cell's totals and its Pearson r come out of a few array operations.
+
+Semantics match the per-cell loop the Figure pages used before:
+- an experiment counts only if it has PSYCHE elements and at least one validator's elements
+- an element counts only if PSYCHE has it and at least one of those validators has it
+- expert element score = mean over the validators that have it
+- elements outside the three swept categories keep their PSYCHE_RUBRIC weight
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Category order used for the per-experiment partial sums
+CATEGORIES = ("Impulsivity", "Behavior", "Subjective", "Other")
+
+# 0.1 간격으로 1부터 10까지 (총 91개 포인트)
+DEFAULT_WEIGHT_RANGE = np.arange(1, 10.1, 0.1)
+
+
+def _element_score(value) -> float:
+    return float(value.get('score', 0) or 0) if isinstance(value, dict) else 0.0
+
+
+def rubric_categories(rubric: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """Map each rubric element to its weight category (same rules as the Figure pages)."""
+    categories = {}
+    for element, info in rubric.items():
+        if info.get('type') == 'impulsivity':
+            categories[element] = "Impulsivity"
+        elif info.get('type') == 'behavior':
+            categories[element] = "Behavior"
+        elif info.get('type') in ['g-eval', 'binary'] and info.get('weight') == 1:
+            categories[element] = "Subjective"
+        else:
+            categories[element] = "Other"
+    return categories
+
+
+@dataclass
+class PackedElementScores:
+    """Element scores packed into arrays over the experiments that take part in the analysis."""
+    experiments: List[Tuple[str, str]]
+    elements: List[str]
+    psyche: np.ndarray          # (n_exp, n_elem) PSYCHE element score, 0 where excluded
+    expert_avg: np.ndarray      # (n_exp, n_elem) validator-averaged expert score, 0 where excluded
+    included: np.ndarray        # (n_exp, n_elem) bool, element counted for this experiment
+    category_matrix: np.ndarray  # (n_elem, 4) one-hot over CATEGORIES
+    rubric_weights: np.ndarray  # (n_elem,) PSYCHE_RUBRIC weight (used for the "Other" category)
+
+    def category_sums(self, scores: np.ndarray) -> np.ndarray:
+        """(n_exp, 4) per-category score sums; the "Other" column is already rubric-weighted."""
+        weighted = np.where(self.included, scores, 0.0)
+        sums = weighted @ self.category_matrix
+        sums[:, 3] = weighted @ (self.category_matrix[:, 3] * self.rubric_weights)
+        return sums
+
+
+def pack_element_scores(psyche_el: Dict, expert_el_dict: Dict, experiments: Sequence[Tuple[str, str]],
+                        validators: Sequence[str], rubric: Optional[Dict[str, Dict[str, Any]]] = None
+                        ) -> PackedElementScores:
+    """
+    Pack {(client, exp): {element: {score}}} and {validator: {(client, exp): {element: {score}}}}
+    into dense arrays (elements in PSYCHE_RUBRIC order).
+    """
+    if rubric is None:
+        from evaluator import PSYCHE_RUBRIC
+        rubric = PSYCHE_RUBRIC
+
+    elements = list(rubric.keys())
+    element_index = {element: k for k, element in enumerate(elements)}
+    categories = rubric_categories(rubric)
+
+    used_experiments = []
+    psyche_rows, expert_sum_rows, expert_count_rows, psyche_has_rows = [], [], [], []
+    for exp in experiments:
+        psyche_elements = psyche_el.get(exp, {})
+        if not psyche_elements:
+            continue
+        expert_list = [expert_el_dict.get(v, {}).get(exp, {}) for v in validators
+                       if expert_el_dict.get(v, {}).get(exp, {})]
+        if not expert_list:
+            continue
+
+        psyche_row = np.zeros(len(elements))
+        psyche_has = np.zeros(len(elements), dtype=bool)
+        for element, value in psyche_elements.items():
+            k = element_index.get(element)
+            if k is not None:
+                psyche_row[k] = _element_score(value)
+                psyche_has[k] = True
+
+        expert_sum = np.zeros(len(elements))
+        expert_count = np.zeros(len(elements))
+        for expert_elements in expert_list:
+            for element, value in expert_elements.items():
+                k = element_index.get(element)
+                if k is not None:
+                    expert_sum[k] += _element_score(value)
+                    expert_count[k] += 1
+
+        used_experiments.append(exp)
+        psyche_rows.append(psyche_row)
+        psyche_has_rows.append(psyche_has)
+        expert_sum_rows.append(expert_sum)
+        expert_count_rows.append(expert_count)
+
+    shape = (len(used_experiments), len(elements))
+    psyche = np.array(psyche_rows).reshape(shape)
+    psyche_has = np.array(psyche_has_rows, dtype=bool).reshape(shape)
+    expert_sum = np.array(expert_sum_rows).reshape(shape)
+    expert_count = np.array(expert_count_rows).reshape(shape)
+
+    included = psyche_has & (expert_count > 0)
+    expert_avg = np.divide(expert_sum, expert_count, out=np.zeros(shape), where=expert_count > 0)
+
+    category_matrix = np.zeros((len(elements), len(CATEGORIES)))
+    for k, element in enumerate(elements):
+        category_matrix[k, CATEGORIES.index(categories[element])] = 1.0
+    rubric_weights = np.array([float(rubric[element].get('weight', 1)) for element in elements])
+
+    return PackedElementScores(
+        experiments=used_experiments,
+        elements=elements,
+        psyche=np.where(included, psyche, 0.0),
+        expert_avg=np.where(included, expert_avg, 0.0),
+        included=included,
+        category_matrix=category_matrix,
+        rubric_weights=rubric_weights,
+    )
+
+
+def pearson_r_last_axis(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson r along the last axis for every leading index (NaN where either side is constant)."""
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (x * y).sum(axis=-1) / np.sqrt((x * x).sum(axis=-1) * (y * y).sum(axis=-1))
+
+
+def weighted_totals(category_sums: np.ndarray, w_imp, w_beh, w_subj=1) -> np.ndarray:
+    """
+    Weighted totals for scalar or array weights; broadcasting w_imp (n, 1) against
+    w_beh (1, n) gives (n, n, n_exp) totals for the whole grid.
+    """
+    w_imp, w_beh, w_subj = (np.asarray(w, dtype=float)[..., None] for w in (w_imp, w_beh, w_subj))
+    return (category_sums[:, 0] * w_imp + category_sums[:, 1] * w_beh
+            + category_sums[:, 2] * w_subj + category_sums[:, 3])
+
+
+def weight_grid_correlations(packed: PackedElementScores, weight_range: np.ndarray = DEFAULT_WEIGHT_RANGE,
+                             w_subj=1, expert_fixed_weights: Optional[Tuple[float, float, float]] = None
+                             ) -> np.ndarray:
+    """
+    Pearson r between weighted PSYCHE and expert totals for every (w_imp, w_beh) in the grid.
+
+    Returns grid[i, j] for w_imp = weight_range[i], w_beh = weight_range[j]
+    (0 everywhere when fewer than 2 experiments are available, like the original loop).
+    """
+    n = len(weight_range)
+    if len(packed.experiments) < 2:
+        return np.zeros((n, n))
+
+    psyche_sums = packed.category_sums(packed.psyche)
+    expert_sums = packed.category_sums(packed.expert_avg)
+
+    w_imp_grid = weight_range[:, None]
+    w_beh_grid = weight_range[None, :]
+    psyche_totals = weighted_totals(psyche_sums, w_imp_grid, w_beh_grid, w_subj)
+    if expert_fixed_weights:
+        expert_totals = weighted_totals(expert_sums, *expert_fixed_weights)
+        expert_totals = np.broadcast_to(expert_totals, psyche_totals.shape)
+    else:
+        expert_totals = weighted_totals(expert_sums, w_imp_grid, w_beh_grid, w_subj)
+
+    return pearson_r_last_axis(psyche_totals, expert_totals)
+
+
+def weighted_correlation(packed: PackedElementScores, w_imp, w_beh, w_subj=1,
+                         expert_fixed_weights: Optional[Tuple[float, float, float]] = None) -> Optional[float]:
+    """Single-point version of weight_grid_correlations (None with fewer than 2 experiments)."""
+    if len(packed.experiments) < 2:
+        return None
+    psyche_totals = weighted_totals(packed.category_sums(packed.psyche), w_imp, w_beh, w_subj)
+    expert_weights = expert_fixed_weights or (w_imp, w_beh, w_subj)
+    expert_totals = weighted_totals(packed.category_sums(packed.expert_avg), *expert_weights)
+    return float(pearson_r_last_axis(psyche_totals, expert_totals))
+
+
+def calculate_weight_correlations(psyche_el: Dict, expert_el_dict: Dict, experiments: Sequence[Tuple[str, str]],
+                                  validators: Sequence[str], weight_range: np.ndarray = DEFAULT_WEIGHT_RANGE,
+                                  expert_fixed_weights: Tuple[float, float, float] = (5, 2, 1)):
+    """
+    Both Figure heatmaps in one pass.
+
+    Returns:
+    - correlation_equal: PSYCHE and expert weights swept together
+    - correlation_fixed: expert weights fixed at expert_fixed_weights, PSYCHE swept
+    - weight_range
+    Rows are flipped (row 0 = largest w_impulsivity), as the heatmap code expects.
+    """
+    packed = pack_element_scores(psyche_el, expert_el_dict, experiments, validators)
+    correlation_equal = np.flipud(weight_grid_correlations(packed, weight_range))
+    correlation_fixed = np.flipud(weight_grid_correlations(packed, weight_range,
+                                                           expert_fixed_weights=expert_fixed_weights))
+    return correlation_equal, correlation_fixed, weight_range